@@ -24,6 +24,11 @@ from app.models import Base
 target_metadata = Base.metadata
 # ————————————————————————————
 
+# Migrate the same database the app uses (DATABASE_URL from the environment/.env).
+# "%" is escaped because the value is interpolated like the rest of alembic.ini.
+from app.core.config import settings
+config.set_main_option("sqlalchemy.url", settings.database_url.replace("%", "%%"))
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired like:
 # my_important_option = config.get_main_option("my_important_option")
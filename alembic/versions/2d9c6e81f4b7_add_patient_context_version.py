@@ -0,0 +1,31 @@
+"""Add context_version to patients
+
+Revision ID: 2d9c6e81f4b7
+Revises: 5b7e2d4c9a13
+Create Date: 2025-07-17 15:22:09.418377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d9c6e81f4b7'
+down_revision: Union[str, None] = '5b7e2d4c9a13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add context_version column used to invalidate cached generation contexts."""
+    op.add_column(
+        'patients',
+        sa.Column('context_version', sa.Integer(), server_default='0', nullable=False)
+    )
+
+
+def downgrade() -> None:
+    """Drop context_version column from patients."""
+    op.drop_column('patients', 'context_version')
@@ -0,0 +1,30 @@
+"""Add icd10_code to medical reports
+
+Revision ID: 5b7e2d4c9a13
+Revises: c3f1a9d27b84
+Create Date: 2025-07-16 09:48:22.731604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7e2d4c9a13'
+down_revision: Union[str, None] = 'c3f1a9d27b84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add validated ICD-10-GM code column to medical_reports."""
+    op.add_column('medical_reports', sa.Column('icd10_code', sa.String(), nullable=True))
+    op.create_index('ix_medical_reports_icd10_code', 'medical_reports', ['icd10_code'], unique=False)
+
+
+def downgrade() -> None:
+    """Drop icd10_code column from medical_reports."""
+    op.drop_index('ix_medical_reports_icd10_code', table_name='medical_reports')
+    op.drop_column('medical_reports', 'icd10_code')
@@ -0,0 +1,31 @@
+"""Add token_version to users
+
+Revision ID: 77efc5c64738
+Revises: e56ae9d115a3
+Create Date: 2025-07-08 10:21:47.305918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '77efc5c64738'
+down_revision: Union[str, None] = 'e56ae9d115a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add token_version column used to invalidate issued JWTs."""
+    op.add_column(
+        'users',
+        sa.Column('token_version', sa.Integer(), server_default='0', nullable=False)
+    )
+
+
+def downgrade() -> None:
+    """Drop token_version column from users."""
+    op.drop_column('users', 'token_version')
@@ -0,0 +1,56 @@
+"""Add German full-text search vector to medical reports
+
+Revision ID: 84886aa69d7b
+Revises: 9eb2cab799e2
+Create Date: 2025-07-01 09:12:31.482113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '84886aa69d7b'
+down_revision: Union[str, None] = '9eb2cab799e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('german', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('german', coalesce(final_report, '')), 'B') || "
+    "setweight(to_tsvector('german', coalesce(patient_history, '')), 'C') || "
+    "setweight(to_tsvector('german', coalesce(physical_exam, '')), 'C')"
+)
+
+
+def upgrade() -> None:
+    """Add generated tsvector column and GIN index to medical_reports."""
+    op.add_column(
+        'medical_reports',
+        sa.Column(
+            'search_vector',
+            postgresql.TSVECTOR(),
+            sa.Computed(SEARCH_VECTOR_EXPRESSION, persisted=True),
+            nullable=True
+        )
+    )
+    op.create_index(
+        'ix_medical_reports_search_vector',
+        'medical_reports',
+        ['search_vector'],
+        unique=False,
+        postgresql_using='gin'
+    )
+
+
+def downgrade() -> None:
+    """Drop full-text search index and column from medical_reports."""
+    op.drop_index(
+        'ix_medical_reports_search_vector',
+        table_name='medical_reports',
+        postgresql_using='gin'
+    )
+    op.drop_column('medical_reports', 'search_vector')
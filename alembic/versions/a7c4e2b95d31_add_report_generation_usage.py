@@ -0,0 +1,69 @@
+"""Add report_generations and usage_daily tables
+
+Revision ID: a7c4e2b95d31
+Revises: 2d9c6e81f4b7
+Create Date: 2025-07-18 11:05:43.208917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c4e2b95d31'
+down_revision: Union[str, None] = '2d9c6e81f4b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create per-generation usage records and their daily rollups."""
+    op.create_table('report_generations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('report_id', sa.Integer(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('model', sa.String(), nullable=False),
+    sa.Column('route', sa.String(), nullable=False),
+    sa.Column('prompt_version', sa.String(), nullable=False),
+    sa.Column('prompt_tokens', sa.Integer(), nullable=False),
+    sa.Column('completion_tokens', sa.Integer(), nullable=False),
+    sa.Column('cached_tokens', sa.Integer(), nullable=False),
+    sa.Column('cache_status', sa.String(), nullable=False),
+    sa.Column('latency_ms', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['report_id'], ['medical_reports.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_report_generations_report_id', 'report_generations', ['report_id'], unique=False)
+    op.create_index('ix_report_generations_user_id', 'report_generations', ['user_id'], unique=False)
+    op.create_table('usage_daily',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('model', sa.String(), nullable=False),
+    sa.Column('generations', sa.Integer(), nullable=False),
+    sa.Column('prompt_tokens', sa.Integer(), nullable=False),
+    sa.Column('completion_tokens', sa.Integer(), nullable=False),
+    sa.Column('cached_tokens', sa.Integer(), nullable=False),
+    sa.Column('latency_ms_total', sa.Integer(), nullable=False),
+    sa.Column('latency_ms_max', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='SET NULL'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('day', 'user_id', 'model', name='uq_usage_daily_day_user_model')
+    )
+    op.create_index('ix_usage_daily_user_id', 'usage_daily', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Drop report generation usage tables."""
+    op.drop_index('ix_usage_daily_user_id', table_name='usage_daily')
+    op.drop_table('usage_daily')
+    op.drop_index('ix_report_generations_user_id', table_name='report_generations')
+    op.drop_index('ix_report_generations_report_id', table_name='report_generations')
+    op.drop_table('report_generations')
@@ -0,0 +1,29 @@
+"""Add final_report_html to medical reports
+
+Revision ID: c3f1a9d27b84
+Revises: 8586cf5d0ca8
+Create Date: 2025-07-14 11:37:05.214930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3f1a9d27b84'
+down_revision: Union[str, None] = '8586cf5d0ca8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add column holding the rendered HTML of final_report."""
+    # Existing rows stay NULL; the PDF route renders those on demand
+    op.add_column('medical_reports', sa.Column('final_report_html', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    """Drop final_report_html column from medical_reports."""
+    op.drop_column('medical_reports', 'final_report_html')
@@ -0,0 +1,63 @@
+"""Add trigram indexes for patient typeahead search
+
+Revision ID: e56ae9d115a3
+Revises: 84886aa69d7b
+Create Date: 2025-07-03 16:40:05.913274
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e56ae9d115a3'
+down_revision: Union[str, None] = '84886aa69d7b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Enable pg_trgm/unaccent and index profile names, emails and birth dates."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+
+    # unaccent() is only STABLE, so wrap it in an IMMUTABLE function that
+    # can be used in index expressions. Umlaut spellings (ae/oe/ue) and ß
+    # are folded the same way, so "Mueller", "Müller" and "Muller" match.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION search_normalize(text)
+        RETURNS text
+        LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT
+        AS $$
+            SELECT replace(replace(replace(replace(
+                public.unaccent('public.unaccent'::regdictionary, lower($1)),
+                'ae', 'a'), 'oe', 'o'), 'ue', 'u'), 'ss', 's')
+        $$
+        """
+    )
+
+    op.execute(
+        "CREATE INDEX ix_profiles_name_trgm ON profiles "
+        "USING gin (search_normalize(first_name || ' ' || last_name) gin_trgm_ops)"
+    )
+    op.execute(
+        "CREATE INDEX ix_profiles_email_trgm ON profiles "
+        "USING gin (lower(email) gin_trgm_ops)"
+    )
+    op.create_index(
+        'ix_patients_date_of_birth',
+        'patients',
+        ['date_of_birth'],
+        unique=False
+    )
+
+
+def downgrade() -> None:
+    """Drop typeahead indexes and the normalisation function."""
+    op.drop_index('ix_patients_date_of_birth', table_name='patients')
+    op.execute("DROP INDEX IF EXISTS ix_profiles_email_trgm")
+    op.execute("DROP INDEX IF EXISTS ix_profiles_name_trgm")
+    op.execute("DROP FUNCTION IF EXISTS search_normalize(text)")
@@ -0,0 +1,36 @@
+"""Add user_invalidations table
+
+Revision ID: f2b8d61c4e07
+Revises: a7c4e2b95d31
+Create Date: 2025-07-21 09:12:37.514082
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b8d61c4e07'
+down_revision: Union[str, None] = 'a7c4e2b95d31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Create the user change log that workers sync their principal caches from."""
+    op.create_table('user_invalidations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_user_invalidations_created_at', 'user_invalidations', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Drop the user change log."""
+    op.drop_index('ix_user_invalidations_created_at', table_name='user_invalidations')
+    op.drop_table('user_invalidations')
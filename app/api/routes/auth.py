@@ -1,59 +1,239 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import uuid
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import get_db
-from app.core.security import verify_password, create_access_token
+from app.db import get_async_db, upsert_insert
+from app.core.security import (
+    create_access_token,
+    create_refresh_token,
+    decode_refresh_token,
+    get_token_payload,
+    invalidate_principal,
+    login_throttle,
+    record_user_change,
+    revocation_list,
+    verify_and_update_password,
+)
+from app.models.auth_token import RefreshToken, RevokedToken
 from app.models.profile import Profile
 from app.models.user import User
+from app.schemas.auth import RefreshRequest, SignOutRequest, TokenPair
 
 router = APIRouter()
 
+
+def _issue_tokens(db: AsyncSession, user: User, family_id: str) -> tuple[TokenPair, str]:
+    """
+    Creates an access/refresh token pair and stages the refresh token's row.
+    The caller commits.
+
+    Returns:
+    - (token pair, jti of the new refresh token)
+    """
+    # Token payload includes user ID and role
+    # The version lets role changes and password resets revoke old tokens
+    token_data = {
+        "sub": str(user.id),
+        "role": user.role,
+        "ver": user.token_version
+    }
+
+    access_token = create_access_token(token_data)
+    refresh_token, jti, expires_at = create_refresh_token(token_data)
+
+    db.add(RefreshToken(
+        jti=jti,
+        family_id=family_id,
+        user_id=user.id,
+        expires_at=expires_at
+    ))
+
+    return TokenPair(access_token=access_token, refresh_token=refresh_token), jti
+
+
+async def _revoke_family(db: AsyncSession, family_id: str) -> None:
+    """Revokes every still-active refresh token descending from one sign-in."""
+    await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=datetime.now(timezone.utc))
+    )
+
+
 # Endpoint: User login
-@router.post("/signin")
-def login(
+@router.post("/signin", response_model=TokenPair)
+async def login(
+        request: Request,
         form_data: OAuth2PasswordRequestForm = Depends(),
-        db: Session = Depends(get_db)
+        db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Authenticates a user using OAuth2 form data (username and password) and returns a JWT token.
+    Authenticates a user using OAuth2 form data (username and password) and returns a JWT token pair.
 
     Parameters:
     - form_data: OAuth2 form input containing 'username' (email) and 'password'
-    - db: Database session
+    - db: Async database session
 
     Returns:
-    - A bearer token (JWT) to be used for authenticated requests
+    - A short-lived bearer access token for authenticated requests
+    - A refresh token to obtain new access tokens via /token/refresh
 
     Raises:
     - HTTP 401 if user is not found or password is incorrect
+    - HTTP 429 if the account has too many recent failures, or the password
+      is wrong and the client IP has too many recent failures
+    - HTTP 503 if the password hashing queue is full
     """
+    # Reject throttled accounts before any DB or bcrypt work. The client
+    # address is taken from X-Forwarded-For only when the proxy is trusted
+    # (uvicorn --proxy-headers with FORWARDED_ALLOW_IPS).
+    client_ip = request.client.host if request.client else "unknown"
+    login_throttle.check_account(form_data.username)
+    ip_retry_after = login_throttle.ip_retry_after(client_ip)
 
     # Find user by email (OAuth2 expects username field)
-    user = (
-        db.query(User)
+    result = await db.execute(
+        select(User)
         .join(Profile)
-        .filter(Profile.email == form_data.username)
-        .first()
+        .where(Profile.email == form_data.username)
+        .limit(1)
     )
+    user = result.scalars().first()
 
-    # Verify if user exists and password is correct
-    if not user or not verify_password(form_data.password, user.password_hash):
+    # Verify if user exists and password is correct.
+    # bcrypt runs on the dedicated password executor.
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await verify_and_update_password(
+            form_data.password, user.password_hash
+        )
+
+    if not valid:
+        login_throttle.record_failure(form_data.username, client_ip)
+        # A throttled IP still signs in with a correct password; only
+        # failures are answered with 429 instead of 401
+        if ip_retry_after is not None:
+            raise login_throttle.reject(ip_retry_after)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
         )
 
-    # Token payload includes user ID and role
-    token_data = {
-        "sub": str(user.id),
-        "role": user.role
-    }
+    login_throttle.reset_account(form_data.username)
 
-    # Generate JWT access token
-    token = create_access_token(token_data)
+    # Re-hash with the current bcrypt cost if the stored hash is outdated
+    if new_hash:
+        user.password_hash = new_hash
 
-    return {
-        "access_token": token,
-        "token_type": "bearer"
-    }
+    # Each sign-in starts a new refresh token family
+    tokens, _ = _issue_tokens(db, user, family_id=uuid.uuid4().hex)
+    await db.commit()
+
+    return tokens
+
+
+@router.post("/token/refresh", response_model=TokenPair)
+async def refresh_tokens(
+        body: RefreshRequest,
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Exchanges a refresh token for a new access/refresh token pair.
+
+    - The used refresh token is revoked and replaced (rotation).
+    - Presenting an already rotated token is treated as theft: the whole
+      token family is revoked and the user's existing access tokens are
+      invalidated.
+
+    Raises:
+    - HTTP 401 if the token is invalid, expired, revoked or superseded
+    """
+    payload = decode_refresh_token(body.refresh_token)
+
+    result = await db.execute(
+        select(RefreshToken)
+        .where(RefreshToken.jti == payload.get("jti"))
+        .with_for_update()
+    )
+    stored = result.scalars().first()
+    if not stored or stored.user_id != payload["sub"]:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    user = await db.get(User, stored.user_id)
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    # Reuse of a rotated token: revoke the chain and all issued access tokens
+    if stored.revoked_at is not None:
+        await _revoke_family(db, stored.family_id)
+        user.token_version += 1
+        record_user_change(db, user.id)
+        await db.commit()
+        invalidate_principal(user.id)
+        raise HTTPException(status_code=401, detail="Refresh token has been revoked")
+
+    # Password resets and role changes also retire refresh tokens
+    if payload.get("ver", 0) != user.token_version:
+        await _revoke_family(db, stored.family_id)
+        await db.commit()
+        raise HTTPException(status_code=401, detail="Token is no longer valid")
+
+    tokens, new_jti = _issue_tokens(db, user, family_id=stored.family_id)
+    stored.revoked_at = datetime.now(timezone.utc)
+    stored.replaced_by_jti = new_jti
+    await db.commit()
+
+    return tokens
+
+
+@router.post("/signout")
+async def sign_out(
+        body: Optional[SignOutRequest] = None,
+        payload: dict = Depends(get_token_payload),
+        db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Revokes the current access token and, if given, the refresh token family.
+
+    The revocation applies on this worker immediately and on the
+    other workers after their next sync (REVOCATION_SYNC_SECONDS).
+
+    Raises:
+    - HTTP 401 if the access token is invalid or already revoked
+    """
+    jti = payload.get("jti")
+    expires_at = datetime.fromtimestamp(payload["exp"], tz=timezone.utc)
+
+    # Tokens issued before jti claims existed cannot be revoked individually.
+    # Signing out twice (e.g. on two workers before they sync) is not an error.
+    if jti:
+        await db.execute(
+            upsert_insert(db)(RevokedToken)
+            .values(jti=jti, expires_at=expires_at)
+            .on_conflict_do_nothing(index_elements=[RevokedToken.jti])
+        )
+
+    if body and body.refresh_token:
+        refresh_payload = decode_refresh_token(body.refresh_token)
+        result = await db.execute(
+            select(RefreshToken.family_id)
+            .where(
+                RefreshToken.jti == refresh_payload.get("jti"),
+                RefreshToken.user_id == payload["sub"]
+            )
+        )
+        family_id = result.scalar()
+        if family_id:
+            await _revoke_family(db, family_id)
+
+    await db.commit()
+
+    if jti:
+        revocation_list.add(jti, expires_at)
+
+    return {"message": "Signed out"}
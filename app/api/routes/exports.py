@@ -0,0 +1,240 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, timedelta
+from typing import Iterator, Literal, Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import and_, func, select
+
+from app.core.security import Principal, admin_only
+from app.db import ReadSessionLocal
+from app.models.address import Address
+from app.models.medical_report import MedicalReport
+from app.models.patient import Patient
+from app.models.profile import Profile
+
+router = APIRouter()
+
+# Rows fetched per round-trip from the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+
+# Bytes buffered before a chunk is handed to the client
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+PATIENT_FIELDS = [
+    "id", "first_name", "last_name", "email", "phone_number",
+    "date_of_birth", "gender", "allergies", "past_illnesses",
+    "current_diagnosis", "notes", "assigned_user_id",
+    "street", "postal_code", "city", "country",
+]
+
+REPORT_FIELDS = [
+    "report_id", "title", "patient_history", "physical_exam",
+    "final_report", "report_created_at", "report_updated_at",
+]
+
+
+def _build_export_query(
+    doctor_id: Optional[int],
+    date_from: Optional[date],
+    date_to: Optional[date]
+):
+    """
+    Builds one flat query of patients joined with their reports,
+    ordered so that all rows of a patient are consecutive.
+
+    When a date range is given only reports created inside it are
+    exported, and patients without such reports are skipped.
+    """
+    # Use the first address of each profile, like the patient endpoints
+    first_address_id = (
+        select(func.min(Address.id))
+        .where(Address.profile_id == Profile.id)
+        .correlate(Profile)
+        .scalar_subquery()
+    )
+
+    report_join = [MedicalReport.patient_id == Patient.id]
+    if date_from:
+        report_join.append(MedicalReport.created_at >= date_from)
+    if date_to:
+        report_join.append(MedicalReport.created_at < date_to + timedelta(days=1))
+    date_filtered = bool(date_from or date_to)
+
+    stmt = (
+        select(
+            Patient.id,
+            Profile.first_name,
+            Profile.last_name,
+            Profile.email,
+            Profile.phone_number,
+            Patient.date_of_birth,
+            Patient.gender,
+            Patient.allergies,
+            Patient.past_illnesses,
+            Patient.current_diagnosis,
+            Patient.notes,
+            Patient.assigned_user_id,
+            Address.street,
+            Address.postal_code,
+            Address.city,
+            Address.country,
+            MedicalReport.id.label("report_id"),
+            MedicalReport.title,
+            MedicalReport.patient_history,
+            MedicalReport.physical_exam,
+            MedicalReport.final_report,
+            MedicalReport.created_at.label("report_created_at"),
+            MedicalReport.updated_at.label("report_updated_at"),
+        )
+        .join(Profile, Patient.profile_id == Profile.id)
+        .outerjoin(Address, Address.id == first_address_id)
+        .join(MedicalReport, and_(*report_join), isouter=not date_filtered)
+        .order_by(Patient.id, MedicalReport.id)
+    )
+
+    if doctor_id is not None:
+        stmt = stmt.where(Patient.assigned_user_id == doctor_id)
+
+    return stmt
+
+
+def _stream_rows(stmt) -> Iterator:
+    """
+    Yields result rows from a server-side cursor using its own session,
+    since the request's session is closed before streaming starts.
+    """
+    db = ReadSessionLocal()
+    try:
+        result = db.execute(
+            stmt,
+            execution_options={"yield_per": EXPORT_BATCH_SIZE}
+        )
+        for row in result:
+            yield row._mapping
+    finally:
+        db.close()
+
+
+def _json_default(value):
+    """Serializes dates and datetimes as ISO 8601 strings."""
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _ndjson_lines(rows: Iterator) -> Iterator[str]:
+    """
+    Groups consecutive rows per patient and yields one JSON document
+    per patient with its reports nested.
+    """
+    current = None
+    for row in rows:
+        if current is None or current["id"] != row["id"]:
+            if current is not None:
+                yield json.dumps(current, ensure_ascii=False, default=_json_default) + "\n"
+            current = {field: row[field] for field in PATIENT_FIELDS}
+            current["reports"] = []
+
+        if row["report_id"] is not None:
+            report = {field: row[field] for field in REPORT_FIELDS}
+            report["id"] = report.pop("report_id")
+            current["reports"].append(report)
+
+    if current is not None:
+        yield json.dumps(current, ensure_ascii=False, default=_json_default) + "\n"
+
+
+def _csv_lines(rows: Iterator) -> Iterator[str]:
+    """
+    Yields a header and one CSV line per report. Patient columns are
+    repeated on each report row; patients without reports get one row
+    with empty report columns.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    columns = PATIENT_FIELDS + REPORT_FIELDS
+
+    writer.writerow(columns)
+    yield buffer.getvalue()
+
+    for row in rows:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow([
+            value.isoformat() if isinstance(value, (date, datetime)) else value
+            for value in (row[column] for column in columns)
+        ])
+        yield buffer.getvalue()
+
+
+def _encode_chunks(lines: Iterator[str], compress: bool) -> Iterator[bytes]:
+    """
+    Encodes lines as UTF-8, optionally gzips them on the fly,
+    and yields chunks of roughly EXPORT_CHUNK_SIZE bytes.
+    """
+    # wbits=31 produces a gzip container instead of a raw zlib stream
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    pending = []
+    pending_size = 0
+
+    for line in lines:
+        data = line.encode("utf-8")
+        if compressor:
+            data = compressor.compress(data)
+        if data:
+            pending.append(data)
+            pending_size += len(data)
+        if pending_size >= EXPORT_CHUNK_SIZE:
+            yield b"".join(pending)
+            pending = []
+            pending_size = 0
+
+    if compressor:
+        pending.append(compressor.flush())
+    if pending:
+        yield b"".join(pending)
+
+
+@router.get("/admin/export/patients")
+def export_patients(
+    format: Literal["ndjson", "csv"] = Query("ndjson"),
+    doctor_id: Optional[int] = Query(None, description="Only patients of this doctor"),
+    date_from: Optional[date] = Query(None, description="Reports created on or after"),
+    date_to: Optional[date] = Query(None, description="Reports created on or before"),
+    compress: bool = Query(True, description="Gzip the stream"),
+    current_user: Principal = Depends(admin_only)
+):
+    """
+    Stream all patients with their reports as NDJSON or CSV.
+
+    - Rows are read from a server-side cursor, so memory stays flat
+      regardless of table size.
+    - NDJSON emits one patient per line with nested reports,
+      CSV emits one line per report.
+    - The stream is gzipped on the fly unless `compress=false`.
+
+    Only accessible to admin users.
+    """
+    stmt = _build_export_query(doctor_id, date_from, date_to)
+    rows = _stream_rows(stmt)
+    lines = _ndjson_lines(rows) if format == "ndjson" else _csv_lines(rows)
+
+    if format == "ndjson":
+        media_type = "application/x-ndjson"
+    else:
+        media_type = "text/csv; charset=utf-8"
+
+    filename = f"patients_export_{date.today():%Y%m%d}.{format}"
+    if compress:
+        media_type = "application/gzip"
+        filename += ".gz"
+
+    return StreamingResponse(
+        _encode_chunks(lines, compress),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
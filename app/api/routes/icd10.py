@@ -0,0 +1,44 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.core.security import Principal, get_current_user
+from app.schemas.icd10 import ICD10Entry
+from app.utils.icd10 import get_catalogue, normalize_code
+
+router = APIRouter()
+
+
+@router.get("/icd10/search", response_model=list[ICD10Entry])
+async def search_icd10(
+    q: str = Query(..., min_length=1, description="Code prefix (e.g. G43.) or title words"),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Autocomplete for ICD-10-GM codes.
+
+    - A code prefix such as "G4" or "G43." lists the codes starting with it.
+    - Otherwise every word must occur in the title; the last word may be
+      incomplete (e.g. "migräne mit au").
+
+    Served from the in-memory catalogue, without database access.
+    Accessible to all authenticated users.
+    """
+    return [ICD10Entry(code=code, title=title) for code, title in get_catalogue().search(q, limit)]
+
+
+@router.get("/icd10/{code}", response_model=ICD10Entry)
+async def get_icd10_code(
+    code: str,
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Look up a single ICD-10-GM code. Accepts common spellings
+    such as "g431" or "G43,1" and returns the normalised code.
+
+    Raises:
+    - HTTP 404 if the code is not in the catalogue
+    """
+    title = get_catalogue().lookup(code)
+    if title is None:
+        raise HTTPException(status_code=404, detail="ICD-10 code not found")
+    return ICD10Entry(code=normalize_code(code), title=title)
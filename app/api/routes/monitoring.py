@@ -0,0 +1,154 @@
+import asyncio
+import os
+
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import FileResponse, JSONResponse
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+from prometheus_client import multiprocess
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+from app.core.profiling import PROFILE_NAME_PATTERN, profile_dir
+from app.core.security import Principal, admin_only, password_queue_depth
+from app.core.warmup import warmup_state
+from app.db import async_engine, async_replica_engine, engine, replica_engine
+from app.utils.openai_client import llm_circuit
+from app.utils.pdf_generator import is_renderer_warm
+
+router = APIRouter()
+
+# Readiness fails if a database does not answer SELECT 1 within this time
+DB_CHECK_TIMEOUT_SECONDS = 2
+
+
+async def _check_database(async_db_engine) -> dict:
+    """Runs SELECT 1 on an async engine and reports whether it answered in time."""
+    async def ping():
+        async with async_db_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    try:
+        await asyncio.wait_for(ping(), timeout=DB_CHECK_TIMEOUT_SECONDS)
+    except Exception as exc:
+        return {"ok": False, "error": type(exc).__name__}
+    return {"ok": True}
+
+
+def _pool_status(pool) -> dict:
+    """Reports connections in use against the pool's capacity (size + overflow)."""
+    capacity = pool.size() + settings.db_max_overflow
+    checked_out = pool.checkedout()
+    saturation = checked_out / capacity if capacity else 0.0
+    return {
+        "ok": saturation < settings.readiness_pool_saturation,
+        "checked_out": checked_out,
+        "capacity": capacity,
+        "saturation": round(saturation, 2),
+    }
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """
+    Expose Prometheus metrics in the text exposition format.
+
+    With several uvicorn/gunicorn workers, export PROMETHEUS_MULTIPROC_DIR
+    (an empty, writable directory) before starting the server. Each worker
+    then writes its samples there and this endpoint aggregates all of them,
+    whichever worker handles the scrape.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+@router.get("/healthz", include_in_schema=False)
+async def healthz():
+    """
+    Liveness probe: the process is up and its event loop responds.
+
+    Does not touch any dependency, so a slow database never gets
+    a healthy worker restarted.
+    """
+    return {"status": "ok"}
+
+
+@router.get("/readyz", include_in_schema=False)
+async def readyz():
+    """
+    Readiness probe: whether this worker should receive traffic.
+
+    Returns 503 (so load balancers drain the worker) when:
+    - the startup warmup (pools, PDF renderer, OpenAI client) is still running
+    - the primary database or the read replica does not answer
+    - a connection pool is nearly exhausted (READINESS_POOL_SATURATION)
+    - the password hashing queue is full
+
+    The OpenAI circuit state and whether the PDF renderer is warm are
+    reported for information only; the worker can still serve everything else.
+    """
+    checks = {"warmup": warmup_state.as_dict()}
+    checks["database"] = await _check_database(async_engine)
+    if async_replica_engine is not async_engine:
+        checks["database_replica"] = await _check_database(async_replica_engine)
+
+    pools = {}
+    for db_engine in {engine, replica_engine, async_engine.sync_engine, async_replica_engine.sync_engine}:
+        if isinstance(db_engine.pool, QueuePool):
+            pools[db_engine.pool.logging_name] = _pool_status(db_engine.pool)
+    checks["pools"] = {"ok": all(pool["ok"] for pool in pools.values()), **pools}
+
+    depth = password_queue_depth()
+    checks["password_queue"] = {
+        "ok": depth < settings.password_hash_queue_size,
+        "depth": depth,
+        "limit": settings.password_hash_queue_size,
+    }
+
+    ready = all(check["ok"] for check in checks.values())
+
+    checks["llm"] = {"ok": True, "circuit": llm_circuit.state, "consecutive_failures": llm_circuit.failures}
+    checks["pdf_renderer"] = {"ok": True, "warm": is_renderer_warm()}
+
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "not_ready", "checks": checks}
+    )
+
+
+@router.get("/admin/profiles")
+def list_profiles(current_user: Principal = Depends(admin_only)):
+    """
+    List stored request profiles, newest first.
+
+    Profiles are recorded by sending a request with `X-Profile: 1`
+    (or `?profile=1`) as an admin; the response's `X-Profile-Id`
+    header names the profile. Profiles are stored per worker.
+
+    Only accessible to admin users.
+    """
+    paths = sorted(profile_dir().glob("*.folded"), reverse=True)
+    return [
+        {"name": path.name, "size": path.stat().st_size}
+        for path in paths
+    ]
+
+
+@router.get("/admin/profiles/{name}")
+def download_profile(name: str, current_user: Principal = Depends(admin_only)):
+    """
+    Download one request profile as folded stacks.
+
+    The file can be opened directly in speedscope or turned into an
+    SVG with `flamegraph.pl profile.folded > profile.svg`.
+
+    Only accessible to admin users.
+    """
+    path = profile_dir() / name
+    if not PROFILE_NAME_PATTERN.match(name) or not path.exists():
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    return FileResponse(path, media_type="text/plain", filename=name)
@@ -1,29 +1,266 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-
-from app.core.security import get_current_user
-from app.db import get_db
+import csv
+import io
+import json
+from datetime import date, datetime
+from tempfile import SpooledTemporaryFile
+from typing import Iterator, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import func, insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from starlette.concurrency import iterate_in_threadpool
+
+from app.core.report_context import apply_patient_saved, bump_context_version
+from app.core.security import Principal, get_current_user
+from app.db import get_async_db, get_async_read_db, get_db, get_read_db
 from app.models.address import Address
 from app.models.patient import Patient
 from app.models.profile import Profile
 from app.models.user import User
-from app.schemas.address import AddressOut
 from app.schemas.patient import (
-    DoctorSummary,
     PatientCreate,
     PatientDetail,
+    PatientDetailList,
+    PatientImportError,
+    PatientImportResult,
+    PatientSearchResult,
     PatientUpdate,
     PatientWithDoctor,
+    PatientWithDoctorList,
 )
 
 router = APIRouter()
 
+# Birth date formats accepted inside a typeahead query
+SEARCH_DATE_FORMATS = ("%d.%m.%Y", "%Y-%m-%d", "%d.%m.%y")
+
+
+def _parse_search_date(token: str) -> Optional[date]:
+    """Returns the date if the token is a birth date, otherwise None."""
+    for fmt in SEARCH_DATE_FORMATS:
+        try:
+            return datetime.strptime(token, fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _escape_like(value: str) -> str:
+    """Escapes LIKE wildcards so user input is matched literally."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _json_list_response(adapter: TypeAdapter, rows) -> Response:
+    """
+    Validates ORM rows in one pass with a precompiled TypeAdapter and
+    returns the JSON bytes directly, so FastAPI does not validate and
+    encode the list a second time through response_model.
+    """
+    items = adapter.validate_python(rows, from_attributes=True)
+    return Response(content=adapter.dump_json(items), media_type="application/json")
+
+
+# Rows written per multi-row INSERT/commit during bulk import
+IMPORT_BATCH_SIZE = 500
+
+# Uploads larger than this are spooled to disk instead of memory
+IMPORT_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+# A JSON array is parsed as a whole, so its size is capped; CSV and
+# NDJSON are read row by row and have no limit
+IMPORT_JSON_MAX_BYTES = 10 * 1024 * 1024
+
+ADDRESS_FIELDS = ("street", "postal_code", "city", "country")
+
+
+def _iter_csv_rows(upload) -> Iterator[tuple[int, dict]]:
+    """
+    Yields (row number, data) for each CSV line. Empty cells become None
+    and flat street/postal_code/city/country columns form the address.
+    """
+    reader = csv.DictReader(io.TextIOWrapper(upload, encoding="utf-8-sig", newline=""))
+    for row_number, row in enumerate(reader, start=1):
+        data = {
+            key.strip(): (value.strip() or None) if isinstance(value, str) else value
+            for key, value in row.items()
+            if key
+        }
+        address = {field: data.pop(field, None) for field in ADDRESS_FIELDS}
+        if any(address.values()):
+            data["address"] = address
+        yield row_number, data
+
+
+def _iter_ndjson_rows(upload) -> Iterator[tuple[int, object]]:
+    """Yields (row number, parsed object) for each non-empty NDJSON line."""
+    row_number = 0
+    for line in io.TextIOWrapper(upload, encoding="utf-8-sig"):
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            yield row_number, json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield row_number, exc
+
+
+def _iter_json_rows(upload) -> Iterator[tuple[int, object]]:
+    """
+    Yields (row number, object) for each element of a JSON array.
+    Unlike the other formats the whole array is parsed at once.
+    """
+    try:
+        rows = json.load(io.TextIOWrapper(upload, encoding="utf-8-sig"))
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Body is not valid JSON")
+    if not isinstance(rows, list):
+        raise HTTPException(status_code=400, detail="JSON body must be an array of patients")
+    yield from enumerate(rows, start=1)
+
+
+def _validated_batches(
+    upload,
+    parse_rows,
+    errors: list[PatientImportError]
+) -> Iterator[list[tuple[int, PatientCreate]]]:
+    """
+    Parses and validates the upload, yielding batches of up to
+    IMPORT_BATCH_SIZE valid rows. Invalid rows and duplicate emails
+    within the upload are added to `errors`.
+
+    Blocking (file reads, parsing, validation): iterate it in a thread.
+    """
+    seen_emails: set[str] = set()
+    batch: list[tuple[int, PatientCreate]] = []
+
+    for row_number, data in parse_rows(upload):
+        if isinstance(data, Exception):
+            errors.append(PatientImportError(row=row_number, errors=[f"Invalid JSON: {data}"]))
+            continue
+
+        try:
+            patient = PatientCreate.model_validate(data)
+        except ValidationError as exc:
+            errors.append(PatientImportError(
+                row=row_number,
+                email=data.get("email") if isinstance(data, dict) else None,
+                errors=[
+                    f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+                    for error in exc.errors()
+                ]
+            ))
+            continue
+
+        if patient.email in seen_emails:
+            errors.append(PatientImportError(
+                row=row_number,
+                email=patient.email,
+                errors=["Duplicate email in upload"]
+            ))
+            continue
+        seen_emails.add(patient.email)
+
+        batch.append((row_number, patient))
+        if len(batch) >= IMPORT_BATCH_SIZE:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+async def _insert_patient_batch(
+    db: AsyncSession,
+    batch: list[tuple[int, PatientCreate]],
+    assigned_doctor_id: int,
+    errors: list[PatientImportError]
+) -> int:
+    """
+    Writes one batch of validated rows with multi-row INSERTs.
+
+    Emails that already exist are checked with a single IN query and
+    reported as row errors. Returns the number of patients created.
+    """
+    emails = [patient.email for _, patient in batch]
+    existing = set(
+        (await db.execute(select(Profile.email).where(Profile.email.in_(emails)))).scalars()
+    )
+
+    rows = []
+    for row_number, patient in batch:
+        if patient.email in existing:
+            errors.append(PatientImportError(
+                row=row_number,
+                email=patient.email,
+                errors=["Email already exists"]
+            ))
+        else:
+            rows.append((row_number, patient))
+    if not rows:
+        return 0
+
+    try:
+        profile_ids = {
+            email: profile_id
+            for profile_id, email in await db.execute(
+                insert(Profile).returning(Profile.id, Profile.email),
+                [
+                    {
+                        "first_name": patient.first_name,
+                        "last_name": patient.last_name,
+                        "email": patient.email,
+                        "phone_number": patient.phone_number,
+                    }
+                    for _, patient in rows
+                ]
+            )
+        }
+
+        await db.execute(insert(Patient), [
+            {
+                "profile_id": profile_ids[patient.email],
+                "assigned_user_id": assigned_doctor_id,
+                "date_of_birth": patient.date_of_birth,
+                "gender": patient.gender,
+                "allergies": patient.allergies,
+                "past_illnesses": patient.past_illnesses,
+                "current_diagnosis": patient.current_diagnosis,
+                "notes": patient.notes,
+            }
+            for _, patient in rows
+        ])
+
+        addresses = [
+            {"profile_id": profile_ids[patient.email], **patient.address.model_dump()}
+            for _, patient in rows
+            if patient.address
+        ]
+        if addresses:
+            await db.execute(insert(Address), addresses)
+
+        await db.commit()
+    except IntegrityError as exc:
+        # e.g. an email created concurrently; the whole batch is rolled back
+        await db.rollback()
+        for row_number, patient in rows:
+            errors.append(PatientImportError(
+                row=row_number,
+                email=patient.email,
+                errors=[f"Batch rejected by database: {exc.orig}"]
+            ))
+        return 0
+
+    return len(rows)
+
 @router.post("/users/{user_id}/patients", response_model=PatientDetail)
 def create_patient(
     user_id: int,
     patient_data: PatientCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Create a new patient assigned to a doctor.
@@ -90,73 +327,110 @@ def create_patient(
     db.commit()
     db.refresh(patient)
 
-    # Use the first profile address if it exists, else None
-    addresses = patient.profile.addresses
-    address_obj = addresses[0] if addresses else None
-
-    return PatientDetail(
-        id=patient.id,
-        first_name=profile.first_name,
-        last_name=profile.last_name,
-        email=profile.email,
-        phone_number=profile.phone_number,
-        date_of_birth=patient.date_of_birth,
-        gender=patient.gender,
-        allergies=patient.allergies,
-        past_illnesses=patient.past_illnesses,
-        current_diagnosis=patient.current_diagnosis,
-        notes=patient.notes,
-        address=(
-            AddressOut.model_validate(address_obj)
-            if address_obj else None
+    return PatientDetail.model_validate(patient)
+
+
+@router.post("/users/{user_id}/patients/import", response_model=PatientImportResult)
+async def import_patients(
+    user_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Bulk-import patients from a CSV, NDJSON or JSON array upload.
+
+    - The format is taken from the Content-Type header
+      (text/csv, application/x-ndjson or application/json).
+    - Each row is validated with the same schema as single patient creation.
+      CSV files use flat street/postal_code/city/country columns.
+    - CSV and NDJSON are read row by row; a JSON array is parsed as a whole
+      and limited to IMPORT_JSON_MAX_BYTES (413 above that).
+    - Valid rows are written in batches with multi-row inserts. Duplicate
+      emails are checked per batch with one query.
+    - Returns the number of imported rows and a per-row error report.
+
+    Doctor assignment follows the same rules as creating a single patient.
+    """
+    if current_user.role == "doctor":
+        assigned_doctor_id = current_user.id
+    elif current_user.role in ["assistant", "admin"]:
+        doctor = (await db.execute(
+            select(User.id).where(User.id == user_id, User.role == "doctor")
+        )).first()
+        if not doctor:
+            raise HTTPException(status_code=404, detail="Doctor not found")
+        assigned_doctor_id = user_id
+    else:
+        raise HTTPException(
+            status_code=403,
+            detail="Not authorized to register patients"
+        )
+
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type in ("text/csv", "application/csv"):
+        parse_rows = _iter_csv_rows
+    elif content_type in ("application/x-ndjson", "application/jsonl"):
+        parse_rows = _iter_ndjson_rows
+    elif content_type == "application/json":
+        parse_rows = _iter_json_rows
+    else:
+        raise HTTPException(
+            status_code=415,
+            detail="Use text/csv, application/x-ndjson or application/json"
         )
+
+    imported = 0
+    errors: list[PatientImportError] = []
+
+    with SpooledTemporaryFile(max_size=IMPORT_SPOOL_MAX_BYTES) as upload:
+        # Receive the streamed body without holding all of it in memory
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if parse_rows is _iter_json_rows and received > IMPORT_JSON_MAX_BYTES:
+                raise HTTPException(
+                    status_code=413,
+                    detail="JSON array too large, upload large imports as NDJSON or CSV"
+                )
+            upload.write(chunk)
+        upload.seek(0)
+
+        # Parsing and validation run in a worker thread, one batch at a
+        # time, so a large import does not block the event loop
+        async for batch in iterate_in_threadpool(_validated_batches(upload, parse_rows, errors)):
+            imported += await _insert_patient_batch(db, batch, assigned_doctor_id, errors)
+
+    errors.sort(key=lambda error: error.row)
+    return PatientImportResult(
+        imported=imported,
+        failed=len(errors),
+        errors=errors
     )
 
 
 @router.get("/users/{user_id}/patients", response_model=list[PatientDetail])
-def list_patients_for_doctor(
+async def list_patients_for_doctor(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Return all patients assigned to a specific doctor.
     Used by the doctor and assistants.
     """
-    doctor = db.query(User).filter(User.id == user_id).first()
+    doctor = await db.get(User, user_id)
     if not doctor:
         raise HTTPException(status_code=404, detail="Doctor not found")
 
-    patients = (
-        db.query(Patient)
+    # Relationships are loaded up front, async sessions cannot lazy-load
+    result = await db.execute(
+        select(Patient)
         .filter(Patient.assigned_user_id == user_id)
         .join(Profile)
-        .all()
+        .options(selectinload(Patient.profile).selectinload(Profile.addresses))
     )
-
-    result = []
-    for patient in patients:
-        profile = patient.profile
-        addresses = profile.addresses
-        address = addresses[0] if addresses else None
-
-        result.append(PatientDetail(
-            id=patient.id,
-            first_name=profile.first_name,
-            last_name=profile.last_name,
-            email=profile.email,
-            phone_number=profile.phone_number,
-            date_of_birth=patient.date_of_birth,
-            gender=patient.gender,
-            allergies=patient.allergies,
-            past_illnesses=patient.past_illnesses,
-            current_diagnosis=patient.current_diagnosis,
-            notes=patient.notes,
-            address=AddressOut.model_validate(address) if address else None
-
-        ))
-
-    return result
+    return _json_list_response(PatientDetailList, result.scalars().all())
 
 
 @router.patch("/users/{user_id}/patients/{patient_id}", response_model=PatientDetail)
@@ -165,7 +439,7 @@ def update_patient(
     patient_id: int,
     updates: PatientUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Update an existing patient's profile, medical info, and/or address.
@@ -215,30 +489,12 @@ def update_patient(
         if value is not None:
             setattr(patient, field, value)
 
+    version = bump_context_version(db, patient_id)
     db.commit()
     db.refresh(patient)
 
-    # Get the first address if any exist
-    addresses = patient.profile.addresses
-    address_obj = addresses[0] if addresses else None
-
-    return PatientDetail(
-        id=patient.id,
-        first_name=patient.profile.first_name,
-        last_name=patient.profile.last_name,
-        email=patient.profile.email,
-        phone_number=patient.profile.phone_number,
-        date_of_birth=patient.date_of_birth,
-        gender=patient.gender,
-        allergies=patient.allergies,
-        past_illnesses=patient.past_illnesses,
-        current_diagnosis=patient.current_diagnosis,
-        notes=patient.notes,
-        address=(
-            AddressOut.model_validate(address_obj)
-            if address_obj else None
-        )
-    )
+    apply_patient_saved(patient, version)
+    return PatientDetail.model_validate(patient)
 
 
 @router.delete("/users/{user_id}/patients/{patient_id}")
@@ -246,7 +502,7 @@ def delete_patient(
     user_id: int,
     patient_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Deletes a patient and their associated profile.
@@ -269,47 +525,94 @@ def delete_patient(
 
 
 @router.get("/patients", response_model=list[PatientWithDoctor])
-def get_all_patients_with_doctors(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def get_all_patients_with_doctors(
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Returns all patients assigned to the specified doctor,
     including full profile and medical information.
     Accessible to doctors, assistants, and admins.
     """
-    patients = db.query(Patient).all()
-    results = []
-
-    for patient in patients:
-        profile = patient.profile
-        address = profile.addresses[0] if profile.addresses else None
-        doctor = patient.doctor
-
-        results.append(
-            PatientWithDoctor(
-                id=patient.id,
-                first_name=profile.first_name,
-                last_name=profile.last_name,
-                email=profile.email,
-                phone_number=profile.phone_number,
-                date_of_birth=patient.date_of_birth,
-                gender=patient.gender,
-                allergies=patient.allergies,
-                past_illnesses=patient.past_illnesses,
-                current_diagnosis=patient.current_diagnosis,
-                notes=patient.notes,
-                address=AddressOut.model_validate(address)
-                if address else None,
-                assigned_doctor=DoctorSummary(
-                    id=doctor.id,
-                    title=doctor.title,
-                    first_name=doctor.profile.first_name,
-                    last_name=doctor.profile.last_name,
-                    email=doctor.profile.email
-                )
-            )
+    result = await db.execute(
+        select(Patient).options(
+            selectinload(Patient.profile).selectinload(Profile.addresses),
+            selectinload(Patient.doctor).selectinload(User.profile),
         )
+    )
+    return _json_list_response(PatientWithDoctorList, result.scalars().all())
+
+
+@router.get("/patients/search", response_model=list[PatientSearchResult])
+def search_patients(
+    q: str = Query(..., min_length=1, description="Name, email and/or birth date"),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Typeahead search for patients by name, email or birth date.
+
+    - Names are matched with trigram word similarity, ignoring case,
+      accents and umlaut spellings ("Mueller" finds "Müller").
+    - Input containing "@" is treated as an email prefix.
+    - Tokens like 01.05.1970 or 1970-05-01 filter by date of birth.
 
-    return results
+    Returns the best `limit` matches. Accessible to all authenticated users.
+    """
+    terms = []
+    date_of_birth = None
+    for token in q.split():
+        parsed = _parse_search_date(token)
+        if parsed and date_of_birth is None:
+            date_of_birth = parsed
+        else:
+            terms.append(token)
+    text = " ".join(terms)
+
+    if not text and date_of_birth is None:
+        return []
+
+    stmt = (
+        select(
+            Patient.id,
+            Profile.first_name,
+            Profile.last_name,
+            Profile.email,
+            Patient.date_of_birth,
+            Patient.assigned_user_id,
+        )
+        .join(Profile, Patient.profile_id == Profile.id)
+    )
+
+    if date_of_birth is not None:
+        stmt = stmt.where(Patient.date_of_birth == date_of_birth)
+
+    if text:
+        email_key = func.lower(Profile.email)
+        if "@" in text:
+            # Email prefix match, served by the email trigram index
+            stmt = stmt.where(
+                email_key.like(_escape_like(text.lower()) + "%", escape="\\")
+            )
+            score = func.similarity(email_key, text.lower())
+        else:
+            # Expressions must match the indexes in the typeahead migration
+            name_key = func.search_normalize(
+                Profile.first_name + " " + Profile.last_name
+            )
+            needle = func.search_normalize(text)
+            stmt = stmt.where(or_(
+                needle.bool_op("<%")(name_key),
+                func.lower(text).bool_op("<%")(email_key),
+            ))
+            score = func.greatest(
+                func.word_similarity(needle, name_key),
+                func.word_similarity(func.lower(text), email_key),
+            )
+        stmt = stmt.order_by(score.desc(), Profile.last_name, Profile.first_name)
+    else:
+        stmt = stmt.order_by(Profile.last_name, Profile.first_name)
 
+    rows = db.execute(stmt.limit(limit)).all()
+    return [PatientSearchResult.model_validate(row) for row in rows]
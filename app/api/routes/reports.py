@@ -1,16 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from fastapi.responses import FileResponse
+from sqlalchemy import desc, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session, joinedload
 
 from datetime import datetime
+from typing import Optional
 import os
-import re
-from pathlib import Path
 
-from jinja2 import Environment, FileSystemLoader
-from weasyprint import HTML
-
-from app.db import get_db
+from app.db import get_async_read_db, get_db, get_read_db
 from app.models.medical_report import MedicalReport
 from app.models.patient import Patient
 from app.models.profile import Profile
@@ -19,34 +17,120 @@ from app.schemas.medical_report import (
     MedicalReportCreate,
     MedicalReportUpdate,
     MedicalReportOut,
+    MedicalReportPreflight,
+    MedicalReportSearchHit,
+    MedicalReportSearchPage,
+)
+from app.core.config import settings
+from app.core.report_context import (
+    PatientContext,
+    apply_report_deleted,
+    apply_report_saved,
+    bump_context_version,
+    load_patient_context,
+    select_previous_reports,
 )
-from app.core.security import get_current_user, require_doctor_or_admin
-from app.utils.openai_client import generate_medical_report, extract_diagnosis_block
+from app.core.security import Principal, get_current_user, require_doctor_or_admin
+from app.core.usage import estimate_generation, record_generation
+from app.utils.icd10 import code_from_diagnosis, get_catalogue
+from app.utils.openai_client import (
+    LLMUnavailableError,
+    extract_diagnosis_block,
+    generate_medical_report,
+    plan_generation,
+)
+from app.utils.pdf_generator import STATIC_DIR, get_template_env, render_pdf
+from app.utils.report_html import render_report_html
+from app.utils.retrieval import report_document, report_indexes
 
 router = APIRouter()
 
-BASE_DIR = Path(__file__).resolve().parents[2]
-TEMPLATE_DIR = BASE_DIR / "templates"
-STATIC_DIR = os.path.abspath(BASE_DIR / "static")
+# Options passed to ts_headline when building highlighted search snippets
+SEARCH_HEADLINE_OPTIONS = (
+    "StartSel=<mark>, StopSel=</mark>, MaxWords=30, MinWords=12, "
+    "MaxFragments=2, FragmentDelimiter=\" … \""
+)
 
-env = Environment(loader=FileSystemLoader(str(TEMPLATE_DIR)))
 
-def format_report_sections(text: str) -> str:
+def _generation_args(
+        db: Session,
+        patient_id: int,
+        report_data: MedicalReportCreate
+) -> tuple[PatientContext, list[int], dict]:
     """
-    Converts markdown-like **section** formatting into HTML
-    and replaces newlines with <br>.
+    Assembles what a report generation for the patient is based on:
+    the cached patient context and the most relevant previous reports.
+
+    Returns:
+        tuple[PatientContext, list[int], dict]: The patient context, ids of the
+            previous reports used, and the keyword arguments for
+            generate_medical_report / plan_generation.
+
+    Raises:
+        HTTPException: 404 if the patient does not exist.
     """
-    if not text:
-        return ""
+    context = load_patient_context(db, patient_id)
+    if not context:
+        raise HTTPException(status_code=404, detail="Patient not found")
 
-    # Convert **Section:** to <p><strong>Section:</strong></p>
-    formatted = re.sub(r"\*\*(.+?):\*\*", r"<strong>\1:</strong>", text)
+    # Get the most relevant previous reports (if any) to provide
+    # context for generating the new medical report
+    previous_ids = select_previous_reports(
+        context,
+        query=f"{report_data.title}\n{report_data.patient_history}\n{report_data.physical_exam}",
+        k=settings.report_context_top_k
+    )
 
-    # Convert remaining newlines into <br> for HTML formatting
-    formatted = formatted.replace("\n\n", "<br><br>")
-    formatted = formatted.replace("\n", "<br>")
+    return context, previous_ids, dict(
+        title=report_data.title,
+        history=report_data.patient_history,
+        exam=report_data.physical_exam,
+        gender=context.gender,
+        allergies=context.allergies,
+        past_illnesses=context.past_illnesses,
+        current_dx=context.current_dx,
+        notes=context.notes,
+        previous_reports=[context.reports[i].final_report for i in previous_ids],
+        patient_dob=context.date_of_birth,
+        # The short follow-up budget only applies when the client asks for it
+        report_type=report_data.report_type or "initial"
+    )
 
-    return formatted.strip()
+
+@router.post("/patients/{patient_id}/reports/preflight", response_model=MedicalReportPreflight)
+def preflight_report(
+    patient_id: int,
+    report_data: MedicalReportCreate,
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Estimate a report generation without running it.
+
+    Takes the same body as creating a report and assembles the same
+    prompt, but does not call OpenAI. Returns the route and model that
+    would be used, the estimated prompt and completion tokens, the
+    expected latency and the previous reports that would be included.
+
+    Cheap enough to call while the doctor is typing: the patient context
+    and latency statistics are cached, and the prompt size is estimated
+    without a tokenizer.
+    """
+    context, previous_ids, generation_args = _generation_args(db, patient_id, report_data)
+    plan = plan_generation(**generation_args)
+    completion_tokens, latency_ms = estimate_generation(db, plan.route, plan.input_tokens)
+
+    return MedicalReportPreflight(
+        report_type=plan.report_type,
+        route=plan.route.name,
+        model=plan.route.model,
+        max_tokens=plan.route.max_tokens,
+        estimated_prompt_tokens=plan.input_tokens,
+        estimated_completion_tokens=completion_tokens,
+        expected_latency_ms=latency_ms,
+        included_report_ids=previous_ids,
+        available_reports=len(context.reports)
+    )
 
 
 @router.post("/patients/{patient_id}/reports", response_model=MedicalReportOut, status_code=201)
@@ -54,76 +138,167 @@ def create_report(
     patient_id: int,
     report_data: MedicalReportCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Generate and store a medical report for a given patient using OpenAI.
 
-    - Retrieves previous reports for context.
-    - Calls AI to generate a new final report.
-    - Saves the complete report to the database.
-    """
-    patient = db.query(Patient).filter_by(id=patient_id).first()
-    if not patient:
-        raise HTTPException(status_code=404, detail="Patient not found")
+    - Uses the patient's cached generation context (see app.core.report_context).
+    - Picks the previous reports most relevant to the new history
+      and exam as context (REPORT_CONTEXT_TOP_K).
+    - Calls AI to generate a new final report, with the model and output
+      budget chosen by report type and prompt size (LLM_ROUTES).
+    - Saves the complete report and its HTML rendering to the database,
+      with the generation's tokens and latency (see app.core.usage).
 
-    # Get previous reports (if any) to provide context
-    # for generating the new medical report
-    previous_reports = []
-    for report in patient.reports:
-        if report.final_report:
-            previous_reports.append(report.final_report)
+    Returns 503 while report generation is unavailable
+    (OpenAI circuit breaker open after repeated failures).
+    """
+    _, _, generation_args = _generation_args(db, patient_id, report_data)
 
     # Call OpenAI to generate the final report
-    final_report = generate_medical_report(
-        title=report_data.title,
-        history=report_data.patient_history,
-        exam=report_data.physical_exam,
-        gender=patient.gender,
-        allergies=patient.allergies or "",
-        past_illnesses=patient.past_illnesses or "",
-        current_dx=patient.current_diagnosis or "",
-        notes=patient.notes or "",
-        previous_reports=previous_reports
-    )
+    try:
+        generated = generate_medical_report(**generation_args)
+    except LLMUnavailableError as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "30"})
 
-    # Save to DB
+    # Save to DB, with the generation's token usage and latency
+    final_report = generated.text
     report = MedicalReport(
         patient_id=patient_id,
         title=report_data.title,
         patient_history=report_data.patient_history,
         physical_exam=report_data.physical_exam,
-        final_report=final_report
+        final_report=final_report,
+        final_report_html=render_report_html(final_report),
+        icd10_code=code_from_diagnosis(extract_diagnosis_block(final_report)["icd"])
     )
     db.add(report)
+    record_generation(db, report, current_user.id, generated)
+    version = bump_context_version(db, patient_id)
     db.commit()
     db.refresh(report)
+
+    apply_report_saved(report, version)
+    report_indexes.update(patient_id, report.id, report.updated_at, report_document(
+        report.title, report.patient_history, report.physical_exam, report.final_report
+    ))
     return report
 
 
 @router.get("/patients/{patient_id}/reports", response_model=list[MedicalReportOut])
-def list_reports_for_patient(
+async def list_reports_for_patient(
     patient_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Retrieve all medical reports for a given patient.
     Accessible to all authenticated users.
     """
-    return db.query(MedicalReport).filter_by(patient_id=patient_id).all()
+    result = await db.execute(
+        select(MedicalReport).filter_by(patient_id=patient_id)
+    )
+    return result.scalars().all()
+
+@router.get("/reports/search", response_model=MedicalReportSearchPage)
+def search_reports(
+    q: str = Query(..., min_length=2, description="Search terms (web search syntax)"),
+    patient_id: Optional[int] = Query(None, description="Restrict to one patient"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Full-text search over title, history, exam and final report.
+
+    - Uses the German text configuration, so "Kopfschmerzen" also
+      matches "Kopfschmerz".
+    - Supports quoted phrases, "or" and "-word" exclusions.
+    - Results are ranked and include highlighted snippets.
+
+    Accessible to all authenticated users.
+    """
+    ts_query = func.websearch_to_tsquery("german", q)
+    matches = MedicalReport.search_vector.bool_op("@@")(ts_query)
+
+    filters = [matches]
+    if patient_id is not None:
+        filters.append(MedicalReport.patient_id == patient_id)
+
+    total = db.execute(
+        select(func.count()).select_from(MedicalReport).where(*filters)
+    ).scalar_one()
+
+    # Rank and paginate first so ts_headline only runs for the rows returned
+    page = (
+        select(
+            MedicalReport.id,
+            MedicalReport.patient_id,
+            MedicalReport.title,
+            MedicalReport.created_at,
+            func.concat_ws(
+                "\n",
+                MedicalReport.final_report,
+                MedicalReport.patient_history,
+                MedicalReport.physical_exam
+            ).label("document"),
+            func.ts_rank_cd(MedicalReport.search_vector, ts_query).label("rank"),
+        )
+        .where(*filters)
+        .order_by(desc("rank"), MedicalReport.id.desc())
+        .limit(limit)
+        .offset(offset)
+        .subquery()
+    )
+
+    rows = db.execute(
+        select(
+            page.c.id,
+            page.c.patient_id,
+            page.c.title,
+            page.c.created_at,
+            page.c.rank,
+            func.ts_headline(
+                "german",
+                page.c.document,
+                ts_query,
+                SEARCH_HEADLINE_OPTIONS
+            ).label("snippet"),
+        ).order_by(page.c.rank.desc(), page.c.id.desc())
+    ).all()
+
+    return MedicalReportSearchPage(
+        query=q,
+        total=total,
+        limit=limit,
+        offset=offset,
+        items=[
+            MedicalReportSearchHit(
+                id=row.id,
+                patient_id=row.patient_id,
+                title=row.title,
+                rank=row.rank,
+                snippet=row.snippet,
+                created_at=row.created_at
+            )
+            for row in rows
+        ]
+    )
+
 
 @router.get("/reports/{report_id}", response_model=MedicalReportOut)
-def get_report_by_id(
+async def get_report_by_id(
     report_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Retrieve a specific medical report by its ID.
     Accessible to all authenticated users.
     """
-    report = db.query(MedicalReport).filter_by(id=report_id).first()
+    report = await db.get(MedicalReport, report_id)
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
     return report
@@ -134,22 +309,46 @@ def update_report(
     report_id: int,
     updates: MedicalReportUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_doctor_or_admin)
+    current_user: Principal = Depends(require_doctor_or_admin)
 ):
     """
     Update a medical report by its ID.
     Only accessible to doctors and administrators.
+
+    Editing final_report re-derives the ICD-10 code unless icd10_code is
+    given as well. A given icd10_code is normalised (e.g. "g431" -> "G43.1")
+    and must be valid (see ICD10Catalogue.validate), otherwise HTTP 422 is returned.
     """
     report = db.query(MedicalReport).filter_by(id=report_id).first()
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
 
     # update only the fields that were provided in the request
-    for field, value in updates.dict(exclude_unset=True).items():
+    changes = updates.dict(exclude_unset=True)
+    for field, value in changes.items():
         setattr(report, field, value)
 
+    # Keep the stored HTML and ICD-10 code in step with the edited text.
+    # A code set explicitly must be in the catalogue.
+    if "final_report" in changes:
+        report.final_report_html = render_report_html(report.final_report)
+    if changes.get("icd10_code"):
+        report.icd10_code = get_catalogue().validate(changes["icd10_code"])
+        if not report.icd10_code:
+            raise HTTPException(status_code=422, detail="Unknown ICD-10 code")
+    elif "final_report" in changes and "icd10_code" not in changes:
+        report.icd10_code = code_from_diagnosis(
+            extract_diagnosis_block(report.final_report or "")["icd"]
+        )
+
+    version = bump_context_version(db, report.patient_id)
     db.commit()
     db.refresh(report)
+
+    apply_report_saved(report, version)
+    report_indexes.update(report.patient_id, report.id, report.updated_at, report_document(
+        report.title, report.patient_history, report.physical_exam, report.final_report
+    ))
     return report
 
 
@@ -157,7 +356,7 @@ def update_report(
 def delete_report(
     report_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_doctor_or_admin)
+    current_user: Principal = Depends(require_doctor_or_admin)
 ):
     """
     Delete a specific medical report by ID.
@@ -168,15 +367,19 @@ def delete_report(
         raise HTTPException(status_code=404, detail="Report not found")
 
     db.delete(report)
+    version = bump_context_version(db, report.patient_id)
     db.commit()
+
+    apply_report_deleted(report.patient_id, report_id, version)
+    report_indexes.discard(report.patient_id, report_id)
     return {"message": f"Report {report_id} deleted"}
 
 
 @router.get("/reports/{report_id}/pdf")
 def generate_report_pdf(
     report_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: Principal = Depends(get_current_user)
 ):
     """
     Generate and return a PDF version of a medical report.
@@ -223,8 +426,11 @@ def generate_report_pdf(
     patient_profile = patient.profile
     patient_address = patient_profile.addresses[0] if patient_profile and patient_profile.addresses else None
 
-    # Convert formatted sections (like **Diagnosis**) into styled HTML
-    formatted_report = format_report_sections(report.final_report)
+    # HTML is stored when the report is written;
+    # reports saved before that are rendered here
+    formatted_report = report.final_report_html
+    if formatted_report is None:
+        formatted_report = render_report_html(report.final_report)
     diagnosis_block = extract_diagnosis_block(report.final_report)
 
     #Prepare logo path before rendering
@@ -233,7 +439,7 @@ def generate_report_pdf(
 
     # Load the HTML template
     # and populate it with report, patient, and doctor data
-    template = env.get_template("report_template.html")
+    template = get_template_env().get_template("report_template.html")
     rendered_html = template.render(
         # Doctor Info
         practice_name=doctor_user.practice_name or "Praxis",
@@ -274,7 +480,7 @@ def generate_report_pdf(
     )
 
     # Generate PDF from rendered HTML
-    pdf = HTML(string=rendered_html).write_pdf()
+    pdf = render_pdf(rendered_html)
 
     filename = f'attachment; filename="arztbrief_{report_id}.pdf"'
 
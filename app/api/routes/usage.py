@@ -0,0 +1,140 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.security import Principal, admin_only, get_current_user
+from app.db import get_async_read_db
+from app.models.usage import ReportGeneration, UsageDaily
+from app.models.user import User
+from app.schemas.usage import PracticeUsage, ReportGenerationOut, UsageDay, UsageTotals, UserUsage
+
+router = APIRouter()
+
+# Range used when a usage query gives no start date
+DEFAULT_USAGE_DAYS = 30
+
+
+def _date_range(start: Optional[date], end: Optional[date]) -> tuple[date, date]:
+    """Fills in the default range (last DEFAULT_USAGE_DAYS days, UTC) and checks its order."""
+    end = end or datetime.now(timezone.utc).date()
+    start = start or end - timedelta(days=DEFAULT_USAGE_DAYS - 1)
+    if start > end:
+        raise HTTPException(status_code=422, detail="start must not be after end")
+    return start, end
+
+
+def _totals_columns():
+    """Aggregates of usage_daily rows, labelled like UsageTotals."""
+    return (
+        func.coalesce(func.sum(UsageDaily.generations), 0).label("generations"),
+        func.coalesce(func.sum(UsageDaily.prompt_tokens), 0).label("prompt_tokens"),
+        func.coalesce(func.sum(UsageDaily.completion_tokens), 0).label("completion_tokens"),
+        func.coalesce(func.sum(UsageDaily.cached_tokens), 0).label("cached_tokens"),
+        func.coalesce(func.sum(UsageDaily.latency_ms_total), 0).label("latency_ms_total"),
+        func.coalesce(func.max(UsageDaily.latency_ms_max), 0).label("max_latency_ms"),
+    )
+
+
+def _totals(row) -> dict:
+    """UsageTotals fields from a row selected with _totals_columns."""
+    return {
+        "generations": row.generations,
+        "prompt_tokens": row.prompt_tokens,
+        "completion_tokens": row.completion_tokens,
+        "cached_tokens": row.cached_tokens,
+        "avg_latency_ms": round(row.latency_ms_total / row.generations, 1) if row.generations else 0.0,
+        "max_latency_ms": row.max_latency_ms,
+    }
+
+
+@router.get("/reports/{report_id}/generations", response_model=list[ReportGenerationOut])
+async def list_report_generations(
+    report_id: int,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    List the OpenAI calls that generated a report, with model,
+    token usage, prompt cache status and latency.
+    Accessible to all authenticated users.
+    """
+    result = await db.execute(
+        select(ReportGeneration)
+        .filter_by(report_id=report_id)
+        .order_by(ReportGeneration.id)
+    )
+    return result.scalars().all()
+
+
+@router.get("/usage/users/{user_id}", response_model=UserUsage)
+async def get_user_usage(
+    user_id: int,
+    start: Optional[date] = Query(None, description="First day (UTC); defaults to 30 days before end"),
+    end: Optional[date] = Query(None, description="Last day (UTC); defaults to today"),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(get_current_user)
+):
+    """
+    Report generation usage of a user per day and model, with totals.
+
+    Read from the daily rollups, so the cost does not grow with the
+    number of generations. Users may read their own usage; admins any.
+
+    Raises:
+    - HTTP 403 if a non-admin asks for another user's usage
+    """
+    if current_user.role != "admin" and current_user.id != user_id:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    start, end = _date_range(start, end)
+
+    in_range = (UsageDaily.user_id == user_id, UsageDaily.day.between(start, end))
+    days = await db.execute(
+        select(UsageDaily.day, UsageDaily.model, *_totals_columns())
+        .where(*in_range)
+        .group_by(UsageDaily.day, UsageDaily.model)
+        .order_by(UsageDaily.day, UsageDaily.model)
+    )
+    totals = (await db.execute(select(*_totals_columns()).where(*in_range))).one()
+
+    return UserUsage(
+        user_id=user_id,
+        start=start,
+        end=end,
+        totals=UsageTotals(**_totals(totals)),
+        days=[UsageDay(day=row.day, model=row.model, **_totals(row)) for row in days]
+    )
+
+
+@router.get("/usage/practices", response_model=list[PracticeUsage])
+async def get_practice_usage(
+    start: Optional[date] = Query(None, description="First day (UTC); defaults to 30 days before end"),
+    end: Optional[date] = Query(None, description="Last day (UTC); defaults to today"),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: Principal = Depends(admin_only)
+):
+    """
+    Report generation usage per practice (users' practice_name),
+    most tokens first. Read from the daily rollups.
+
+    Only admins can access this route.
+    """
+    start, end = _date_range(start, end)
+
+    result = await db.execute(
+        select(
+            User.practice_name,
+            func.count(func.distinct(UsageDaily.user_id)).label("users"),
+            *_totals_columns()
+        )
+        .join(User, User.id == UsageDaily.user_id)
+        .where(UsageDaily.day.between(start, end))
+        .group_by(User.practice_name)
+        .order_by((func.sum(UsageDaily.prompt_tokens) + func.sum(UsageDaily.completion_tokens)).desc())
+    )
+    return [
+        PracticeUsage(practice_name=row.practice_name, users=row.users, **_totals(row))
+        for row in result
+    ]
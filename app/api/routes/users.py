@@ -1,24 +1,29 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.db import get_db
+from app.db import get_async_db, get_db, get_read_db
 from app.models import Address
 from app.models.profile import Profile
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate, PasswordReset
 from app.core.security import (
-    get_password_hash,
+    Principal,
+    get_password_hash_async,
     admin_only,
     get_current_user,
+    invalidate_principal,
+    record_user_change,
 )
 
 router = APIRouter()
 
 @router.post("/users", status_code=201)
-def create_user(
+async def create_user(
     user_data: UserCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(admin_only)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(admin_only)
 ):
     """
     Create a new user (admin, doctor, or assistant).
@@ -26,9 +31,15 @@ def create_user(
     Only accessible to admin users.
     """
     # Prevent duplicate email across users
-    if db.query(Profile).filter_by(email=user_data.email).first():
+    existing = await db.execute(
+        select(Profile.id).filter_by(email=user_data.email).limit(1)
+    )
+    if existing.first():
         raise HTTPException(status_code=400, detail="Email already exists")
 
+    # Hash on the password executor before writing anything
+    password_hash = await get_password_hash_async(user_data.password)
+
     # Create and persist the profile
     profile = Profile(
         email=user_data.email,
@@ -37,7 +48,7 @@ def create_user(
         phone_number=user_data.phone_number
     )
     db.add(profile)
-    db.flush() # Assigns profile.id
+    await db.flush() # Assigns profile.id
 
     # Default doctor title if none provided
     if user_data.title:
@@ -51,7 +62,7 @@ def create_user(
     user = User(
         profile_id=profile.id,
         role=user_data.role,
-        password_hash=get_password_hash(user_data.password),
+        password_hash=password_hash,
         title=title,
         specialization=user_data.specialization,
         practice_name=user_data.practice_name
@@ -69,13 +80,12 @@ def create_user(
         )
         db.add(address)
 
-    db.commit()
-    db.refresh(user)
+    await db.commit()
     return {"message": "User created", "user_id": user.id}
 
 
 @router.get("/debug/users")
-def get_all_users(db: Session = Depends(get_db)):
+def get_all_users(db: Session = Depends(get_read_db)):
     """
     Retrieve a list of all users with their profiles and addresses.
     Intended for debugging or admin use.
@@ -118,7 +128,7 @@ def get_all_users(db: Session = Depends(get_db)):
 
 
 @router.get("/me")
-def read_own_profile(current_user: User = Depends(get_current_user)):
+def read_own_profile(current_user: Principal = Depends(get_current_user)):
     """
     Retrieve the profile information of the currently authenticated user.
     """
@@ -136,7 +146,7 @@ def update_user_partial(
     user_id: int,
     user_update: UserUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(admin_only)
+    current_user: Principal = Depends(admin_only)
 ):
     """
     Partially update a user's account and profile information.
@@ -147,6 +157,10 @@ def update_user_partial(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    # A role change revokes all tokens issued with the old role
+    if user_update.role is not None and user_update.role != user.role:
+        user.token_version += 1
+
     # Update User fields (role, title, etc.)
     for key in ["role", "title", "specialization", "practice_name"]:
         value = getattr(user_update, key)
@@ -171,7 +185,9 @@ def update_user_partial(
         for field, value in address_fields.items():
             setattr(address, field, value)
 
+    record_user_change(db, user_id)
     db.commit()
+    invalidate_principal(user_id)
     db.refresh(user)
 
     # Prepare address data for response
@@ -203,7 +219,7 @@ def update_user_partial(
 def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(admin_only)
+    current_user: Principal = Depends(admin_only)
 ):
     """
     Delete a user and their associated profile.
@@ -223,31 +239,41 @@ def delete_user(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Delete user and their associated profile
+    # Delete user and their associated profile. Their tokens are rejected
+    # once the cached principal is dropped: here after commit, on other
+    # workers at their next revocation sync.
     profile = user.profile
     db.delete(user)
     if profile:
         db.delete(profile)
 
+    record_user_change(db, user_id)
     db.commit()
+    invalidate_principal(user_id)
     return {"message": f"User {user_id} and profile deleted"}
 
 
 @router.post("/users/{user_id}/reset-password")
-def reset_password(
+async def reset_password(
     user_id: int,
     password_data: PasswordReset,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(admin_only)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Principal = Depends(admin_only)
 ):
     """
     Admin-only endpoint to reset a user's password.
     """
-    user = db.query(User).filter(User.id == user_id).first()
+    # Hash first, so no connection is held while bcrypt runs
+    password_hash = await get_password_hash_async(password_data.new_password)
+
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Set new hashed password
-    user.password_hash = get_password_hash(password_data.new_password)
-    db.commit()
-    return {"message": f"Password for user {user_id} has been reset"}
\ No newline at end of file
+    # Set new hashed password and sign out all existing sessions
+    user.password_hash = password_hash
+    user.token_version += 1
+    record_user_change(db, user_id)
+    await db.commit()
+    invalidate_principal(user_id)
+    return {"message": f"Password for user {user_id} has been reset"}
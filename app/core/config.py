@@ -1,23 +1,133 @@
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings
 
+# .env lives in the project root, independent of the working directory
+ENV_FILE = Path(__file__).resolve().parents[2] / ".env"
+
+class LLMRoute(BaseModel):
+    """
+    One entry of the report generation routing policy (Settings.llm_routes).
+
+    A route applies when the report type is in `report_types` (any type
+    if unset) and the estimated prompt tokens are at most
+    `max_input_tokens` (any size if unset).
+    """
+    name: str
+    model: str
+    max_tokens: int
+    temperature: float = 0.6
+    report_types: Optional[list[str]] = None
+    max_input_tokens: Optional[int] = None
+
+
+# Short follow-ups get a smaller output budget; prompts too long for
+# gpt-3.5-turbo's 16k context go to a model with a larger one
+DEFAULT_LLM_ROUTES = [
+    LLMRoute(name="follow_up", model="gpt-3.5-turbo", max_tokens=1200,
+             report_types=["follow_up"], max_input_tokens=2000),
+    LLMRoute(name="standard", model="gpt-3.5-turbo", max_tokens=3000, max_input_tokens=12000),
+    LLMRoute(name="long", model="gpt-4o-mini", max_tokens=4000),
+]
+
+
 class Settings(BaseSettings):
     """
     App configuration settings loaded from the environment (.env file).
 
     Attributes:
         database_url (str): SQLAlchemy-compatible database connection string.
+        database_replica_url (str, optional): Read-only replica used by GET routes.
+            Falls back to database_url when unset.
+        db_echo (bool): Log every SQL statement (development only).
+        db_pool_size (int): Connections kept open per engine.
+        db_max_overflow (int): Extra connections allowed above the pool size.
+        db_pool_timeout (int): Seconds to wait for a free connection before failing.
+        db_pool_recycle (int): Seconds after which pooled connections are replaced.
+        db_pool_pre_ping (bool): Test connections on checkout to drop stale ones.
+        db_statement_timeout_ms (int): Server-side statement timeout (0 disables).
         openai_api_key (str): API key used for authenticating with OpenAI.
         secret_key (str): Secret key used to sign JWT tokens.
         access_token_expire_minutes (int): Duration in minutes before JWT expiration.
         algorithm (str): Algorithm used to encode the JWT (default: HS256).
+        refresh_token_expire_days (int): Lifetime of refresh tokens issued at sign-in.
+        revocation_sync_seconds (int): How often each worker reloads revoked token ids and
+            changed users (role changes, password resets and deletions apply on other
+            workers after at most this long).
+        principal_cache_ttl_seconds (int): How long an authenticated user is cached per worker.
+        principal_cache_max_size (int): Maximum number of cached users per worker.
+        bcrypt_rounds (int): bcrypt cost factor; older hashes are upgraded on login.
+        password_hash_workers (int): Threads reserved for bcrypt hashing/verification.
+        password_hash_queue_size (int): Pending hash jobs allowed before logins get 503.
+        login_failure_window_seconds (int): Sliding window for counting failed logins.
+        login_max_failures_per_account (int): Failed logins per email within the window.
+        login_max_failures_per_ip (int): Failed logins per client IP within the window.
+        llm_circuit_failure_threshold (int): Consecutive OpenAI failures before calls are skipped.
+        llm_circuit_reset_seconds (int): How long calls are skipped before a trial call.
+        llm_routes (list[LLMRoute]): Model, max_tokens and temperature for report generation,
+            by report type and prompt size (JSON list in LLM_ROUTES). The first matching
+            route is used; the last one is the fallback.
+        readiness_pool_saturation (float): Share of pool connections in use above which
+            /readyz reports the worker as not ready.
+        warmup_db_connections (int): Pooled connections opened per engine at startup.
+        warmup_pdf (bool): Compile templates and render a throwaway PDF at startup.
+        warmup_llm (bool): Create the OpenAI client and open its connection at startup.
+        report_context_top_k (int): Previous reports sent to the model as context,
+            picked by relevance to the new history and exam (0 sends none).
+        report_index_max_patients (int): Patients whose report search index is kept per worker.
+        patient_context_ttl_seconds (int): How long an unused patient generation context is cached.
+        patient_context_cache_size (int): Maximum number of cached patient contexts per worker.
+        icd10_catalogue_path (str, optional): ICD-10-GM catalogue file (code<TAB>title lines
+            or the BfArM "kodes" file) that codes are validated against. Defaults to the
+            excerpt bundled in app/data, with which codes are only checked against the
+            bundled list of 3-character categories (logged at startup).
+        profile_dir (str): Where on-demand request profiles are written.
+        profile_interval_ms (int): Sampling interval of the request profiler.
+        profile_max_seconds (int): Sampling stops after this long, even if the request continues.
     """
     database_url: str
+    database_replica_url: Optional[str] = None
+    db_echo: bool = False
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: int = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_timeout_ms: int = 30000
     openai_api_key: str
     secret_key: str
     access_token_expire_minutes: int = 60
     algorithm: str = "HS256"
+    refresh_token_expire_days: int = 14
+    revocation_sync_seconds: int = 5
+    principal_cache_ttl_seconds: int = 60
+    principal_cache_max_size: int = 10000
+    bcrypt_rounds: int = 12
+    password_hash_workers: int = 2
+    password_hash_queue_size: int = 64
+    login_failure_window_seconds: int = 300
+    login_max_failures_per_account: int = 5
+    login_max_failures_per_ip: int = 20
+    llm_circuit_failure_threshold: int = 5
+    llm_circuit_reset_seconds: int = 30
+    llm_routes: list[LLMRoute] = Field(default=DEFAULT_LLM_ROUTES, min_length=1)
+    readiness_pool_saturation: float = 0.9
+    warmup_db_connections: int = 2
+    warmup_pdf: bool = True
+    warmup_llm: bool = True
+    report_context_top_k: int = 3
+    report_index_max_patients: int = 1000
+    patient_context_ttl_seconds: int = 600
+    patient_context_cache_size: int = 1000
+    icd10_catalogue_path: Optional[str] = None
+    profile_dir: str = str(Path(tempfile.gettempdir()) / "praxis-profiles")
+    profile_interval_ms: int = 5
+    profile_max_seconds: int = 120
 
     class Config:
-        env_file = ".env"
+        env_file = ENV_FILE
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
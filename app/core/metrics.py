@@ -0,0 +1,133 @@
+import time
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Metrics are process-local unless PROMETHEUS_MULTIPROC_DIR is set before
+# the app starts; then every worker writes to that directory and /metrics
+# aggregates them (see app/api/routes/monitoring.py). Gauges declare how
+# values from several workers are combined.
+
+# --- HTTP ---
+
+# Labelled by route template (e.g. /patients/{patient_id}), not the raw
+# path, so the number of series stays bounded
+HTTP_REQUEST_SECONDS = Histogram(
+    "praxis_http_request_seconds",
+    "Time spent handling HTTP requests.",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+HTTP_REQUESTS_IN_FLIGHT = Gauge(
+    "praxis_http_requests_in_flight",
+    "HTTP requests currently being handled.",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+
+# --- Database ---
+
+# Time a request waits for a pooled connection, labelled by pool name
+# (e.g. "primary-sync", "replica-async"). A rising tail means the pool
+# is too small for the worker's concurrency.
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "praxis_db_pool_checkout_seconds",
+    "Time spent waiting to check out a pooled database connection.",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+# Connections per pool and state ("checked_out", "idle", "overflow")
+DB_POOL_CONNECTIONS = Gauge(
+    "praxis_db_pool_connections",
+    "Pooled database connections by state.",
+    ["pool", "state"],
+    multiprocess_mode="livesum",
+)
+
+# Labelled by statement type (SELECT, INSERT, ...), measured around
+# cursor execution, i.e. excluding result processing in the ORM
+DB_QUERY_SECONDS = Histogram(
+    "praxis_db_query_seconds",
+    "Time spent executing database statements.",
+    ["pool", "operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+# --- OpenAI ---
+
+LLM_REQUEST_SECONDS = Histogram(
+    "praxis_llm_request_seconds",
+    "Latency of OpenAI chat completion calls, by routing policy route (see Settings.llm_routes).",
+    ["model", "route", "outcome"],
+    buckets=(0.25, 0.5, 1, 2.5, 5, 10, 15, 20, 30, 45, 60, 90, 120),
+)
+
+LLM_TOKENS_TOTAL = Counter(
+    "praxis_llm_tokens",
+    "Tokens reported by OpenAI, by kind (prompt, completion, cached_prompt) and prompt layout version.",
+    ["model", "kind", "prompt_version"],
+)
+
+LLM_ERRORS_TOTAL = Counter(
+    "praxis_llm_errors",
+    "Failed OpenAI calls, by exception type.",
+    ["model", "error"],
+)
+
+# --- Caches ---
+
+PATIENT_CONTEXT_CACHE_TOTAL = Counter(
+    "praxis_patient_context_cache",
+    "Patient context lookups for report generation, by result (hit, miss, stale).",
+    ["result"],
+)
+
+# --- PDF ---
+
+PDF_RENDER_SECONDS = Histogram(
+    "praxis_pdf_render_seconds",
+    "Time WeasyPrint spends converting report HTML to PDF.",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 3, 5, 7.5, 10, 20, 30),
+)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency and in-flight requests per route.
+
+    Written as plain ASGI rather than BaseHTTPMiddleware, so streaming
+    responses (e.g. exports) are timed until their last chunk is sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight = HTTP_REQUESTS_IN_FLIGHT.labels(method=method)
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            # The router stores the matched route in the scope
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.labels(
+                method=method,
+                route=getattr(route, "path", "unmatched"),
+                status=str(status_code),
+            ).observe(time.perf_counter() - start)
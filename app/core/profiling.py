@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Only threads running code from the app package are sampled,
+# which skips idle executor threads and library background threads
+APP_DIR = str(Path(__file__).resolve().parents[1])
+
+# Background threads that run app code but never belong to a request
+IGNORED_THREADS = ("revocation-sync", "request-profiler")
+
+# Profile names are generated here; anything else is rejected on download
+PROFILE_NAME_PATTERN = re.compile(r"^[0-9]{8}T[0-9]{6}_[0-9a-f]{12}\.folded$")
+
+
+def profile_dir() -> Path:
+    """Returns the directory profiles are written to, creating it if needed."""
+    path = Path(settings.profile_dir)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+class StackSampler:
+    """
+    Stdlib sampling profiler for the duration of one request.
+
+    A background thread snapshots the stacks of the event loop thread and
+    of threads currently executing app code (e.g. sync routes in the
+    threadpool, bcrypt on the password executor) every `interval` seconds.
+    Stacks are aggregated in the "folded" format understood by
+    flamegraph.pl, speedscope and inferno.
+
+    Requests running concurrently on the same worker are sampled too,
+    so profiles are clearest on a quiet worker.
+    """
+
+    def __init__(self, loop_thread_id: int, interval: float, max_seconds: float):
+        self.loop_thread_id = loop_thread_id
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.samples: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        deadline = time.monotonic() + self.max_seconds
+        names = {}
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            own_id = threading.get_ident()
+            for thread in threading.enumerate():
+                names[thread.ident] = thread.name
+
+            for thread_id, frame in sys._current_frames().items():
+                thread_name = names.get(thread_id, str(thread_id))
+                if thread_id == own_id or thread_name in IGNORED_THREADS:
+                    continue
+
+                stack = []
+                in_app = thread_id == self.loop_thread_id
+                while frame is not None:
+                    code = frame.f_code
+                    in_app = in_app or code.co_filename.startswith(APP_DIR)
+                    stack.append(_frame_label(code))
+                    frame = frame.f_back
+
+                if in_app:
+                    stack.append(thread_name)
+                    self.samples[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        """Returns the collected samples as folded stacks, one per line."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+def _frame_label(code) -> str:
+    """Formats a frame as 'function (file.py:line)' without folded-format separators."""
+    filename = os.path.basename(code.co_filename)
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles single requests on demand.
+
+    A request is profiled when it carries an `X-Profile: 1` header or a
+    `profile=1` query parameter and its bearer token belongs to an admin.
+    The profile is written to PROFILE_DIR and its name is returned in the
+    `X-Profile-Id` response header; download it via /admin/profiles/{name}.
+
+    Requests without the flag only pay for a scan of the raw headers and
+    query string; no token is decoded and no thread is started.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _profiling_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if not await _is_admin(scope):
+            await self.app(scope, receive, send)
+            return
+
+        name = f"{datetime.now():%Y%m%dT%H%M%S}_{uuid.uuid4().hex[:12]}.folded"
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-profile-id", name.encode())]
+            await send(message)
+
+        sampler = StackSampler(
+            loop_thread_id=threading.get_ident(),
+            interval=settings.profile_interval_ms / 1000,
+            max_seconds=settings.profile_max_seconds
+        )
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            # Joining the sampler thread and writing the file block, keep them off the loop
+            await asyncio.to_thread(sampler.stop)
+            await asyncio.to_thread(_write_profile, name, scope, sampler, elapsed)
+
+
+def _profiling_requested(scope) -> bool:
+    """Checks the raw header list and query string for the profiling flag."""
+    query_string = scope.get("query_string", b"")
+    if b"profile=" in query_string and b"profile=1" in query_string.split(b"&"):
+        return True
+    for key, value in scope["headers"]:
+        if key == b"x-profile":
+            return value in (b"1", b"true")
+    return False
+
+
+async def _is_admin(scope) -> bool:
+    """Runs the admin_only check against the request's bearer token."""
+    # Imported here, so the middleware adds no imports for unprofiled requests
+    from app.core.security import admin_only
+    from app.db import AsyncSessionLocal
+
+    token = None
+    for key, value in scope["headers"]:
+        if key == b"authorization":
+            scheme, _, credentials = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer":
+                token = credentials
+            break
+    if not token:
+        return False
+
+    try:
+        async with AsyncSessionLocal() as db:
+            await admin_only(token=token, db=db)
+    except HTTPException:
+        return False
+    return True
+
+
+def _write_profile(name: str, scope, sampler: StackSampler, elapsed: float) -> Optional[Path]:
+    """Writes the folded stacks to PROFILE_DIR and logs which request they belong to."""
+    try:
+        path = profile_dir() / name
+        path.write_text(sampler.folded())
+    except OSError:
+        logger.exception("Failed to write request profile %s", name)
+        return None
+
+    route = getattr(scope.get("route"), "path", scope["path"])
+    logger.info(
+        "Wrote request profile %s for %s %s (%.1f ms, %d samples)",
+        path, scope["method"], route, elapsed * 1000, sum(sampler.samples.values())
+    )
+    return path
@@ -0,0 +1,232 @@
+import threading
+from dataclasses import dataclass, replace
+from datetime import date, datetime
+from typing import Callable, Optional
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import PATIENT_CONTEXT_CACHE_TOTAL
+from app.models.medical_report import MedicalReport
+from app.models.patient import Patient
+from app.utils.retrieval import report_document, report_indexes
+
+
+@dataclass(frozen=True)
+class PriorReport:
+    """A previous report as used for generation context."""
+    updated_at: datetime
+    document: str  # text indexed for retrieval (title, history, exam, report)
+    final_report: str
+
+
+@dataclass(frozen=True)
+class PatientContext:
+    """
+    Everything report generation needs to know about a patient,
+    apart from the new history and exam.
+
+    `version` is the patients.context_version it was loaded at.
+    """
+    patient_id: int
+    version: int
+    gender: str
+    date_of_birth: Optional[date]
+    allergies: str
+    past_illnesses: str
+    current_dx: str
+    notes: str
+    reports: dict[int, PriorReport]  # reports with a final report, by id
+
+
+# Patient contexts by patient id. Every change to a patient or their
+# reports bumps patients.context_version in the same transaction
+# (bump_context_version), and each lookup compares the cached version
+# with the database, so all workers see changes immediately. The worker
+# that made a change applies it to its cached context after commit, so
+# its next generation for the patient is still a hit. The TTL only
+# bounds how long unused entries take up memory.
+context_cache = TTLCache(
+    ttl=settings.patient_context_ttl_seconds,
+    maxsize=settings.patient_context_cache_size
+)
+_apply_lock = threading.Lock()
+
+
+def bump_context_version(db: Session, patient_id: int) -> Optional[int]:
+    """
+    Marks cached contexts of the patient as outdated. Call within the
+    transaction that changes the patient or their reports.
+
+    Returns:
+        int | None: The new context_version (for the apply_* functions
+            after commit), or None if the patient does not exist.
+    """
+    return db.execute(
+        update(Patient)
+        .where(Patient.id == patient_id)
+        .values(context_version=Patient.context_version + 1)
+        .returning(Patient.context_version)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+
+
+def _prior_report(title, history, exam, final_report, updated_at) -> PriorReport:
+    return PriorReport(
+        updated_at=updated_at,
+        document=report_document(title, history, exam, final_report),
+        final_report=final_report
+    )
+
+
+def _patient_context(patient: Patient, version: int, reports: dict[int, PriorReport]) -> PatientContext:
+    return PatientContext(
+        patient_id=patient.id,
+        version=version,
+        gender=patient.gender or "",
+        date_of_birth=patient.date_of_birth,
+        allergies=patient.allergies or "",
+        past_illnesses=patient.past_illnesses or "",
+        current_dx=patient.current_diagnosis or "",
+        notes=patient.notes or "",
+        reports=reports
+    )
+
+
+def _build_context(db: Session, patient_id: int) -> Optional[PatientContext]:
+    """Loads the patient and their reports with a final report."""
+    patient = db.query(Patient).filter_by(id=patient_id).first()
+    if not patient:
+        return None
+
+    rows = (
+        db.query(
+            MedicalReport.id,
+            MedicalReport.updated_at,
+            MedicalReport.title,
+            MedicalReport.patient_history,
+            MedicalReport.physical_exam,
+            MedicalReport.final_report
+        )
+        .filter(MedicalReport.patient_id == patient_id, MedicalReport.final_report.isnot(None))
+        .order_by(MedicalReport.id)
+    )
+    reports = {
+        row.id: _prior_report(
+            row.title, row.patient_history, row.physical_exam, row.final_report, row.updated_at
+        )
+        for row in rows
+    }
+    return _patient_context(patient, patient.context_version, reports)
+
+
+def _apply(patient_id: int, version: Optional[int], change: Callable[[PatientContext], PatientContext]) -> None:
+    """
+    Applies a committed change to the cached context, if the cache holds
+    the version right before it. Otherwise another change came in between
+    and the next lookup reloads the context.
+    """
+    if version is None:
+        return
+    with _apply_lock:
+        cached = context_cache.get(patient_id)
+        if cached is not None and cached.version == version - 1:
+            context_cache.set(patient_id, replace(change(cached), version=version))
+
+
+def apply_report_saved(report: MedicalReport, version: Optional[int]) -> None:
+    """Updates the cached context after a report was created or changed."""
+    def change(context: PatientContext) -> PatientContext:
+        reports = dict(context.reports)
+        reports.pop(report.id, None)
+        if report.final_report is not None:
+            reports[report.id] = _prior_report(
+                report.title, report.patient_history, report.physical_exam,
+                report.final_report, report.updated_at
+            )
+        return replace(context, reports=reports)
+
+    _apply(report.patient_id, version, change)
+
+
+def apply_report_deleted(patient_id: int, report_id: int, version: Optional[int]) -> None:
+    """Updates the cached context after a report was deleted."""
+    def change(context: PatientContext) -> PatientContext:
+        reports = {i: report for i, report in context.reports.items() if i != report_id}
+        return replace(context, reports=reports)
+
+    _apply(patient_id, version, change)
+
+
+def apply_patient_saved(patient: Patient, version: Optional[int]) -> None:
+    """Updates the cached context after the patient's details were changed."""
+    _apply(patient.id, version, lambda context: _patient_context(patient, version, context.reports))
+
+
+def _store(context: PatientContext) -> None:
+    """
+    Caches a freshly loaded context unless the cache already holds a newer
+    version, e.g. one applied by this worker while `context` was read from
+    a lagging replica.
+    """
+    with _apply_lock:
+        cached = context_cache.get(context.patient_id)
+        if cached is None or context.version >= cached.version:
+            context_cache.set(context.patient_id, context)
+
+
+def load_patient_context(db: Session, patient_id: int) -> Optional[PatientContext]:
+    """
+    Returns the patient's generation context, from the cache if it is
+    still at the patient's current context_version.
+
+    A hit costs one primary-key lookup of context_version.
+
+    Returns:
+        PatientContext | None: None if the patient does not exist.
+    """
+    version = db.query(Patient.context_version).filter(Patient.id == patient_id).scalar()
+    if version is None:
+        return None
+
+    cached = context_cache.get(patient_id)
+    if cached is not None and cached.version == version:
+        PATIENT_CONTEXT_CACHE_TOTAL.labels(result="hit").inc()
+        return cached
+    PATIENT_CONTEXT_CACHE_TOTAL.labels(result="miss" if cached is None else "stale").inc()
+
+    context = _build_context(db, patient_id)
+    if context is not None:
+        _store(context)
+    return context
+
+
+def select_previous_reports(context: PatientContext, query: str, k: int) -> list[int]:
+    """
+    Picks the previous reports most relevant to `query`.
+
+    Reports are ranked with the patient's BM25 index (see app.utils.retrieval),
+    which first re-indexes reports added or changed since it was built.
+    If none shares a term with the query, the most recent ones are used.
+
+    Returns:
+        list[int]: Ids of up to `k` reports, oldest first.
+    """
+    if k <= 0:
+        return []
+
+    # Nothing to choose from: take them all without touching the index
+    if len(context.reports) <= k:
+        return sorted(context.reports)
+
+    index = report_indexes.get(context.patient_id)
+    with index.lock:
+        stale = index.stale_ids({i: report.updated_at for i, report in context.reports.items()})
+        for report_id in stale:
+            report = context.reports[report_id]
+            index.add(report_id, report.updated_at, report.document)
+        selected = index.search(query, k)
+
+    return sorted(selected or sorted(context.reports, reverse=True)[:k])
@@ -0,0 +1,130 @@
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+
+from sqlalchemy import delete, select
+
+from app.db import SessionLocal
+from app.models.auth_token import RefreshToken, RevokedToken, UserInvalidation
+
+logger = logging.getLogger(__name__)
+
+# Rows revoked shortly before the last sync are read again, so commits that
+# land out of order (or small clock differences) are not missed
+SYNC_OVERLAP = timedelta(seconds=5)
+
+# Expired rows are deleted from Postgres at most this often. User changes
+# are deleted once they are this old, long after every worker has read them.
+PURGE_INTERVAL = timedelta(hours=1)
+
+
+class RevocationList:
+    """
+    In-memory mirror of revoked, not yet expired access token ids (jti).
+
+    `is_revoked` is a plain dict lookup and is safe to call on every
+    request. A daemon thread pulls new revocations from Postgres every
+    `sync_seconds`; revocations made by this worker are added locally
+    right away, so they apply here without waiting for the next sync.
+
+    Each sync also reads the users changed since the last one
+    (user_invalidations) and passes their ids to `on_user_changed`, so
+    per-worker caches of users can drop them.
+    """
+
+    def __init__(self, sync_seconds: float, on_user_changed: Optional[Callable[[int], None]] = None):
+        self.sync_seconds = sync_seconds
+        self.on_user_changed = on_user_changed
+        self._entries: dict[str, datetime] = {}
+        self._last_sync: Optional[datetime] = None
+        self._last_purge: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        """Returns True if the token id has been revoked."""
+        if self._thread is None:
+            self.start()
+        return jti in self._entries if jti else False
+
+    def add(self, jti: str, expires_at: datetime) -> None:
+        """Marks a token id as revoked in this worker."""
+        with self._lock:
+            self._entries[jti] = expires_at
+
+    def sync(self) -> None:
+        """
+        Loads revocations recorded since the last sync, drops expired ones
+        and reports changed users to `on_user_changed`.
+        """
+        now = datetime.now(timezone.utc)
+        stmt = select(RevokedToken.jti, RevokedToken.expires_at).where(
+            RevokedToken.expires_at > now
+        )
+        if self._last_sync is not None:
+            stmt = stmt.where(RevokedToken.created_at >= self._last_sync - SYNC_OVERLAP)
+
+        # Nothing is cached before the first sync, so older changes do not matter
+        changed_since = (self._last_sync or now) - SYNC_OVERLAP
+
+        with SessionLocal() as db:
+            rows = db.execute(stmt).all()
+            changed_users = db.scalars(
+                select(UserInvalidation.user_id)
+                .where(UserInvalidation.created_at >= changed_since)
+                .distinct()
+            ).all()
+
+            if self._last_purge is None or now - self._last_purge > PURGE_INTERVAL:
+                db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= now))
+                db.execute(delete(RefreshToken).where(RefreshToken.expires_at <= now))
+                db.execute(delete(UserInvalidation).where(UserInvalidation.created_at <= now - PURGE_INTERVAL))
+                db.commit()
+                self._last_purge = now
+
+        # Changes within the overlap are reported again on the next sync, which
+        # also drops entries a request cached from data read just before the change
+        if self.on_user_changed is not None:
+            for user_id in changed_users:
+                self.on_user_changed(user_id)
+
+        with self._lock:
+            for jti, expires_at in rows:
+                self._entries[jti] = expires_at
+            expired = [jti for jti, expires_at in self._entries.items() if expires_at <= now]
+            for jti in expired:
+                del self._entries[jti]
+            self._last_sync = now
+
+    def start(self) -> None:
+        """Starts the background sync thread (idempotent)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run,
+                name="revocation-sync",
+                daemon=True
+            )
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the background sync thread."""
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=self.sync_seconds + 1)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.sync()
+            except Exception:
+                logger.exception("Failed to sync revoked tokens")
+            self._stop.wait(self.sync_seconds)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,3 +1,7 @@
+import asyncio
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
@@ -5,11 +9,15 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import get_db
+from app.db import get_async_db
+from app.models.auth_token import UserInvalidation
 from app.models.user import User
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.revocation import RevocationList
+from app.core.throttle import LoginThrottle
 
 # OAuth2 scheme used to extract and validate bearer token from requests
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/signin")
@@ -18,9 +26,30 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/signin")
 SECRET_KEY = settings.secret_key
 ALGORITHM = settings.algorithm
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
+REFRESH_TOKEN_EXPIRE_DAYS = settings.refresh_token_expire_days
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto") #for password hashing
+# Password hashing context. Hashes with a different cost than
+# bcrypt_rounds are flagged by verify_and_update() and re-hashed on login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.bcrypt_rounds
+)
+
+# bcrypt runs on its own small pool, so login bursts cannot occupy
+# the threadpool that serves the clinical API.
+password_executor = ThreadPoolExecutor(
+    max_workers=settings.password_hash_workers,
+    thread_name_prefix="password-hash"
+)
+_pending_password_jobs = 0
+
+# Failed-login throttling per account and per client IP
+login_throttle = LoginThrottle(
+    window_seconds=settings.login_failure_window_seconds,
+    max_per_account=settings.login_max_failures_per_account,
+    max_per_ip=settings.login_max_failures_per_ip
+)
 
 
 def get_password_hash(password: str) -> str:
@@ -33,34 +62,211 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
+def password_queue_depth() -> int:
+    """Returns the number of hash jobs running or waiting for a thread."""
+    return _pending_password_jobs
+
+
+async def _run_password_job(func, *args):
     """
-    Decodes the JWT token and retrieves the current user from the database.
+    Runs a bcrypt call on the password executor.
 
     Raises:
-    - 401 Unauthorized if the token is invalid
-    - 404 Not Found if user is not in the database
+    - 503 Service Unavailable if too many jobs are already queued
+    """
+    global _pending_password_jobs
+    if _pending_password_jobs >= settings.password_hash_queue_size:
+        raise HTTPException(
+            status_code=503,
+            detail="Authentication service busy, try again shortly",
+            headers={"Retry-After": "1"}
+        )
+
+    _pending_password_jobs += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(password_executor, func, *args)
+    finally:
+        _pending_password_jobs -= 1
+
+
+async def get_password_hash_async(password: str) -> str:
+    """Hashes a password on the dedicated password executor."""
+    return await _run_password_job(pwd_context.hash, password)
+
+
+async def verify_and_update_password(
+    plain_password: str,
+    hashed_password: str
+) -> tuple[bool, Optional[str]]:
+    """
+    Verifies a password on the dedicated password executor.
+
+    Returns:
+    - (valid, new_hash) where new_hash is set when the stored hash uses
+      outdated settings (e.g. a lower bcrypt cost) and should be replaced
+    """
+    return await _run_password_job(
+        pwd_context.verify_and_update, plain_password, hashed_password
+    )
+
+
+@dataclass(frozen=True)
+class Principal:
+    """
+    The authenticated user as seen by route dependencies.
+
+    A detached, immutable snapshot of the User row, so it can be cached
+    and shared across requests without touching the database.
+    """
+    id: int
+    role: str
+    title: Optional[str]
+    specialization: Optional[str]
+    practice_name: Optional[str]
+    token_version: int
+
+    @classmethod
+    def from_user(cls, user: User) -> "Principal":
+        return cls(
+            id=user.id,
+            role=user.role,
+            title=user.title,
+            specialization=user.specialization,
+            practice_name=user.practice_name,
+            token_version=user.token_version,
+        )
+
+
+# Principals by user id, so authenticated requests skip the users lookup.
+# Changes to a user are recorded with record_user_change: the worker that
+# made the change invalidates its entry after commit, the other workers at
+# their next revocation sync (REVOCATION_SYNC_SECONDS). The TTL only bounds
+# how long unused entries take up memory.
+principal_cache = TTLCache(
+    ttl=settings.principal_cache_ttl_seconds,
+    maxsize=settings.principal_cache_max_size
+)
+
+
+def invalidate_principal(user_id: int) -> None:
+    """Drops the cached principal so the next request reloads the user."""
+    principal_cache.invalidate(user_id)
+
+
+def record_user_change(db, user_id: int) -> None:
+    """
+    Records that the user's role, profile, token_version or existence
+    changed, so every worker drops its cached principal at its next sync.
+
+    Call within the transaction that makes the change (sync or async
+    session), and invalidate_principal after commit for this worker.
+    """
+    db.add(UserInvalidation(user_id=user_id))
+
+
+# Revoked access token ids, mirrored from Postgres so that checking a token
+# on each request needs no query. Its sync also reports changed users.
+revocation_list = RevocationList(
+    sync_seconds=settings.revocation_sync_seconds,
+    on_user_changed=invalidate_principal
+)
+
+
+def _decode_token(token: str, token_type: str = "access") -> dict:
+    """
+    Decodes and validates a JWT of the given type.
+
+    Tokens issued before refresh tokens existed carry no type
+    and are treated as access tokens.
+
+    Raises:
+    - 401 Unauthorized if the token is invalid, expired, of the wrong type
+      or has been revoked
     """
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = int(payload.get("sub"))
-        role = payload.get("role")
-    except JWTError:
+        payload["sub"] = int(payload.get("sub"))
+    except (JWTError, TypeError, ValueError):
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+    if payload.get("type", "access") != token_type:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    # In-memory lookup; refresh tokens are checked against their row instead
+    if token_type == "access" and revocation_list.is_revoked(payload.get("jti")):
+        raise HTTPException(status_code=401, detail="Token has been revoked")
+    return payload
+
+
+def decode_refresh_token(token: str) -> dict:
+    """
+    Decodes and validates a JWT refresh token.
+
+    Raises:
+    - 401 Unauthorized if the token is invalid, expired or not a refresh token
+    """
+    return _decode_token(token, token_type="refresh")
+
+
+async def _load_principal(payload: dict, db: AsyncSession) -> Optional[Principal]:
+    """
+    Returns the principal for a decoded token, from cache when possible.
+
+    A token whose version is newer than the cached principal forces a
+    reload (e.g. a fresh sign-in after a password reset on another worker).
+    Returns None if the user no longer exists.
+    """
+    user_id = payload["sub"]
+    token_version = payload.get("ver", 0)
+
+    principal = principal_cache.get(user_id)
+    if principal is None or principal.token_version < token_version:
+        user = await db.get(User, user_id)
+        if not user:
+            invalidate_principal(user_id)
+            return None
+        principal = Principal.from_user(user)
+        principal_cache.set(user_id, principal)
+
+    if principal.token_version != token_version:
+        raise HTTPException(status_code=401, detail="Token is no longer valid")
+    return principal
+
+
+async def get_token_payload(token: str = Depends(oauth2_scheme)) -> dict:
+    """
+    Dependency returning the validated claims of the bearer access token.
+
+    Raises:
+    - 401 Unauthorized if the token is invalid or has been revoked
+    """
+    return _decode_token(token)
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """
+    Decodes the JWT token and returns the current user's principal.
+    The database is only queried when the principal is not cached.
+
+    Raises:
+    - 401 Unauthorized if the token is invalid or has been superseded
+    - 404 Not Found if user is not in the database
+    """
+    payload = _decode_token(token)
+    principal = await _load_principal(payload, db)
+    if not principal:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return principal
 
 
-def admin_only(
+async def admin_only(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-):
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
     """
     Dependency that allows only admin users to proceed.
 
@@ -68,20 +274,17 @@ def admin_only(
     - 401 Unauthorized if token is invalid
     - 403 Forbidden if user is not an admin
     """
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = int(payload.get("sub"))
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user or user.role != "admin":
+    payload = _decode_token(token)
+    principal = await _load_principal(payload, db)
+    if not principal or principal.role != "admin":
         raise HTTPException(status_code=403, detail="Admin privileges required")
 
-    return user
+    return principal
 
 
-def require_doctor_or_admin(user: User = Depends(get_current_user)) -> User:
+async def require_doctor_or_admin(
+    user: Principal = Depends(get_current_user)
+) -> Principal:
     """
     Dependency that allows only doctors or admins to proceed.
 
@@ -108,6 +311,28 @@ def create_access_token(data: dict,
     """
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode.update({"exp": expire})
+    # A unique id (jti) lets individual tokens be revoked
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex, "type": "access"})
+    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return encoded_jwt
+
+
+def create_refresh_token(data: dict,
+                         expires_delta: Optional[timedelta] = None
+) -> tuple[str, str, datetime]:
+    """
+    Creates a JWT refresh token for the given data payload.
+
+    Parameters:
+    - data: A dictionary of claims to include in the token (e.g. user ID)
+    - expires_delta: Optional timedelta for custom expiration
+
+    Returns:
+    - (token, jti, expires_at), so the caller can store the token's row
+    """
+    to_encode = data.copy()
+    jti = uuid.uuid4().hex
+    expire = datetime.now(timezone.utc) + (expires_delta or timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS))
+    to_encode.update({"exp": expire, "jti": jti, "type": "refresh"})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    return encoded_jwt
\ No newline at end of file
+    return encoded_jwt, jti, expire
\ No newline at end of file
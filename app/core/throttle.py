@@ -0,0 +1,100 @@
+import time
+from collections import deque
+from typing import Optional
+
+from fastapi import HTTPException
+
+
+class LoginThrottle:
+    """
+    Counts failed logins per account and per client IP in a sliding window.
+
+    A throttled account is rejected with 429 before any database lookup
+    or bcrypt work is done. A throttled IP only turns failed attempts into
+    429: many users can share one address (practice NAT, a proxy), so a
+    correct password is never blocked by the IP alone. State is per worker
+    and only touched from the event loop, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        window_seconds: int,
+        max_per_account: int,
+        max_per_ip: int,
+        max_keys: int = 100000
+    ):
+        self.window_seconds = window_seconds
+        self.max_per_account = max_per_account
+        self.max_per_ip = max_per_ip
+        self.max_keys = max_keys
+        self._failures: dict[str, deque] = {}
+
+    @staticmethod
+    def _account_key(email: str) -> str:
+        return f"account:{email.strip().lower()}"
+
+    @staticmethod
+    def _ip_key(ip: str) -> str:
+        return f"ip:{ip}"
+
+    def _recent(self, key: str, now: float) -> Optional[deque]:
+        """Returns the failure timestamps for a key, dropping expired ones."""
+        failures = self._failures.get(key)
+        if failures is None:
+            return None
+        cutoff = now - self.window_seconds
+        while failures and failures[0] <= cutoff:
+            failures.popleft()
+        if not failures:
+            del self._failures[key]
+            return None
+        return failures
+
+    def _retry_after(self, key: str, limit: int, now: float) -> Optional[int]:
+        """Seconds until the key is below its limit again, or None if it is not throttled."""
+        failures = self._recent(key, now)
+        if failures and len(failures) >= limit:
+            return int(failures[0] + self.window_seconds - now) + 1
+        return None
+
+    @staticmethod
+    def reject(retry_after: int) -> HTTPException:
+        """The 429 response for a throttled login."""
+        return HTTPException(
+            status_code=429,
+            detail="Too many failed login attempts, try again later",
+            headers={"Retry-After": str(retry_after)}
+        )
+
+    def check_account(self, email: str) -> None:
+        """
+        Raises:
+        - 429 Too Many Requests if the account is currently throttled
+        """
+        retry_after = self._retry_after(self._account_key(email), self.max_per_account, time.monotonic())
+        if retry_after is not None:
+            raise self.reject(retry_after)
+
+    def ip_retry_after(self, ip: str) -> Optional[int]:
+        """Seconds until the IP is below its limit again, or None if it is not throttled."""
+        return self._retry_after(self._ip_key(ip), self.max_per_ip, time.monotonic())
+
+    def record_failure(self, email: str, ip: str) -> None:
+        """Records a failed attempt for both the account and the IP."""
+        now = time.monotonic()
+        for key in (self._account_key(email), self._ip_key(ip)):
+            self._failures.setdefault(key, deque()).append(now)
+
+        # Bound memory under credential stuffing from many addresses
+        if len(self._failures) > self.max_keys:
+            self.prune()
+
+    def reset_account(self, email: str) -> None:
+        """Clears the account's failures after a successful login."""
+        self._failures.pop(self._account_key(email), None)
+
+    def prune(self) -> None:
+        """Drops keys whose failures have all expired."""
+        now = time.monotonic()
+        for key in list(self._failures):
+            self._recent(key, now)
@@ -0,0 +1,119 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from app.core.cache import TTLCache
+from app.core.config import LLMRoute
+from app.db import upsert_insert
+from app.models.medical_report import MedicalReport
+from app.models.usage import ReportGeneration, UsageDaily
+from app.utils.openai_client import GeneratedReport
+
+# Latency estimates are based on the last LATENCY_WINDOW_DAYS days of usage
+LATENCY_WINDOW_DAYS = 7
+
+# Until a model has been used, assume this many milliseconds per prompt
+# plus completion token (about 40 s for 12k tokens)
+FALLBACK_MS_PER_TOKEN = 3.3
+
+# Recent per-model latency, by model; refreshed every few minutes
+model_stats_cache = TTLCache(ttl=300, maxsize=100)
+
+
+@dataclass(frozen=True)
+class ModelStats:
+    """Recent generation latency and completion length of a model."""
+    ms_per_token: float
+    avg_completion_tokens: float  # 0 if the model has no recent generations
+
+
+def record_generation(db: Session, report: MedicalReport, user_id: int, generated: GeneratedReport) -> None:
+    """
+    Stores the usage of a report generation and adds it to the user's
+    daily rollup. Call within the transaction that saves the report.
+
+    The rollup row is upserted with a single statement, so concurrent
+    generations by the same user add up without locking.
+    """
+    db.add(ReportGeneration(
+        report=report,
+        user_id=user_id,
+        model=generated.model,
+        route=generated.route,
+        prompt_version=generated.prompt_version,
+        prompt_tokens=generated.prompt_tokens,
+        completion_tokens=generated.completion_tokens,
+        cached_tokens=generated.cached_tokens,
+        cache_status="hit" if generated.cached_tokens else "miss",
+        latency_ms=generated.latency_ms
+    ))
+
+    statement = upsert_insert(db)(UsageDaily).values(
+        day=datetime.now(timezone.utc).date(),
+        user_id=user_id,
+        model=generated.model,
+        generations=1,
+        prompt_tokens=generated.prompt_tokens,
+        completion_tokens=generated.completion_tokens,
+        cached_tokens=generated.cached_tokens,
+        latency_ms_total=generated.latency_ms,
+        latency_ms_max=generated.latency_ms
+    )
+    added = statement.excluded
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[UsageDaily.day, UsageDaily.user_id, UsageDaily.model],
+        set_={
+            "generations": UsageDaily.generations + 1,
+            "prompt_tokens": UsageDaily.prompt_tokens + added.prompt_tokens,
+            "completion_tokens": UsageDaily.completion_tokens + added.completion_tokens,
+            "cached_tokens": UsageDaily.cached_tokens + added.cached_tokens,
+            "latency_ms_total": UsageDaily.latency_ms_total + added.latency_ms_total,
+            "latency_ms_max": case(
+                (added.latency_ms_max > UsageDaily.latency_ms_max, added.latency_ms_max),
+                else_=UsageDaily.latency_ms_max
+            ),
+            "updated_at": func.now(),
+        }
+    ))
+
+
+def _model_stats(db: Session, model: str) -> ModelStats:
+    """Reads (or takes from cache) a model's stats from the last LATENCY_WINDOW_DAYS of rollups."""
+    cached = model_stats_cache.get(model)
+    if cached is not None:
+        return cached
+
+    since = datetime.now(timezone.utc).date() - timedelta(days=LATENCY_WINDOW_DAYS)
+    generations, prompt_tokens, completion_tokens, latency_ms = db.query(
+        func.coalesce(func.sum(UsageDaily.generations), 0),
+        func.coalesce(func.sum(UsageDaily.prompt_tokens), 0),
+        func.coalesce(func.sum(UsageDaily.completion_tokens), 0),
+        func.coalesce(func.sum(UsageDaily.latency_ms_total), 0)
+    ).filter(UsageDaily.model == model, UsageDaily.day >= since).one()
+
+    tokens = prompt_tokens + completion_tokens
+    stats = ModelStats(
+        ms_per_token=latency_ms / tokens if tokens else FALLBACK_MS_PER_TOKEN,
+        avg_completion_tokens=completion_tokens / generations if generations else 0
+    )
+    model_stats_cache.set(model, stats)
+    return stats
+
+
+def estimate_generation(db: Session, route: LLMRoute, input_tokens: int) -> tuple[int, int]:
+    """
+    Estimates the completion tokens and latency of a generation on `route`.
+
+    Latency is taken as proportional to prompt plus completion tokens, at
+    the model's recent average rate. The completion is assumed as long as
+    the model's recent average (half of max_tokens without history),
+    capped at the route's max_tokens.
+
+    Returns:
+        tuple[int, int]: (completion tokens, latency in milliseconds)
+    """
+    stats = _model_stats(db, route.model)
+    completion_tokens = min(route.max_tokens, round(stats.avg_completion_tokens or route.max_tokens / 2))
+    return completion_tokens, round((input_tokens + completion_tokens) * stats.ms_per_token)
@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import time
+
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+
+from app.core.config import settings
+from app.db import async_engine, async_replica_engine, engine, replica_engine
+from app.utils.icd10 import get_catalogue
+from app.utils.openai_client import get_client
+from app.utils.pdf_generator import STATIC_DIR, get_template_env, render_pdf
+
+logger = logging.getLogger(__name__)
+
+# Placeholder values for every variable of report_template.html
+SAMPLE_REPORT_CONTEXT = {
+    "practice_name": "Praxis",
+    "specialization": "Neurologie",
+    "phone": "000",
+    "email": "praxis@example.org",
+    "street": "Musterstraße 1",
+    "postal_code": "10115",
+    "city": "Berlin",
+    "logo_path": None,
+    "patient_name": "Max Mustermann",
+    "birth_date": "01.01.1970",
+    "patient_gender": "Männlich",
+    "gendered_prefix": "Herr",
+    "patient_street": "Musterweg 2",
+    "patient_postal_code": "10115",
+    "patient_city": "Berlin",
+    "patient_country": "Deutschland",
+    "date": "1. Januar 2025",
+    "diagnosis_icd": "G40.1",
+    "diagnosis_gva": "",
+    "diagnosis_z": "",
+    "allergies": "Keine",
+    "past_illnesses": "Keine",
+    "current_dx": "",
+    "history": "Anamnese",
+    "exam": "Befund",
+    "final_report": '<h3 class="report-section">Zusammenfassung:</h3>\n<p>Warmup.</p>',
+    "report_main_heading": "Warmup",
+    "doctor_name": "Erika Musterfrau",
+    "doctor_title": "Dr. med.",
+}
+
+
+class WarmupState:
+    """
+    Progress of the startup warmup, reported by /readyz.
+
+    `complete` turns True once every step has run, whether it succeeded
+    or not; failed steps are logged and listed in `errors`.
+    """
+
+    def __init__(self):
+        self.complete = False
+        self.durations: dict[str, float] = {}
+        self.errors: dict[str, str] = {}
+
+    def as_dict(self) -> dict:
+        return {
+            "ok": self.complete,
+            "complete": self.complete,
+            "durations_ms": {step: round(seconds * 1000, 1) for step, seconds in self.durations.items()},
+            "errors": self.errors,
+        }
+
+
+warmup_state = WarmupState()
+
+
+async def _warm_async_pool(db_engine, count: int) -> None:
+    """Opens `count` connections at once, so they stay idle in the pool."""
+    async def ping():
+        async with db_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(ping() for _ in range(count)))
+
+
+def _warm_sync_pool(db_engine, count: int) -> None:
+    """Checks out `count` connections together, then returns them to the pool."""
+    connections = []
+    try:
+        for _ in range(count):
+            conn = db_engine.connect()
+            connections.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in connections:
+            conn.close()
+
+
+async def warm_database_pools() -> None:
+    """Pre-opens WARMUP_DB_CONNECTIONS per pool (capped at the pool size)."""
+    count = min(settings.warmup_db_connections, settings.db_pool_size)
+    if count <= 0:
+        return
+
+    for db_engine in {async_engine, async_replica_engine}:
+        if isinstance(db_engine.sync_engine.pool, QueuePool):
+            await _warm_async_pool(db_engine, count)
+
+    for db_engine in {engine, replica_engine}:
+        if isinstance(db_engine.pool, QueuePool):
+            await asyncio.to_thread(_warm_sync_pool, db_engine, count)
+
+
+def warm_pdf_renderer() -> None:
+    """Compiles the report template and renders one throwaway PDF (loads WeasyPrint and fonts)."""
+    template = get_template_env().get_template("report_template.html")
+    render_pdf(template.render(**SAMPLE_REPORT_CONTEXT), base_url=STATIC_DIR)
+
+
+def warm_llm_client() -> None:
+    """Creates the OpenAI client and opens its HTTPS connection with a cheap metadata call."""
+    get_client().with_options(timeout=5, max_retries=0).models.retrieve(settings.llm_routes[0].model)
+
+
+async def run_warmup() -> None:
+    """
+    Runs all warmup steps and marks warmup_state complete.
+
+    Blocking steps run in worker threads, so /healthz and /readyz keep
+    answering meanwhile. A failing step does not stop the others.
+    """
+    steps = [
+        ("database", warm_database_pools),
+        ("icd10_catalogue", lambda: asyncio.to_thread(get_catalogue)),
+    ]
+    if settings.warmup_pdf:
+        steps.append(("pdf_renderer", lambda: asyncio.to_thread(warm_pdf_renderer)))
+    if settings.warmup_llm:
+        steps.append(("llm_client", lambda: asyncio.to_thread(warm_llm_client)))
+
+    for name, step in steps:
+        start = time.perf_counter()
+        try:
+            await step()
+        except Exception as exc:
+            warmup_state.errors[name] = type(exc).__name__
+            logger.warning("Warmup step %s failed: %s", name, exc)
+        warmup_state.durations[name] = time.perf_counter() - start
+
+    warmup_state.complete = True
+    logger.info("Warmup finished: %s", warmup_state.as_dict())
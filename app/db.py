@@ -1,27 +1,178 @@
-import os
-from pathlib import Path
-from dotenv import load_dotenv
-from sqlalchemy import create_engine
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
-# Load .env file explicitly from the parent directory of this file (project root)
-env_path = Path(__file__).resolve().parent.parent / ".env"
-loaded = load_dotenv(dotenv_path=env_path)
+from app.core.config import settings
+from app.core.metrics import (
+    DB_POOL_CHECKOUT_SECONDS,
+    DB_POOL_CONNECTIONS,
+    DB_QUERY_SECONDS,
+)
 
 # --- Database connection setup ---
 
-# Retrieve the database URL from environment
-DATABASE_URL = os.getenv("DATABASE_URL")
+# Primary database (reads and writes) and optional read replica
+DATABASE_URL = settings.database_url
+REPLICA_DATABASE_URL = settings.database_replica_url
 
-# Ensure the URL is set; otherwise raise an error
-if not DATABASE_URL:
-    raise RuntimeError("DATABASE_URL is not set in environment or .env file")
+# Async drivers used for each backend of the sync DATABASE_URL
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
 
-engine = create_engine(
-    DATABASE_URL,
-    echo=True,
-    future=True   # Enables SQLAlchemy 2.0-style usage
-)
+
+def to_async_url(url: str) -> str:
+    """
+    Converts a sync database URL (e.g. postgresql:// or postgresql+psycopg2://)
+    into the equivalent URL for the asyncio driver.
+
+    Raises:
+        RuntimeError: If no async driver is known for the backend.
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver configured for '{backend}' databases")
+
+    # asyncpg expects "ssl" instead of libpq's "sslmode" query parameter
+    query = dict(parsed.query)
+    if backend == "postgresql" and "sslmode" in query:
+        query["ssl"] = query.pop("sslmode")
+
+    async_url = parsed.set(drivername=ASYNC_DRIVERS[backend], query=query)
+    return async_url.render_as_string(hide_password=False)
+
+
+# INSERT constructs with ON CONFLICT support, by backend
+UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def upsert_insert(db):
+    """
+    Returns the insert() of the session's backend, which supports
+    on_conflict_do_nothing/on_conflict_do_update. Works for sync and
+    async sessions.
+    """
+    return UPSERT_INSERTS[db.get_bind().dialect.name]
+
+
+class _CheckoutTimingMixin:
+    """
+    Records how long each checkout waits for a free connection.
+    The pool's logging name is used as the metric label.
+    """
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.labels(pool=self.logging_name or "default").observe(
+                time.perf_counter() - start
+            )
+
+
+class TimedQueuePool(_CheckoutTimingMixin, QueuePool):
+    """QueuePool that reports checkout wait time."""
+
+
+class TimedAsyncQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    """Async-adapted QueuePool that reports checkout wait time."""
+
+
+def instrument_engine(engine) -> None:
+    """
+    Records statement timings and pool usage of an engine in Prometheus.
+
+    Async engines are instrumented through their sync_engine, since the
+    events fire on the underlying sync engine.
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    pool = sync_engine.pool
+    name = pool.logging_name or "default"
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _stop_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "OTHER"
+        DB_QUERY_SECONDS.labels(pool=name, operation=operation).observe(elapsed)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _drop_timer(exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get("query_start"):
+            conn.info["query_start"].pop()
+
+    # Only QueuePool-based pools report their size
+    if not isinstance(pool, QueuePool):
+        return
+
+    def _update_pool_gauges(*args):
+        DB_POOL_CONNECTIONS.labels(pool=name, state="checked_out").set(pool.checkedout())
+        DB_POOL_CONNECTIONS.labels(pool=name, state="idle").set(pool.checkedin())
+        DB_POOL_CONNECTIONS.labels(pool=name, state="overflow").set(max(pool.overflow(), 0))
+
+    for identifier in ("connect", "checkout", "checkin", "close"):
+        event.listen(pool, identifier, _update_pool_gauges)
+
+
+def engine_options(url: str, name: str, is_async: bool = False) -> dict:
+    """
+    Builds create_engine()/create_async_engine() keyword arguments from Settings.
+
+    Args:
+        url (str): Database URL the engine will connect to.
+        name (str): Pool name used in logs and metrics (e.g. "primary-sync").
+        is_async (bool): Whether the options are for the asyncio driver.
+
+    Returns:
+        dict: Engine keyword arguments.
+    """
+    options = {
+        "echo": settings.db_echo,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        "pool_logging_name": name,
+    }
+
+    # SQLite (used as a local stand-in) has no server pool or statement timeout
+    if make_url(url).get_backend_name() == "sqlite":
+        return options
+
+    options.update(
+        poolclass=TimedAsyncQueuePool if is_async else TimedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+    )
+
+    timeout_ms = settings.db_statement_timeout_ms
+    if timeout_ms:
+        if is_async:
+            options["connect_args"] = {
+                "server_settings": {"statement_timeout": str(timeout_ms)}
+            }
+        else:
+            options["connect_args"] = {
+                "options": f"-c statement_timeout={timeout_ms}"
+            }
+
+    return options
+
+
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL, "primary-sync"))
 
 # Create a session factory for DB sessions
 SessionLocal = sessionmaker(
@@ -30,6 +181,56 @@ SessionLocal = sessionmaker(
     autocommit=False
 )
 
+# Async engine for routes running directly on the event loop.
+# The sync engine above stays in use for Alembic and the remaining sync routes.
+ASYNC_DATABASE_URL = to_async_url(DATABASE_URL)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    **engine_options(ASYNC_DATABASE_URL, "primary-async", is_async=True)
+)
+
+# Objects stay usable after commit, since async sessions cannot lazy-load
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# --- Read replica routing ---
+
+# Read-only GET routes use the replica when one is configured,
+# otherwise they share the primary engines.
+if REPLICA_DATABASE_URL:
+    replica_engine = create_engine(
+        REPLICA_DATABASE_URL,
+        **engine_options(REPLICA_DATABASE_URL, "replica-sync")
+    )
+    ASYNC_REPLICA_DATABASE_URL = to_async_url(REPLICA_DATABASE_URL)
+    async_replica_engine = create_async_engine(
+        ASYNC_REPLICA_DATABASE_URL,
+        **engine_options(ASYNC_REPLICA_DATABASE_URL, "replica-async", is_async=True)
+    )
+else:
+    replica_engine = engine
+    async_replica_engine = async_engine
+
+ReadSessionLocal = sessionmaker(
+    bind=replica_engine,
+    autoflush=False,
+    autocommit=False
+)
+
+AsyncReadSessionLocal = async_sessionmaker(
+    bind=async_replica_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+for _engine in {engine, async_engine.sync_engine,
+                replica_engine, async_replica_engine.sync_engine}:
+    instrument_engine(_engine)
+
+
 def get_db():
     """
     Yield a database session and ensure it is closed after use.
@@ -39,3 +240,30 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def get_read_db():
+    """
+    Yield a read-only database session (replica if configured).
+    """
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    """
+    Yield an async database session and ensure it is closed after use.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    """
+    Yield an async read-only database session (replica if configured).
+    """
+    async with AsyncReadSessionLocal() as db:
+        yield db
@@ -1,14 +1,66 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from app.api.routes import auth, users, patients
 from app.api.routes import reports
+from app.api.routes import exports, icd10, monitoring, usage
+from app.core.metrics import MetricsMiddleware
+from app.core.profiling import ProfilingMiddleware
+from app.core.security import password_executor, revocation_list
+from app.core.warmup import run_warmup
+from app.db import async_engine, async_replica_engine, engine, replica_engine
+from app.utils.openai_client import close_client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm pools, PDF renderer and OpenAI client in the background;
+    # /readyz reports not ready until this has finished
+    warmup_task = asyncio.create_task(run_warmup())
+    revocation_list.start()
+
+    yield
+
+    if not warmup_task.done():
+        warmup_task.cancel()
+        await asyncio.gather(warmup_task, return_exceptions=True)
+
+    revocation_list.stop()
+    password_executor.shutdown(wait=True, cancel_futures=True)
+    close_client()
+
+    for db_engine in {async_engine, async_replica_engine}:
+        await db_engine.dispose()
+    for db_engine in {engine, replica_engine}:
+        db_engine.dispose()
+
+    # Remove this worker's live gauges from the shared metrics directory,
+    # so in-flight and pool gauges of exited workers are not summed
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(os.getpid())
+
 
 app = FastAPI(
     title="PraxisReportAI",
     version="1.0.0",
-    description="API for managing users, patients, reports, and authentication."
+    description="API for managing users, patients, reports, and authentication.",
+    lifespan=lifespan
 )
 
+# Per-route latency and in-flight requests for /metrics
+app.add_middleware(MetricsMiddleware)
+
+# On-demand sampling profiles of single requests (admins only)
+app.add_middleware(ProfilingMiddleware)
+
 app.include_router(auth.router, tags=["Auth"])
 app.include_router(users.router, tags=["Users"])
 app.include_router(patients.router, tags=["Patients"])
 app.include_router(reports.router, tags=["Reports"])
+app.include_router(exports.router, tags=["Export"])
+app.include_router(icd10.router, tags=["ICD-10"])
+app.include_router(usage.router, tags=["Usage"])
+app.include_router(monitoring.router, tags=["Monitoring"])
@@ -4,5 +4,10 @@ from .profile import Profile
 from .patient import Patient
 from .medical_report import MedicalReport
 from .address import Address
+from .auth_token import RefreshToken, RevokedToken, UserInvalidation
+from .usage import ReportGeneration, UsageDaily
 
-__all__ = ["Base", "User", "Profile", "Patient", "MedicalReport", "Address"]
+__all__ = [
+    "Base", "User", "Profile", "Patient", "MedicalReport", "Address",
+    "RefreshToken", "RevokedToken", "UserInvalidation", "ReportGeneration", "UsageDaily",
+]
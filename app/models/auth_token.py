@@ -0,0 +1,62 @@
+from sqlalchemy import Column, DateTime, Index, Integer, String, ForeignKey
+from sqlalchemy.orm import relationship
+from .base import Base, TimestampMixin
+
+class RefreshToken(Base, TimestampMixin):
+    """
+    A long-lived refresh token issued at sign-in.
+
+    Tokens are rotated on every use: the old token is revoked and points
+    to its replacement. All tokens descending from one sign-in share a
+    family_id, so reuse of a rotated token can revoke the whole chain.
+    """
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True)
+    jti = Column(String, nullable=False, unique=True)
+    family_id = Column(String, nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    revoked_at = Column(DateTime(timezone=True), nullable=True)
+    replaced_by_jti = Column(String, nullable=True)
+
+    user = relationship("User")
+
+
+class RevokedToken(Base, TimestampMixin):
+    """
+    An access token revoked before its expiry (e.g. on sign-out).
+
+    Workers mirror unexpired rows into an in-memory set, so checking a
+    token on each request needs no query. created_at is the revocation time.
+    """
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String, primary_key=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    __table_args__ = (
+        # Workers sync incrementally by revocation time
+        Index("ix_revoked_tokens_created_at", "created_at"),
+    )
+
+
+class UserInvalidation(Base, TimestampMixin):
+    """
+    A change that outdates a user's cached principal on every worker:
+    role or profile change, password reset, refresh token reuse, deletion.
+
+    Workers read new rows together with revoked tokens and drop the
+    user's cached principal, so the next request reloads (or rejects)
+    the user. created_at is the time of the change. There is no foreign
+    key, rows must outlive deleted users.
+    """
+    __tablename__ = "user_invalidations"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        # Workers sync incrementally by change time
+        Index("ix_user_invalidations_created_at", "created_at"),
+    )
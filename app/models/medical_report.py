@@ -1,7 +1,17 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Computed, Index, Integer, String, Text, ForeignKey
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 from .base import Base, TimestampMixin
 
+# Weighted German full-text document: title ranks highest, then the final
+# letter, then the raw history and exam notes.
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('german', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('german', coalesce(final_report, '')), 'B') || "
+    "setweight(to_tsvector('german', coalesce(patient_history, '')), 'C') || "
+    "setweight(to_tsvector('german', coalesce(physical_exam, '')), 'C')"
+)
+
 class MedicalReport(Base, TimestampMixin):
     """
     Represents a medical report for a patient, typically generated via AI.
@@ -15,6 +25,25 @@ class MedicalReport(Base, TimestampMixin):
     patient_history = Column(Text)
     physical_exam = Column(Text)
     final_report = Column(Text)
+    # final_report rendered to HTML when it is written (see app.utils.report_html)
+    final_report_html = Column(Text)
+    # Normalised ICD-10-GM code from the report's diagnosis, if it is in the catalogue
+    icd10_code = Column(String, index=True)
+
+    # Generated by Postgres on every insert/update, never written by the app
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(SEARCH_VECTOR_EXPRESSION, persisted=True),
+        nullable=True
+    ))
 
     # Link to the patient that owns this report
     patient = relationship("Patient", back_populates="reports")
+
+    __table_args__ = (
+        Index(
+            "ix_medical_reports_search_vector",
+            "search_vector",
+            postgresql_using="gin"
+        ),
+    )
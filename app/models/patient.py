@@ -10,15 +10,46 @@ class Patient(Base, TimestampMixin):
 
     id = Column(Integer, primary_key=True)
     profile_id = Column(Integer, ForeignKey("profiles.id"), nullable=False)
-    date_of_birth = Column(Date)
+    date_of_birth = Column(Date, index=True)
     gender = Column(String)
     allergies = Column(Text)
     past_illnesses = Column(Text)
     current_diagnosis = Column(Text)
     notes = Column(Text)
     assigned_user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Bumped whenever the patient or their reports change,
+    # so cached generation contexts are reloaded on every worker
+    context_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Relationships
     profile = relationship("Profile", back_populates="patient")
     doctor  = relationship("User", back_populates="patients")
     reports = relationship("MedicalReport", back_populates="patient")
+
+    # Read-only views of the profile, so response schemas can be validated
+    # straight from Patient rows (profile and addresses must be loaded)
+    @property
+    def first_name(self):
+        return self.profile.first_name
+
+    @property
+    def last_name(self):
+        return self.profile.last_name
+
+    @property
+    def email(self):
+        return self.profile.email
+
+    @property
+    def phone_number(self):
+        return self.profile.phone_number
+
+    @property
+    def address(self):
+        """The first address of the patient's profile, or None."""
+        addresses = self.profile.addresses
+        return addresses[0] if addresses else None
+
+    @property
+    def assigned_doctor(self):
+        return self.doctor
@@ -0,0 +1,51 @@
+from sqlalchemy import Column, Date, ForeignKey, Integer, String, UniqueConstraint
+from sqlalchemy.orm import relationship
+from .base import Base, TimestampMixin
+
+class ReportGeneration(Base, TimestampMixin):
+    """
+    One OpenAI call that generated a report: model, tokens and latency.
+
+    Rows are kept when the report or user is deleted, so past usage
+    still adds up; the links are then set to NULL.
+    """
+    __tablename__ = "report_generations"
+
+    id = Column(Integer, primary_key=True)
+    report_id = Column(Integer, ForeignKey("medical_reports.id", ondelete="SET NULL"), index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), index=True)
+    model = Column(String, nullable=False)
+    route = Column(String, nullable=False)  # Settings.llm_routes entry that chose the model
+    prompt_version = Column(String, nullable=False)
+    prompt_tokens = Column(Integer, nullable=False)
+    completion_tokens = Column(Integer, nullable=False)
+    cached_tokens = Column(Integer, nullable=False)
+    cache_status = Column(String, nullable=False)  # hit|miss: OpenAI prompt cache
+    latency_ms = Column(Integer, nullable=False)
+
+    report = relationship("MedicalReport")
+
+
+class UsageDaily(Base, TimestampMixin):
+    """
+    Report generation totals per day, user and model.
+
+    Updated in the same transaction as each ReportGeneration row, so
+    usage endpoints read these few rows instead of scanning generations.
+    """
+    __tablename__ = "usage_daily"
+
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False)  # UTC
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), index=True)
+    model = Column(String, nullable=False)
+    generations = Column(Integer, nullable=False)
+    prompt_tokens = Column(Integer, nullable=False)
+    completion_tokens = Column(Integer, nullable=False)
+    cached_tokens = Column(Integer, nullable=False)
+    latency_ms_total = Column(Integer, nullable=False)
+    latency_ms_max = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("day", "user_id", "model", name="uq_usage_daily_day_user_model"),
+    )
@@ -16,7 +16,22 @@ class User(Base, TimestampMixin):
     title = Column(String, nullable=True) # Optional professional title (e.g., "Dr. med.", "Prof.")
     specialization = Column(String) # Area of medical specialization (e.g., Neurology, Psychiatry)
     practice_name = Column(String)
+    # Bumped to invalidate all issued tokens (role change, password reset)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     # Relationships
     profile = relationship("Profile", back_populates="user", uselist=False)
-    patients = relationship("Patient", back_populates="doctor")
\ No newline at end of file
+    patients = relationship("Patient", back_populates="doctor")
+
+    # Read-only views of the profile for response schemas (e.g. DoctorSummary)
+    @property
+    def first_name(self):
+        return self.profile.first_name
+
+    @property
+    def last_name(self):
+        return self.profile.last_name
+
+    @property
+    def email(self):
+        return self.profile.email
@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class TokenPair(BaseModel):
+    """Access and refresh token returned at sign-in and on refresh."""
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+
+
+class RefreshRequest(BaseModel):
+    """Refresh token to exchange for a new token pair."""
+    refresh_token: str
+
+
+class SignOutRequest(BaseModel):
+    """Optional refresh token to revoke together with the access token."""
+    refresh_token: Optional[str] = None
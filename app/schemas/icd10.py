@@ -0,0 +1,7 @@
+from pydantic import BaseModel
+
+
+class ICD10Entry(BaseModel):
+    """An ICD-10-GM code with its German title."""
+    code: str
+    title: str
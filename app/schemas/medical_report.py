@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Literal, Optional
 from datetime import datetime
 
 class MedicalReportCreate(BaseModel):
@@ -7,6 +7,21 @@ class MedicalReportCreate(BaseModel):
     title: str
     patient_history: str
     physical_exam: str
+    # Selects the model and output budget. Defaults to "initial", which is
+    # routed by prompt size only; "follow_up" allows a shorter letter.
+    report_type: Optional[Literal["initial", "follow_up"]] = None
+
+class MedicalReportPreflight(BaseModel):
+    """Estimated size and duration of generating a report (nothing is generated)."""
+    report_type: str
+    route: str
+    model: str
+    max_tokens: int
+    estimated_prompt_tokens: int
+    estimated_completion_tokens: int
+    expected_latency_ms: int
+    included_report_ids: list[int]  # previous reports sent as context, oldest first
+    available_reports: int          # previous reports the patient has
 
 class MedicalReportUpdate(BaseModel):
     """Schema for updating an existing medical report."""
@@ -14,6 +29,7 @@ class MedicalReportUpdate(BaseModel):
     patient_history: Optional[str] = None
     physical_exam: Optional[str] = None
     final_report: Optional[str] = None
+    icd10_code: Optional[str] = None
 
 class MedicalReportOut(BaseModel):
     """Response schema for a medical report."""
@@ -23,7 +39,26 @@ class MedicalReportOut(BaseModel):
     patient_history: Optional[str]
     physical_exam: Optional[str]
     final_report: Optional[str]
+    final_report_html: Optional[str] = None
+    icd10_code: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
-    model_config = {"from_attributes": True}
\ No newline at end of file
+    model_config = {"from_attributes": True}
+
+class MedicalReportSearchHit(BaseModel):
+    """A single ranked full-text search match with a highlighted snippet."""
+    id: int
+    patient_id: int
+    title: str
+    rank: float
+    snippet: str
+    created_at: datetime
+
+class MedicalReportSearchPage(BaseModel):
+    """One page of full-text search results."""
+    query: str
+    total: int
+    limit: int
+    offset: int
+    items: list[MedicalReportSearchHit]
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 from typing import Optional
 from datetime import date
 from app.schemas.address import AddressCreate, AddressUpdate, AddressOut
@@ -68,3 +68,31 @@ class PatientWithDoctor(PatientDetail):
     """Extended patient detail including assigned doctor info."""
     assigned_doctor: DoctorSummary
 
+# Precompiled validators/serializers for list endpoints. They validate
+# Patient rows directly (from_attributes) and serialize to JSON bytes
+# in pydantic-core, skipping per-item model construction in Python.
+PatientDetailList = TypeAdapter(list[PatientDetail])
+PatientWithDoctorList = TypeAdapter(list[PatientWithDoctor])
+
+class PatientSearchResult(BaseModel):
+    """Compact patient match returned by the typeahead search."""
+    id: int
+    first_name: str
+    last_name: str
+    email: str
+    date_of_birth: Optional[date] = None
+    assigned_user_id: int
+
+    model_config = {"from_attributes": True}
+
+class PatientImportError(BaseModel):
+    """Validation or conflict errors for one row of a bulk import."""
+    row: int
+    email: Optional[str] = None
+    errors: list[str]
+
+class PatientImportResult(BaseModel):
+    """Summary returned by the bulk patient import."""
+    imported: int
+    failed: int
+    errors: list[PatientImportError]
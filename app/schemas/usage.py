@@ -0,0 +1,53 @@
+from datetime import date, datetime
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class ReportGenerationOut(BaseModel):
+    """Token usage and latency of one report generation."""
+    id: int
+    report_id: Optional[int]
+    user_id: Optional[int]
+    model: str
+    route: str
+    prompt_version: str
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int
+    cache_status: str
+    latency_ms: int
+    created_at: datetime
+
+    model_config = {"from_attributes": True}
+
+
+class UsageTotals(BaseModel):
+    """Summed report generation usage."""
+    generations: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    avg_latency_ms: float = 0.0
+    max_latency_ms: int = 0
+
+
+class UsageDay(UsageTotals):
+    """Usage of one day and model."""
+    day: date
+    model: str
+
+
+class UserUsage(BaseModel):
+    """A user's usage per day and model, with totals, for a date range."""
+    user_id: int
+    start: date
+    end: date
+    totals: UsageTotals
+    days: list[UsageDay]
+
+
+class PracticeUsage(UsageTotals):
+    """Usage of all users of a practice for a date range."""
+    practice_name: Optional[str]
+    users: int
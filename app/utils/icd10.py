@@ -0,0 +1,223 @@
+import logging
+import re
+from bisect import bisect_left
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Excerpt of the ICD-10-GM bundled with the app (code<TAB>title per line)
+BUNDLED_CATALOGUE = Path(__file__).resolve().parents[1] / "data" / "icd10gm_excerpt.tsv"
+
+# All 3-character ICD-10-GM categories (one per line), to validate codes
+# the excerpt does not hold
+BUNDLED_CATEGORIES = Path(__file__).resolve().parents[1] / "data" / "icd10_categories.txt"
+
+# A code as written in reports: "G43.1", "g43,1", "G431", "G35.10", "G63.2*", "I64", "G43.-"
+CODE_PATTERN = re.compile(r"([A-Z])\s*(\d{2})(?:[.,]?(\d{1,2}))?(?:\.?-|[+*!†])?", re.IGNORECASE)
+
+# First code-like token in free text such as "G43.1 – Migräne mit Aura"
+CODE_IN_TEXT_PATTERN = re.compile(r"\b[A-Z]\d{2}(?:[.,]\d{1,2}|\d{1,2})?\b", re.IGNORECASE)
+
+# What a code prefix typed into autocomplete looks like ("G4", "g43.", "G43.1", "G431")
+CODE_PREFIX_PATTERN = re.compile(r"[A-Z]\d{0,2}(?:\.?\d{0,2})?", re.IGNORECASE)
+
+WORD_PATTERN = re.compile(r"\w+")
+UMLAUTS = str.maketrans({"ä": "a", "ö": "o", "ü": "u", "ß": "ss"})
+
+
+def normalize_code(raw: str) -> Optional[str]:
+    """
+    Brings an ICD-10 code into the catalogue's form, e.g. "g431" -> "G43.1".
+    Dagger/asterisk/exclamation marks and a trailing "-" are dropped.
+
+    Returns:
+        str | None: The normalised code, or None if `raw` is not an ICD-10 code.
+    """
+    match = CODE_PATTERN.fullmatch(raw.strip())
+    if not match:
+        return None
+    letter, category, subcategory = match.groups()
+    code = letter.upper() + category
+    return f"{code}.{subcategory}" if subcategory else code
+
+
+def _words(text: str) -> list[str]:
+    """Lowercase words with umlauts folded, for title search."""
+    return WORD_PATTERN.findall(text.lower().translate(UMLAUTS))
+
+
+class ICD10Catalogue:
+    """
+    In-memory ICD-10 catalogue with code-prefix and title-word lookup.
+
+    `categories` is given for a catalogue that does not hold every
+    ICD-10-GM code (the bundled excerpt): a code it does not hold then
+    passes validation if its 3-character category is one of them.
+
+    Codes are kept in one sorted list, so a code prefix is found with a
+    binary search. Title words map to the positions of the codes whose
+    title contains them; the sorted word list allows prefix matching of
+    the word being typed.
+    """
+
+    def __init__(self, entries: Iterable[tuple[str, str]], categories: Optional[Iterable[str]] = None):
+        self.categories = frozenset(categories) if categories is not None else None
+        titles = {}
+        for raw_code, title in entries:
+            code = normalize_code(raw_code)
+            if code:
+                titles[code] = title.strip()
+
+        self.titles: dict[str, str] = titles
+        self._codes = sorted(titles, key=lambda code: code.replace(".", ""))
+        self._keys = [code.replace(".", "") for code in self._codes]
+
+        postings: dict[str, set[int]] = {}
+        for position, code in enumerate(self._codes):
+            for word in _words(titles[code]):
+                postings.setdefault(word, set()).add(position)
+        self._words = sorted(postings)
+        self._postings = [frozenset(postings[word]) for word in self._words]
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def lookup(self, code: str) -> Optional[str]:
+        """Returns the title of a code (in any accepted spelling), or None if unknown."""
+        normalized = normalize_code(code)
+        return self.titles.get(normalized) if normalized else None
+
+    def validate(self, code: str) -> Optional[str]:
+        """
+        Returns the normalised code if it is in the catalogue (or, for an
+        incomplete catalogue, its category is known), otherwise None.
+        """
+        normalized = normalize_code(code)
+        if not normalized:
+            return None
+        if normalized in self.titles:
+            return normalized
+        if self.categories is not None and normalized[:3] in self.categories:
+            return normalized
+        return None
+
+    def _code_prefix(self, prefix: str, limit: int) -> list[tuple[str, str]]:
+        key = prefix.upper().replace(".", "")
+        results = []
+        position = bisect_left(self._keys, key)
+        while position < len(self._keys) and len(results) < limit:
+            if not self._keys[position].startswith(key):
+                break
+            code = self._codes[position]
+            results.append((code, self.titles[code]))
+            position += 1
+        return results
+
+    def _word_positions(self, word: str, prefix: bool) -> set[int]:
+        position = bisect_left(self._words, word)
+        if not prefix:
+            if position < len(self._words) and self._words[position] == word:
+                return set(self._postings[position])
+            return set()
+
+        found = set()
+        while position < len(self._words) and self._words[position].startswith(word):
+            found.update(self._postings[position])
+            position += 1
+        return found
+
+    def search(self, query: str, limit: int = 10) -> list[tuple[str, str]]:
+        """
+        Autocomplete for codes and titles.
+
+        A query shaped like a code ("G4", "G43.") returns the codes starting
+        with it. Otherwise every word must appear in the title; the last
+        word may be incomplete ("migräne mit au").
+
+        Returns:
+            list[tuple[str, str]]: Up to `limit` (code, title) pairs in code order.
+        """
+        query = query.strip()
+        if not query:
+            return []
+        if CODE_PREFIX_PATTERN.fullmatch(query):
+            return self._code_prefix(query, limit)
+
+        words = _words(query)
+        if not words:
+            return []
+        # All words but the last must match exactly; the last may be a prefix
+        positions = None
+        for index, word in enumerate(words):
+            matches = self._word_positions(word, prefix=index == len(words) - 1)
+            positions = matches if positions is None else positions & matches
+            if not positions:
+                return []
+
+        return [(self._codes[p], self.titles[self._codes[p]]) for p in sorted(positions)[:limit]]
+
+
+def find_code(text: str) -> Optional[str]:
+    """Returns the first code-like token in `text` (not normalised), or None."""
+    match = CODE_IN_TEXT_PATTERN.search(text or "")
+    return match.group(0) if match else None
+
+
+def code_from_diagnosis(diagnosis: str) -> Optional[str]:
+    """
+    Validates the code of a diagnosis line such as "G43.1 – Migräne mit Aura"
+    (the "icd" entry of extract_diagnosis_block).
+
+    Returns:
+        str | None: The normalised code, or None if there is no code
+            or it does not pass ICD10Catalogue.validate.
+    """
+    code = find_code(diagnosis)
+    return get_catalogue().validate(code) if code else None
+
+
+def _read_lines(path: Path) -> Iterable[str]:
+    """Lines of a catalogue file, without empty lines and "#" comments."""
+    with open(path, encoding="utf-8") as catalogue:
+        for line in catalogue:
+            line = line.rstrip("\n")
+            if line and not line.startswith("#"):
+                yield line
+
+
+def _read_entries(path: Path) -> Iterable[tuple[str, str]]:
+    """
+    Reads "code<TAB>title" lines. Lines with nine or more ";"-separated
+    fields are read as the BfArM "kodes" file (code and title in fields
+    7 and 9). Empty lines and "#" comments are skipped.
+    """
+    for line in _read_lines(path):
+        fields = line.split(";")
+        if len(fields) >= 9:
+            yield fields[6], fields[8]
+        else:
+            code, _, title = line.partition("\t")
+            yield code, title
+
+
+@lru_cache(maxsize=None)
+def get_catalogue() -> ICD10Catalogue:
+    """
+    Returns the shared catalogue, loaded on first use (at warmup) from
+    ICD10_CATALOGUE_PATH or the bundled excerpt. With the excerpt, codes
+    are only validated down to their 3-character category.
+    """
+    if settings.icd10_catalogue_path:
+        return ICD10Catalogue(_read_entries(Path(settings.icd10_catalogue_path)))
+
+    catalogue = ICD10Catalogue(_read_entries(BUNDLED_CATALOGUE), categories=_read_lines(BUNDLED_CATEGORIES))
+    logger.warning(
+        "ICD10_CATALOGUE_PATH is not set: ICD-10 codes are only validated by their category "
+        "(%d categories) and autocomplete covers the bundled excerpt of %d codes",
+        len(catalogue.categories), len(catalogue)
+    )
+    return catalogue
@@ -1,18 +1,123 @@
-import os
-
-from dotenv import load_dotenv
-from openai import OpenAI
+import logging
 import re
+import time
+from dataclasses import dataclass
 from datetime import date
+from functools import lru_cache
 
-# Load environment variables from .env
-load_dotenv()
+from app.core.circuit import CircuitBreaker
+from app.core.config import LLMRoute, settings
+from app.core.metrics import LLM_ERRORS_TOTAL, LLM_REQUEST_SECONDS, LLM_TOKENS_TOTAL
+from app.utils.tokens import estimate_chat_tokens
 
-# Initialize OpenAI client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+logger = logging.getLogger(__name__)
 
+# Report types the routing policy (Settings.llm_routes) distinguishes
+REPORT_TYPES = ("initial", "follow_up")
 
-def generate_medical_report(
+# Stops calling OpenAI for a while after repeated failures, so requests
+# fail fast instead of each waiting for a timeout
+llm_circuit = CircuitBreaker(
+    failure_threshold=settings.llm_circuit_failure_threshold,
+    reset_seconds=settings.llm_circuit_reset_seconds
+)
+
+
+# Diagnosis lines ("- ICD-10: ...", "GVA: ...", "Z: ...") in generated reports
+DIAGNOSIS_LINE_PATTERN = re.compile(r"(ICD-10|GVA|Z):\s*(.+)")
+DIAGNOSIS_KEYS = {"ICD-10": "icd", "GVA": "gva", "Z": "z"}
+
+# Markdown bold markers (**...**)
+BOLD_PATTERN = re.compile(r"\*\*(.*?)\*\*")
+
+
+class LLMUnavailableError(RuntimeError):
+    """Raised when OpenAI is skipped because the circuit breaker is open."""
+
+
+@dataclass(frozen=True)
+class GeneratedReport:
+    """A generated report with what it cost (token counts are 0 if OpenAI sent no usage)."""
+    text: str
+    model: str
+    route: str
+    prompt_version: str
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int
+    latency_ms: int
+
+
+@lru_cache(maxsize=None)
+def get_client():
+    """
+    Returns the shared OpenAI client, created on first use.
+
+    The SDK is imported here rather than at module level,
+    since it is slow to import and only needed for report generation.
+    """
+    from openai import OpenAI
+
+    return OpenAI(api_key=settings.openai_api_key)
+
+
+def close_client() -> None:
+    """Closes the shared OpenAI client's HTTP connections, if it was created."""
+    if get_client.cache_info().currsize:
+        get_client().close()
+        get_client.cache_clear()
+
+
+# Version of the static prompt layout below. Bump it whenever
+# SYSTEM_MESSAGE or STATIC_INSTRUCTIONS change, so token and cache
+# metrics from different layouts can be told apart.
+PROMPT_VERSION = "2"
+
+SYSTEM_MESSAGE = (
+    "Du bist ein medizinischer Experte und erstellst präzise medizinische Berichte auf Deutsch. "
+    "Füge keine rechtlichen Hinweise oder allgemeinen Disclaimer am Ende des Berichts hinzu. "
+    "Vermeide am Ende des Berichts pauschale Empfehlungen wie 'regelmäßige Verlaufskontrollen' "
+    "oder allgemeine Formulierungen, es sei denn, sie ergeben sich konkret aus den vorliegenden Befunden."
+)
+
+# Section instructions that do not depend on the patient
+SECTION_INSTRUCTIONS = "\n\n".join([
+    #"Verwende folgende Abschnitte und **fülle sie sehr ausführlich aus**:",
+    "Verwende folgende Abschnitte:",
+    "**Zusammenfassung:**",
+    "Enthält eine kurze fachliche Zusammenfassung der Anamnese und Befunde.",
+    "Schließe am Ende der Zusammenfassung eine strukturierte Diagnose mit folgenden Punkten ein:",
+    "- ICD-10: (Diagnose-Code und Bezeichnung, z. B. G45.9 – Transitorische zerebrale Ischämie)",
+    "- GVA: (Was ausgeschlossen wurde)",
+    "- Z: (Zustand nach ...)",
+    "**Therapie:**",
+    "Beschreibe die durchgeführte oder empfohlene Therapie.",
+    "**Empfohlene Medikation:**",
+    "Liste Medikamente auf, inklusive Dosierung und Häufigkeit, wenn verfügbar.",
+    "Schreibe sachlich, klar und ohne Platzhalter wie Name, Datum oder Geschlecht.",
+])
+
+CONTEXT_INTRO = (
+    "Die folgenden Informationen dienen **ausschließlich als Kontext**, "
+    "um dir ein besseres medizinisches Gesamtbild zu vermitteln. "
+    "Bitte **vermeide es, Textstellen direkt zu übernehmen**. "
+    "Du darfst jedoch relevante Inhalte sinngemäß berücksichtigen, "
+    "wenn sie für die Beurteilung medizinisch wichtig sind:\n\n"
+)
+
+# Start of every user prompt, identical for all requests. OpenAI caches
+# prompt prefixes, so nothing request-specific may appear before its end.
+STATIC_INSTRUCTIONS = "\n\n".join([
+    "Du bist ein erfahrener Neurologe. Erstelle einen strukturierten medizinischen Bericht "
+    "in professionellem Deutsch auf Basis der Informationen am Ende dieser Nachricht.",
+    # Uncomment this line to generate in English for demo purposes
+    # "Please create the report in English.",
+    SECTION_INSTRUCTIONS,
+    "Verwende den angegebenen Titel des Berichts bitte **nicht** im Text.",
+])
+
+
+def build_prompt(
         title: str,
         history: str,
         exam: str,
@@ -25,51 +130,21 @@ def generate_medical_report(
         patient_dob: date = None
 ) -> str:
     """
-    Generate a structured medical report in professional German using OpenAI.
+    Assemble the user prompt for report generation (see generate_medical_report).
 
-    Args:
-        title (str): Report title (not included in output).
-        history (str): Patient history (Anamnese).
-        exam (str): Physical examination results (Körperliche Untersuchung).
-        gender (str, optional): Patient gender to guide phrasing.
-        allergies (str, optional): Known allergies.
-        past_illnesses (str, optional): past medical conditions.
-        current_dx (str, optional): Current diagnoses.
-        notes (str, optional): Additional notes.
-        previous_reports (list[str], optional): Past reports to use as context.
-        patient_dob (date, optional): Date of birth to calculate and include patient’s age.
+    The prompt is STATIC_INSTRUCTIONS followed by the request-specific
+    part. That part starts with the patient context, which stays the same
+    across a patient's generations, and ends with this request's title,
+    history and exam, so repeated generations share the longest prefix.
 
     Returns:
-        str: Generated medical report in German.
+        str: The complete prompt.
     """
     # Determine gender-specific wording
     is_female = gender.lower() == "weiblich"
     patient_term = "die Patientin" if is_female else "der Patient"
 
-    # Base instruction
-    sections = [
-        "Du bist ein erfahrener Neurologe. Erstelle einen strukturierten medizinischen Bericht "
-        "in professionellem Deutsch auf Basis folgender Informationen.",
-        # Uncomment this line to generate in English for demo purposes
-        # "Please create the report in English.",
-        f"Der Titel des Berichts lautet: {title.strip()}, aber verwende ihn bitte **nicht** im Text.",
-        #"Verwende folgende Abschnitte und **fülle sie sehr ausführlich aus**:",
-        "Verwende folgende Abschnitte:",
-        "**Zusammenfassung:**",
-        "Enthält eine kurze fachliche Zusammenfassung der Anamnese und Befunde.",
-        "Schließe am Ende der Zusammenfassung eine strukturierte Diagnose mit folgenden Punkten ein:",
-        "- ICD-10: (Diagnose-Code und Bezeichnung, z. B. G45.9 – Transitorische zerebrale Ischämie)",
-        "- GVA: (Was ausgeschlossen wurde)",
-        "- Z: (Zustand nach ...)",
-        "**Therapie:**",
-        "Beschreibe die durchgeführte oder empfohlene Therapie.",
-        "**Empfohlene Medikation:**",
-        "Liste Medikamente auf, inklusive Dosierung und Häufigkeit, wenn verfügbar.",
-        f"Schreibe sachlich, klar und ohne Platzhalter wie Name, Datum oder Geschlecht.",
-        f"Beziehe dich auf {patient_term} nur wenn nötig.",
-        f"Anamnese:\n{history.strip()}",
-        f"Körperliche Untersuchung:\n{exam.strip()}"
-    ]
+    sections = [STATIC_INSTRUCTIONS]
 
     context_parts = []
     if patient_dob:
@@ -88,44 +163,217 @@ def generate_medical_report(
         context_parts.append(joined)
 
     if context_parts:
-        sections.append(
-            "Die folgenden Informationen dienen **ausschließlich als Kontext**, "
-            "um dir ein besseres medizinisches Gesamtbild zu vermitteln. "
-            "Bitte **vermeide es, Textstellen direkt zu übernehmen**. "
-            "Du darfst jedoch relevante Inhalte sinngemäß berücksichtigen, "
-            "wenn sie für die Beurteilung medizinisch wichtig sind:\n\n"
-            + "\n\n".join(context_parts)
-        )
+        sections.append(CONTEXT_INTRO + "\n\n".join(context_parts))
 
-    # Final instruction
-    sections.append("Erstelle jetzt den Abschlussbericht mit medizinischer Fachsprache.")
+    # The new findings, which differ on every request
+    sections += [
+        f"Beziehe dich auf {patient_term} nur wenn nötig.",
+        f"Titel des Berichts: {title.strip()}",
+        f"Anamnese:\n{history.strip()}",
+        f"Körperliche Untersuchung:\n{exam.strip()}",
+        # Final instruction
+        "Erstelle jetzt den Abschlussbericht mit medizinischer Fachsprache."
+    ]
 
     # Combine into full prompt
-    prompt = "\n\n".join(sections)
+    return "\n\n".join(sections)
 
-    # Call OpenAI API
-    response = client.chat.completions.create(
-        model="gpt-3.5-turbo",
+
+@dataclass(frozen=True)
+class GenerationPlan:
+    """The prompt of a report generation and the route chosen for it."""
+    prompt: str
+    input_tokens: int  # estimated, including the system message
+    report_type: str
+    route: LLMRoute
+
+
+def choose_route(input_tokens: int, report_type: str) -> LLMRoute:
+    """
+    Picks the first route of Settings.llm_routes that accepts the report
+    type and the estimated prompt size.
+
+    Returns:
+        LLMRoute: The matching route, or the last route if none matches.
+    """
+    for route in settings.llm_routes:
+        if route.report_types is not None and report_type not in route.report_types:
+            continue
+        if route.max_input_tokens is not None and input_tokens > route.max_input_tokens:
+            continue
+        return route
+    return settings.llm_routes[-1]
+
+
+def plan_generation(
+        title: str,
+        history: str,
+        exam: str,
+        gender: str = "",  # "weiblich" or "männlich"
+        allergies: str = "",
+        past_illnesses: str = "",
+        current_dx: str = "",
+        notes: str = "",
+        previous_reports: list[str] = None,
+        patient_dob: date = None,
+        report_type: str = "initial"
+) -> GenerationPlan:
+    """
+    Builds the prompt and picks the route for a report generation
+    without calling OpenAI (arguments as for generate_medical_report).
+
+    Returns:
+        GenerationPlan: Prompt, estimated prompt tokens and route.
+    """
+    prompt = build_prompt(
+        title=title,
+        history=history,
+        exam=exam,
+        gender=gender,
+        allergies=allergies,
+        past_illnesses=past_illnesses,
+        current_dx=current_dx,
+        notes=notes,
+        previous_reports=previous_reports,
+        patient_dob=patient_dob
+    )
+    input_tokens = estimate_chat_tokens(SYSTEM_MESSAGE, prompt)
+    return GenerationPlan(
+        prompt=prompt,
+        input_tokens=input_tokens,
+        report_type=report_type,
+        route=choose_route(input_tokens, report_type)
+    )
+
+
+def generate_medical_report(
+        title: str,
+        history: str,
+        exam: str,
+        gender: str = "",  # "weiblich" or "männlich"
+        allergies: str = "",
+        past_illnesses: str = "",
+        current_dx: str = "",
+        notes: str = "",
+        previous_reports: list[str] = None,
+        patient_dob: date = None,
+        report_type: str = "initial"
+) -> GeneratedReport:
+    """
+    Generate a structured medical report in professional German using OpenAI.
+
+    Args:
+        title (str): Report title (not included in output).
+        history (str): Patient history (Anamnese).
+        exam (str): Physical examination results (Körperliche Untersuchung).
+        gender (str, optional): Patient gender to guide phrasing.
+        allergies (str, optional): Known allergies.
+        past_illnesses (str, optional): past medical conditions.
+        current_dx (str, optional): Current diagnoses.
+        notes (str, optional): Additional notes.
+        previous_reports (list[str], optional): Past reports to use as context.
+        patient_dob (date, optional): Date of birth to calculate and include patient’s age.
+        report_type (str, optional): One of REPORT_TYPES; with the prompt size it
+            selects the model and output budget (see choose_route).
+
+    Returns:
+        GeneratedReport: The report in German, with model, token usage and latency.
+
+    Raises:
+        LLMUnavailableError: If recent OpenAI calls failed and the circuit is open.
+    """
+    plan = plan_generation(
+        title=title,
+        history=history,
+        exam=exam,
+        gender=gender,
+        allergies=allergies,
+        past_illnesses=past_illnesses,
+        current_dx=current_dx,
+        notes=notes,
+        previous_reports=previous_reports,
+        patient_dob=patient_dob,
+        report_type=report_type
+    )
+    route = plan.route
+    logger.info(
+        "Report generation routed to %s: model=%s max_tokens=%d (report_type=%s, ~%d prompt tokens)",
+        route.name, route.model, route.max_tokens, report_type, plan.input_tokens
+    )
+
+    if not llm_circuit.allow():
+        raise LLMUnavailableError("Report generation is temporarily unavailable")
+
+    # Call OpenAI API, recording latency, token usage and failures
+    start = time.perf_counter()
+    try:
+        response = _create_completion(plan.prompt, route)
+    except Exception as exc:
+        llm_circuit.record_failure()
+        LLM_REQUEST_SECONDS.labels(model=route.model, route=route.name, outcome="error").observe(
+            time.perf_counter() - start
+        )
+        LLM_ERRORS_TOTAL.labels(model=route.model, error=type(exc).__name__).inc()
+        raise
+
+    elapsed = time.perf_counter() - start
+    llm_circuit.record_success()
+    LLM_REQUEST_SECONDS.labels(model=route.model, route=route.name, outcome="success").observe(elapsed)
+    usage = response.usage
+    tokens = {
+        "prompt": usage.prompt_tokens if usage else 0,
+        "completion": usage.completion_tokens if usage else 0,
+        "cached_prompt": cached_tokens(usage) if usage else 0,
+    }
+    for kind, count in tokens.items():
+        LLM_TOKENS_TOTAL.labels(model=route.model, kind=kind, prompt_version=PROMPT_VERSION).inc(count)
+
+    choice = response.choices[0]
+    logger.info(
+        "Report generation on route %s took %.2fs (finish_reason=%s)",
+        route.name, elapsed, choice.finish_reason
+    )
+    if choice.finish_reason == "length":
+        logger.warning("Report on route %s was cut off at max_tokens=%d", route.name, route.max_tokens)
+
+    return GeneratedReport(
+        text=choice.message.content.strip(),
+        model=route.model,
+        route=route.name,
+        prompt_version=PROMPT_VERSION,
+        prompt_tokens=tokens["prompt"],
+        completion_tokens=tokens["completion"],
+        cached_tokens=tokens["cached_prompt"],
+        latency_ms=round(elapsed * 1000)
+    )
+
+
+def _create_completion(prompt: str, route: LLMRoute):
+    """Sends the report prompt to the chat completions API with the route's settings."""
+    return get_client().chat.completions.create(
+        model=route.model,
         messages=[
             {
                 "role": "system",
-                "content": (
-                    "Du bist ein medizinischer Experte und erstellst präzise medizinische Berichte auf Deutsch. "
-                    "Füge keine rechtlichen Hinweise oder allgemeinen Disclaimer am Ende des Berichts hinzu. "
-                    "Vermeide am Ende des Berichts pauschale Empfehlungen wie 'regelmäßige Verlaufskontrollen' "
-                    "oder allgemeine Formulierungen, es sei denn, sie ergeben sich konkret aus den vorliegenden Befunden."
-                )
+                "content": SYSTEM_MESSAGE
             },
             {
                 "role": "user",
                 "content": prompt
             }
         ],
-        temperature=0.6,
-        max_tokens=3000
+        temperature=route.temperature,
+        max_tokens=route.max_tokens
     )
 
-    return response.choices[0].message.content.strip()
+
+def cached_tokens(usage) -> int:
+    """
+    Prompt tokens OpenAI served from its prompt cache, from a response's
+    `usage`. 0 if the model or API version does not report them.
+    """
+    details = getattr(usage, "prompt_tokens_details", None)
+    return getattr(details, "cached_tokens", None) or 0
 
 
 def extract_diagnosis_block(final_report: str) -> dict:
@@ -145,16 +393,16 @@ def extract_diagnosis_block(final_report: str) -> dict:
         "z": ""
     }
 
-    icd_match = re.search(r"[-–•]?\s*ICD-10:\s*(.+)", final_report)
-    gva_match = re.search(r"[-–•]?\s*GVA:\s*(.+)", final_report)
-    z_match = re.search(r"[-–•]?\s*Z:\s*(.+)", final_report)
-
-    if icd_match:
-        diagnosis["icd"] = clean_markdown(icd_match.group(1))
-    if gva_match:
-        diagnosis["gva"] = clean_markdown(gva_match.group(1))
-    if z_match:
-        diagnosis["z"] = clean_markdown(z_match.group(1))
+    # One scan over the report; stops once all three labels were found.
+    # The first occurrence of each label wins.
+    remaining = len(diagnosis)
+    for match in DIAGNOSIS_LINE_PATTERN.finditer(final_report):
+        key = DIAGNOSIS_KEYS[match.group(1)]
+        if not diagnosis[key]:
+            diagnosis[key] = clean_markdown(match.group(2))
+            remaining -= 1
+            if not remaining:
+                break
 
     return diagnosis
 
@@ -163,7 +411,9 @@ def clean_markdown(text: str) -> str:
     """
     Removes Markdown-style bold markers (**...**) from the given text.
     """
-    return re.sub(r"\*\*(.*?)\*\*", r"\1", text).strip()
+    if "**" not in text:
+        return text.strip()
+    return BOLD_PATTERN.sub(r"\1", text).strip()
 
 
 def calculate_age(dob: date) -> int:
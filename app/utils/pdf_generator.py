@@ -1,11 +1,62 @@
 import os
-from jinja2 import Environment, FileSystemLoader
-from weasyprint import HTML
+import time
+from functools import lru_cache
 
-TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), '..', 'templates')
-STATIC_DIR = os.path.join(os.path.dirname(__file__), '..', 'static')
+from app.core.metrics import PDF_RENDER_SECONDS
+
+# Jinja2 and WeasyPrint (Pango/Cairo) are imported on first use,
+# so importing the app does not pay for loading them.
+
+# Set after the first successful render; the first one loads
+# WeasyPrint and its fonts and is much slower than later ones
+_renderer_warm = False
+
+TEMPLATES_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'templates'))
+STATIC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'static'))
+
+
+@lru_cache(maxsize=None)
+def get_template_env():
+    """
+    Returns the shared Jinja2 environment for the report templates.
+    Compiled templates are cached by the environment across calls.
+    """
+    from jinja2 import Environment, FileSystemLoader
+
+    return Environment(loader=FileSystemLoader(TEMPLATES_DIR))
+
+
+def is_renderer_warm() -> bool:
+    """Returns True once a PDF has been rendered successfully in this process."""
+    return _renderer_warm
+
+
+def render_pdf(html: str, base_url: str = None) -> bytes:
+    """
+    Convert rendered HTML into PDF bytes.
+
+    Args:
+        html (str): The complete HTML document.
+        base_url (str, optional): Base for resolving relative URLs (images, CSS).
+
+    Returns:
+        bytes: The generated PDF document.
+
+    Raises:
+        weasyprint.WeasyPrintError: If PDF generation fails.
+    """
+    global _renderer_warm
+    from weasyprint import HTML
+
+    start = time.perf_counter()
+    try:
+        pdf = HTML(string=html, base_url=base_url).write_pdf()
+    finally:
+        PDF_RENDER_SECONDS.observe(time.perf_counter() - start)
+
+    _renderer_warm = True
+    return pdf
 
-env = Environment(loader=FileSystemLoader(TEMPLATES_DIR))
 
 def generate_pdf(data: dict, output_path: str):
     """
@@ -20,7 +71,7 @@ def generate_pdf(data: dict, output_path: str):
         weasyprint.WeasyPrintError: If PDF generation fails.
     """
     # Load the template file
-    template = env.get_template("report_template.html")
+    template = get_template_env().get_template("report_template.html")
 
     # Render HTML with dynamic data and logo path
     html_out = template.render(
@@ -29,4 +80,5 @@ def generate_pdf(data: dict, output_path: str):
     )
 
     # Generate and write the PDF to the specified file
-    HTML(string=html_out, base_url=STATIC_DIR).write_pdf(output_path)
\ No newline at end of file
+    with open(output_path, "wb") as pdf_file:
+        pdf_file.write(render_pdf(html_out, base_url=STATIC_DIR))
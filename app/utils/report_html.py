@@ -0,0 +1,131 @@
+import re
+from html import escape
+
+# The Markdown subset the report model produces:
+# - "**Zusammenfassung:**" section lines and "#"-headings
+# - "-", "*", "•" and "1." list items, nested by indentation
+# - paragraphs with single line breaks, "---" rules
+# - **bold**, *italic*, ***both*** and `code` inside any line
+
+HEADING_PATTERN = re.compile(r"(#{1,6})\s+(.+?)\s*#*")
+SECTION_LINE_PATTERN = re.compile(r"\*\*([^*]+?)\*\*(:?)")
+LIST_ITEM_PATTERN = re.compile(r"([ \t]*)(?:([-*•])|(\d{1,3})[.)])\s+(.*)")
+RULE_PATTERN = re.compile(r"(?:-{3,}|\*{3,}|_{3,})")
+
+INLINE_PATTERN = re.compile(
+    # ***bold italic***
+    r"\*\*\*(?=\S)(.+?)(?<=\S)\*\*\*"
+    # **bold**, which may contain *italic* spans
+    r"|\*\*(?=\S)((?:[^*]++|\*[^*\s][^*]*?\*)+?)(?<=\S)\*\*"
+    # *italic*, not inside words like a*b*c
+    r"|(?<![\w*])\*(?=\S)(.+?)(?<=\S)\*(?![\w*])"
+    # `code`
+    r"|`([^`]+)`"
+)
+ITALIC_PATTERN = re.compile(r"(?<![\w*])\*(?=\S)(.+?)(?<=\S)\*(?![\w*])")
+
+
+def _inline_replacement(match: re.Match) -> str:
+    bold_italic, bold, italic, code = match.groups()
+    if bold_italic is not None:
+        return f"<strong><em>{bold_italic}</em></strong>"
+    if bold is not None:
+        # Italics may be nested inside bold text
+        return "<strong>" + ITALIC_PATTERN.sub(r"<em>\1</em>", bold) + "</strong>"
+    if italic is not None:
+        return f"<em>{italic}</em>"
+    return f"<code>{code}</code>"
+
+
+def render_inline(text: str) -> str:
+    """Escapes HTML in a single line and converts its inline Markdown."""
+    escaped = escape(text.strip(), quote=False)
+    if "*" not in escaped and "`" not in escaped:
+        return escaped
+    return INLINE_PATTERN.sub(_inline_replacement, escaped)
+
+
+def _indent_width(indent: str) -> int:
+    return len(indent.expandtabs(4))
+
+
+def render_report_html(text: str) -> str:
+    """
+    Converts a generated report (Markdown subset, see above) into HTML
+    for the PDF template and previews.
+
+    The text is read line by line in a single pass. Any HTML in the
+    text is escaped, and unmatched markers (e.g. a lone "**") are kept
+    as text rather than producing broken tags.
+
+    Returns:
+        str: The HTML fragment, or "" for empty input.
+    """
+    if not text:
+        return ""
+
+    html = []
+    paragraph = []  # rendered lines of the open paragraph
+    lists = []      # open lists as (indent, tag), innermost last
+
+    def close_paragraph():
+        if paragraph:
+            html.append("<p>" + "<br>".join(paragraph) + "</p>")
+            paragraph.clear()
+
+    def close_lists(indent: int = -1):
+        while lists and lists[-1][0] > indent:
+            html.append(f"</li></{lists.pop()[1]}>")
+
+    for line in text.splitlines():
+        stripped = line.strip()
+
+        # Blank lines end a paragraph; lists stay open for the next item
+        if not stripped:
+            close_paragraph()
+            continue
+
+        item = LIST_ITEM_PATTERN.fullmatch(line)
+        if item:
+            close_paragraph()
+            indent = _indent_width(item.group(1))
+            tag = "ul" if item.group(2) else "ol"
+
+            close_lists(indent)
+            if lists and lists[-1][0] == indent and lists[-1][1] != tag:
+                close_lists(indent - 1)
+
+            if lists and lists[-1][0] == indent:
+                html.append("</li><li>" + render_inline(item.group(4)))
+            else:
+                # Nested lists open inside the current <li>
+                lists.append((indent, tag))
+                html.append(f"<{tag}><li>" + render_inline(item.group(4)))
+            continue
+
+        # Indented text continues the current list item
+        if lists and line[:1].isspace():
+            html[-1] += "<br>" + render_inline(stripped)
+            continue
+
+        close_lists()
+
+        if RULE_PATTERN.fullmatch(stripped):
+            close_paragraph()
+            html.append("<hr>")
+            continue
+
+        heading = HEADING_PATTERN.fullmatch(stripped)
+        section = heading is None and SECTION_LINE_PATTERN.fullmatch(stripped)
+        if heading or section:
+            close_paragraph()
+            level = 3 if heading is None or len(heading.group(1)) <= 2 else 4
+            title = heading.group(2) if heading else section.group(1) + section.group(2)
+            html.append(f'<h{level} class="report-section">{render_inline(title)}</h{level}>')
+            continue
+
+        paragraph.append(render_inline(stripped))
+
+    close_paragraph()
+    close_lists()
+    return "\n".join(html)
@@ -0,0 +1,203 @@
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+
+from app.core.config import settings
+
+# Words of two or more letters/digits; numbers alone are skipped
+TOKEN_PATTERN = re.compile(r"\w{2,}")
+
+# Frequent German function words, which carry no topic
+STOPWORDS = frozenset("""
+    aber alle als also am an auch auf aus bei bis da damit dann das dass dem den
+    der des die dies diese dieser doch du durch ein eine einem einen einer eines
+    er es für hat hatte ich ihr im in ist ja kein keine mit nach nicht noch nur
+    ob oder ohne seit sich sie sind so über um und uns unter vom von vor war
+    waren was wegen wenn wie wir wird wurde wurden zu zum zur zwischen
+""".split())
+
+# Double letters, protected from suffix stripping while stemming
+DOUBLE_LETTER_PATTERN = re.compile(r"(.)\1")
+PROTECTED_DOUBLE_PATTERN = re.compile(r"(.)\*")
+
+# BM25 parameters (term frequency saturation, length normalisation)
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+@lru_cache(maxsize=100000)
+def stem(word: str) -> str:
+    """
+    Stems a lowercase German word with CISTEM (Weissweiler & Fraser, 2017).
+
+    Umlauts are folded and common suffixes are stripped, so that e.g.
+    "Kopfschmerzen" and "Kopfschmerz" share the stem "kopfschmerz".
+    """
+    word = word.replace("ü", "u").replace("ö", "o").replace("ä", "a").replace("ß", "ss")
+    if word.startswith("ge") and len(word) >= 6:
+        word = word[2:]
+
+    # Protect letter groups and double letters from suffix stripping
+    word = word.replace("sch", "$").replace("ei", "%").replace("ie", "&")
+    word = DOUBLE_LETTER_PATTERN.sub(r"\1*", word)
+
+    while len(word) > 3:
+        if len(word) > 5 and word[-2:] in ("em", "er", "nd"):
+            word = word[:-2]
+        elif word[-1] in "testn":
+            word = word[:-1]
+        else:
+            break
+
+    word = PROTECTED_DOUBLE_PATTERN.sub(r"\1\1", word)
+    return word.replace("%", "ei").replace("&", "ie").replace("$", "sch")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercases, splits and stems text; stopwords and numbers are dropped."""
+    return [
+        stem(token)
+        for token in TOKEN_PATTERN.findall(text.lower())
+        if token not in STOPWORDS and not token.isdigit()
+    ]
+
+
+class PatientReportIndex:
+    """
+    BM25 index over one patient's reports.
+
+    Each report is stored with the `updated_at` it was indexed at, so
+    callers can find reports that are new or changed since (see stale_ids)
+    and re-index only those.
+    """
+
+    def __init__(self):
+        self.versions: dict[int, datetime] = {}
+        self._terms: dict[int, Counter] = {}
+        self._lengths: dict[int, int] = {}
+        self._document_frequency: Counter = Counter()
+        self._total_length = 0
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.versions)
+
+    def add(self, report_id: int, updated_at: datetime, text: str) -> None:
+        """Indexes a report, replacing a previously indexed version."""
+        self.remove(report_id)
+        terms = Counter(tokenize(text))
+        self.versions[report_id] = updated_at
+        self._terms[report_id] = terms
+        self._lengths[report_id] = sum(terms.values())
+        self._document_frequency.update(terms.keys())
+        self._total_length += self._lengths[report_id]
+
+    def remove(self, report_id: int) -> None:
+        """Drops a report from the index, if present."""
+        if report_id not in self.versions:
+            return
+        del self.versions[report_id]
+        for term in self._terms.pop(report_id):
+            self._document_frequency[term] -= 1
+            if not self._document_frequency[term]:
+                del self._document_frequency[term]
+        self._total_length -= self._lengths.pop(report_id)
+
+    def stale_ids(self, current: dict[int, datetime]) -> list[int]:
+        """
+        Compares the index with the patient's current reports ({id: updated_at}).
+        Reports that no longer exist are removed.
+
+        Returns:
+            list[int]: Ids of reports that are missing or outdated in the index.
+        """
+        for report_id in [i for i in self.versions if i not in current]:
+            self.remove(report_id)
+        return [i for i, updated_at in current.items() if self.versions.get(i) != updated_at]
+
+    def search(self, query: str, k: int) -> list[int]:
+        """
+        Ranks the indexed reports against `query` with BM25.
+
+        Returns:
+            list[int]: Up to `k` report ids, best match first.
+                Reports sharing no term with the query are left out.
+        """
+        if not self.versions:
+            return []
+
+        count = len(self.versions)
+        average_length = self._total_length / count or 1
+        scores: dict[int, float] = {}
+
+        for term in set(tokenize(query)):
+            frequency = self._document_frequency.get(term)
+            if not frequency:
+                continue
+            idf = math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+            for report_id, terms in self._terms.items():
+                tf = terms.get(term)
+                if not tf:
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[report_id] / average_length)
+                scores[report_id] = scores.get(report_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        ranked = sorted(scores, key=lambda i: (-scores[i], -i))
+        return ranked[:k]
+
+
+class ReportIndexRegistry:
+    """
+    Per-worker BM25 indexes, one per patient, for the `max_patients` most
+    recently used patients. Evicted patients are re-indexed on next use.
+    """
+
+    def __init__(self, max_patients: int):
+        self.max_patients = max_patients
+        self._indexes: OrderedDict[int, PatientReportIndex] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, patient_id: int) -> PatientReportIndex:
+        """Returns the patient's index, creating an empty one if needed."""
+        with self._lock:
+            index = self._indexes.get(patient_id)
+            if index is None:
+                index = self._indexes[patient_id] = PatientReportIndex()
+                while len(self._indexes) > self.max_patients:
+                    self._indexes.popitem(last=False)
+            else:
+                self._indexes.move_to_end(patient_id)
+            return index
+
+    def peek(self, patient_id: int) -> Optional[PatientReportIndex]:
+        """Returns the patient's index if this worker has one."""
+        with self._lock:
+            return self._indexes.get(patient_id)
+
+    def update(self, patient_id: int, report_id: int, updated_at: datetime, text: str) -> None:
+        """Re-indexes a saved report, if the patient's index is loaded."""
+        index = self.peek(patient_id)
+        if index is not None:
+            with index.lock:
+                index.add(report_id, updated_at, text)
+
+    def discard(self, patient_id: int, report_id: int) -> None:
+        """Removes a deleted report, if the patient's index is loaded."""
+        index = self.peek(patient_id)
+        if index is not None:
+            with index.lock:
+                index.remove(report_id)
+
+
+def report_document(title: Optional[str], *parts: Optional[str]) -> str:
+    """Text indexed for a report: its title followed by the non-empty parts."""
+    return "\n".join(part for part in (title, *parts) if part)
+
+
+
+# Shared by all requests of this worker
+report_indexes = ReportIndexRegistry(max_patients=settings.report_index_max_patients)
@@ -0,0 +1,33 @@
+import re
+
+# Words and single punctuation characters, the pieces BPE tokenizers split on
+TOKEN_PIECE_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+# Letters per token within a word; long German compounds ("Kopfschmerzen")
+# are split into several tokens
+CHARS_PER_WORD_TOKEN = 4
+
+# Tokens the chat format adds per message and for priming the reply
+TOKENS_PER_MESSAGE = 4
+TOKENS_PER_REPLY = 3
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimates the number of tokens in `text` without a tokenizer.
+
+    Every punctuation character counts as one token and every word as one
+    token per started CHARS_PER_WORD_TOKEN characters. This is rough, but
+    enough for choosing a model and an output budget.
+    """
+    if not text:
+        return 0
+    return sum(
+        (len(piece) + CHARS_PER_WORD_TOKEN - 1) // CHARS_PER_WORD_TOKEN
+        for piece in TOKEN_PIECE_PATTERN.findall(text)
+    )
+
+
+def estimate_chat_tokens(*messages: str) -> int:
+    """Estimates the prompt tokens of a chat completion request with these message contents."""
+    return sum(estimate_tokens(message) + TOKENS_PER_MESSAGE for message in messages) + TOKENS_PER_REPLY
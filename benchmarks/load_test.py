@@ -0,0 +1,528 @@
+"""
+End-to-end load test: how many concurrent doctors does one worker serve?
+
+The script
+- prepares a database: a local Postgres (migrated with Alembic) or, without
+  one, a fresh SQLite file
+- seeds doctors, patients and reports through the app's models
+- starts a fake OpenAI server with configurable latency
+- starts the app with uvicorn, pointing the OpenAI client at the fake
+- lets --concurrency virtual doctors replay a mix of signin, patient list,
+  report creation and PDF download for --duration seconds
+- prints p50/p95/p99 latency and throughput per endpoint
+
+Usage:
+    python benchmarks/load_test.py                          # SQLite, 50 doctors online
+    python benchmarks/load_test.py --database-url postgresql://localhost/praxis_load
+    python benchmarks/load_test.py --concurrency 200 --llm-latency-ms 4000
+    python benchmarks/load_test.py --mix signin=5,patients=60,create=10,pdf=25
+
+Use a throwaway Postgres database: seeded rows are kept and reused by
+later runs (the seed size options then have no effect). The database URL can also
+be given as LOADTEST_DATABASE_URL. PDF downloads need WeasyPrint; without
+it they show up as errors, so leave pdf out of --mix.
+
+The OpenAI SDK sends its requests to the fake through OPENAI_BASE_URL, so
+report creation runs the real client, timeouts and circuit breaker.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import date
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+SEED_PASSWORD = "LoadTest-2025!"
+SEED_EMAIL_PREFIX = "loadtest-doctor-"
+
+DEFAULT_MIX = "signin=5,patients=55,create=10,pdf=30"
+
+# Canned model output shaped like a real letter (sections and diagnosis lines)
+FAKE_REPORT = (
+    "**Zusammenfassung:**\n"
+    "Die Patientin stellt sich mit seit drei Wochen bestehenden Kopfschmerzen vor. "
+    "Der neurologische Status ist unauffällig, das cMRT ohne Hinweis auf eine Raumforderung.\n\n"
+    "- ICD-10: G43.1 – **Migräne mit Aura**\n"
+    "- GVA: Sekundäre Kopfschmerzen bei intrakranieller Raumforderung\n"
+    "- Z: Zustand nach Appendektomie\n\n"
+    "**Therapie:**\n"
+    "Beginn einer Prophylaxe mit Topiramat, Kopfschmerztagebuch.\n\n"
+    "**Empfohlene Medikation:**\n"
+    "- Topiramat 25 mg 0-0-1, nach einer Woche steigern auf 50 mg\n"
+    "- Ibuprofen 400 mg bei Bedarf, maximal 3x täglich\n"
+)
+
+HISTORY = "Seit drei Wochen zunehmende Kopfschmerzen frontal, morgens betont, Übelkeit, Photophobie."
+EXAM = "Wach, orientiert. Hirnnerven intakt, Paresen keine, MER seitengleich, Meningismus negativ."
+
+
+# --- Database ---
+
+def _use_sqlite_search_column() -> None:
+    """
+    Lets metadata.create_all() build the schema on SQLite, which has no
+    tsvector type: search_vector becomes a plain, always empty TEXT column.
+    The ORM still reads it back after inserts, so it has to exist.
+    """
+    from sqlalchemy.ext.compiler import compiles
+    from sqlalchemy.schema import CreateColumn
+
+    @compiles(CreateColumn, "sqlite")
+    def _create_column(element, compiler, **kw):
+        if element.element.name == "search_vector":
+            return "search_vector TEXT"
+        return compiler.visit_create_column(element, **kw)
+
+
+def prepare_schema(database_url: str) -> None:
+    """Migrates Postgres to the latest revision; creates the tables on SQLite."""
+    if database_url.startswith("sqlite"):
+        from sqlalchemy import create_engine
+
+        from app.models import Base
+
+        _use_sqlite_search_column()
+        engine = create_engine(database_url)
+        Base.metadata.create_all(engine)
+        engine.dispose()
+        return
+
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(ROOT / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "alembic"))
+    command.upgrade(config, "head")
+
+
+def seed(database_url: str, doctors: int, patients_per_doctor: int, reports_per_patient: int) -> dict:
+    """
+    Creates the seed doctors with their patients and reports, unless they
+    already exist.
+
+    Returns:
+        dict: {doctor email: {"user_id", "patient_ids", "report_ids"}}
+    """
+    from sqlalchemy import create_engine, select
+    from sqlalchemy.orm import Session
+
+    from app.core.security import get_password_hash
+    from app.models import Address, MedicalReport, Patient, Profile, User
+    from app.utils.report_html import render_report_html
+
+    engine = create_engine(database_url)
+    with Session(engine) as db:
+        existing = db.scalar(
+            select(Profile.id).where(Profile.email.like(f"{SEED_EMAIL_PREFIX}%")).limit(1)
+        )
+        if existing is None:
+            # bcrypt is slow by design; every seed doctor shares one hash
+            password_hash = get_password_hash(SEED_PASSWORD)
+            report_html = render_report_html(FAKE_REPORT)
+            start = time.perf_counter()
+            for d in range(doctors):
+                doctor = User(
+                    role="doctor",
+                    title="Dr. med.",
+                    specialization="Neurologie",
+                    practice_name=f"Praxis {d}",
+                    password_hash=password_hash,
+                    profile=Profile(
+                        first_name="Erika",
+                        last_name=f"Lasttest{d}",
+                        email=f"{SEED_EMAIL_PREFIX}{d}@example.org",
+                        phone_number="030 1234567",
+                        addresses=[Address(street=f"Praxisweg {d}", postal_code="10115",
+                                           city="Berlin", country="Deutschland")],
+                    ),
+                )
+                for p in range(patients_per_doctor):
+                    db.add(Patient(
+                        doctor=doctor,
+                        profile=Profile(
+                            first_name=f"Vorname{p}",
+                            last_name=f"Nachname{d}-{p}",
+                            email=f"loadtest-patient-{d}-{p}@example.org",
+                            phone_number="030 7654321",
+                            addresses=[Address(street=f"Musterstraße {p}", postal_code="10115",
+                                               city="Berlin", country="Deutschland")],
+                        ),
+                        date_of_birth=date(1940 + p % 60, 1 + p % 12, 1 + p % 28),
+                        gender="weiblich" if p % 2 else "männlich",
+                        allergies="Penicillin" if p % 3 == 0 else None,
+                        past_illnesses="Appendektomie",
+                        current_diagnosis="G43.1 Migräne mit Aura",
+                        reports=[
+                            MedicalReport(title=f"Verlaufskontrolle {r + 1}", patient_history=HISTORY,
+                                          physical_exam=EXAM, final_report=FAKE_REPORT,
+                                          final_report_html=report_html)
+                            for r in range(reports_per_patient)
+                        ],
+                    ))
+                db.commit()
+            print(f"Seeded {doctors} doctors, {doctors * patients_per_doctor} patients and "
+                  f"{doctors * patients_per_doctor * reports_per_patient} reports "
+                  f"in {time.perf_counter() - start:.1f} s")
+        else:
+            print("Reusing seed data already in the database")
+
+        seeded = {}
+        rows = db.execute(
+            select(Profile.email, User.id)
+            .join(User, User.profile_id == Profile.id)
+            .where(Profile.email.like(f"{SEED_EMAIL_PREFIX}%"))
+        )
+        for email, user_id in rows:
+            seeded[email] = {"user_id": user_id, "patient_ids": [], "report_ids": []}
+        by_user = {entry["user_id"]: entry for entry in seeded.values()}
+
+        for patient_id, user_id in db.execute(
+            select(Patient.id, Patient.assigned_user_id).where(Patient.assigned_user_id.in_(by_user))
+        ):
+            by_user[user_id]["patient_ids"].append(patient_id)
+        for report_id, user_id in db.execute(
+            select(MedicalReport.id, Patient.assigned_user_id)
+            .join(Patient, MedicalReport.patient_id == Patient.id)
+            .where(Patient.assigned_user_id.in_(by_user))
+        ):
+            by_user[user_id]["report_ids"].append(report_id)
+
+    engine.dispose()
+    return seeded
+
+
+# --- Fake OpenAI ---
+
+class FakeOpenAI:
+    """
+    OpenAI-compatible chat completions server answering after a random
+    delay around `latency_ms` (+/- `jitter` as a fraction).
+    """
+
+    def __init__(self, port: int, latency_ms: float, jitter: float):
+        import uvicorn
+        from starlette.applications import Starlette
+        from starlette.responses import JSONResponse
+        from starlette.routing import Route
+
+        async def chat_completions(request):
+            body = await request.json()
+            prompt = "".join(message["content"] for message in body["messages"])
+            delay = latency_ms * random.uniform(1 - jitter, 1 + jitter)
+            await asyncio.sleep(max(delay, 0) / 1000)
+            self.calls += 1
+            return JSONResponse({
+                "id": f"chatcmpl-loadtest-{self.calls}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body["model"],
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": FAKE_REPORT},
+                    "finish_reason": "stop",
+                }],
+                # Roughly four characters per token
+                "usage": {
+                    "prompt_tokens": len(prompt) // 4,
+                    "completion_tokens": len(FAKE_REPORT) // 4,
+                    "total_tokens": (len(prompt) + len(FAKE_REPORT)) // 4,
+                },
+            })
+
+        async def retrieve_model(request):
+            return JSONResponse({"id": request.path_params["model"], "object": "model",
+                                 "created": 0, "owned_by": "loadtest"})
+
+        app = Starlette(routes=[
+            Route("/v1/chat/completions", chat_completions, methods=["POST"]),
+            Route("/v1/models/{model}", retrieve_model),
+        ])
+        self.calls = 0
+        self.base_url = f"http://127.0.0.1:{port}/v1"
+        self._server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, name="fake-openai", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+        while not self._server.started:
+            if not self._thread.is_alive():
+                raise RuntimeError("Fake OpenAI server failed to start")
+            time.sleep(0.05)
+
+    def stop(self) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=5)
+
+
+# --- App under test ---
+
+def start_app(args, fake: FakeOpenAI, log_path: Path) -> subprocess.Popen:
+    """Starts uvicorn with the app in a subprocess; output goes to `log_path`."""
+    env = dict(
+        os.environ,
+        DATABASE_URL=args.database_url,
+        OPENAI_BASE_URL=fake.base_url,
+        OPENAI_API_KEY="loadtest",
+        SECRET_KEY=os.environ.get("SECRET_KEY", "loadtest"),
+    )
+    log = open(log_path, "w")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+         "--port", str(args.port), "--workers", str(args.workers), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+
+async def wait_until_ready(base_url: str, process: subprocess.Popen, timeout: float = 60) -> None:
+    """Polls /readyz until it answers 200."""
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"App exited with status {process.returncode}")
+            try:
+                if (await client.get("/readyz")).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.25)
+    raise RuntimeError(f"App not ready after {timeout:.0f} s")
+
+
+# --- Load ---
+
+def parse_mix(value: str) -> dict:
+    """Parses "signin=5,patients=55,..." into {action: weight}."""
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in ACTIONS:
+            raise argparse.ArgumentTypeError(f"unknown action '{name}' (choose from {', '.join(ACTIONS)})")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+class Results:
+    """Latencies and status codes per endpoint label."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+
+    def record(self, label: str, seconds: float, status) -> None:
+        if isinstance(status, int) and status < 400:
+            self.latencies[label].append(seconds)
+        else:
+            self.errors[label][status] += 1
+
+
+async def _timed(results: Results, label: str, request) -> "httpx.Response":
+    import httpx
+
+    start = time.perf_counter()
+    try:
+        response = await request
+    except httpx.HTTPError as exc:
+        results.record(label, time.perf_counter() - start, type(exc).__name__)
+        return None
+    results.record(label, time.perf_counter() - start, response.status_code)
+    return response
+
+
+async def _signin(client, doctor, results) -> bool:
+    response = await _timed(results, "POST /signin", client.post(
+        "/signin", data={"username": doctor["email"], "password": SEED_PASSWORD}
+    ))
+    if response is None or response.status_code != 200:
+        return False
+    client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+    return True
+
+
+async def _list_patients(client, doctor, results) -> None:
+    await _timed(results, "GET /users/{id}/patients",
+                 client.get(f"/users/{doctor['user_id']}/patients"))
+
+
+async def _create_report(client, doctor, results) -> None:
+    patient_id = random.choice(doctor["patient_ids"])
+    response = await _timed(results, "POST /patients/{id}/reports", client.post(
+        f"/patients/{patient_id}/reports",
+        json={"title": "Verlaufskontrolle", "patient_history": HISTORY, "physical_exam": EXAM},
+    ))
+    if response is not None and response.status_code == 201:
+        doctor["report_ids"].append(response.json()["id"])
+
+
+async def _download_pdf(client, doctor, results) -> None:
+    if not doctor["report_ids"]:
+        return
+    report_id = random.choice(doctor["report_ids"])
+    await _timed(results, "GET /reports/{id}/pdf", client.get(f"/reports/{report_id}/pdf"))
+
+
+ACTIONS = {
+    "signin": _signin,
+    "patients": _list_patients,
+    "create": _create_report,
+    "pdf": _download_pdf,
+}
+
+
+async def virtual_doctor(base_url, doctor, mix, args, results, stop_at) -> None:
+    """Signs in once, then runs weighted actions with think time until `stop_at`."""
+    import httpx
+
+    names, weights = list(mix), list(mix.values())
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout) as client:
+        if not await _signin(client, doctor, results):
+            return
+        while time.monotonic() < stop_at:
+            await ACTIONS[random.choices(names, weights)[0]](client, doctor, results)
+            if args.think_ms:
+                await asyncio.sleep(random.uniform(0.5, 1.5) * args.think_ms / 1000)
+
+
+async def run_load(base_url, seeded, mix, args) -> tuple[Results, float]:
+    doctors = [
+        dict(entry, email=email) for email, entry in sorted(seeded.items())
+        if entry["patient_ids"]
+    ]
+    results = Results()
+    start = time.monotonic()
+    stop_at = start + args.duration
+    await asyncio.gather(*(
+        virtual_doctor(base_url, doctors[i % len(doctors)], mix, args, results, stop_at)
+        for i in range(args.concurrency)
+    ))
+    return results, time.monotonic() - start
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    index = max(int(round(fraction * len(sorted_values))) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+def summarize(results: Results, elapsed: float) -> dict:
+    summary = {}
+    for label in sorted(set(results.latencies) | set(results.errors)):
+        latencies = sorted(results.latencies[label])
+        errors = dict(results.errors[label])
+        entry = {
+            "ok": len(latencies),
+            "errors": errors,
+            "throughput_rps": round(len(latencies) / elapsed, 2),
+        }
+        if latencies:
+            entry.update({
+                f"p{p}_ms": round(percentile(latencies, p / 100) * 1000, 1) for p in (50, 95, 99)
+            })
+            entry["max_ms"] = round(latencies[-1] * 1000, 1)
+        summary[label] = entry
+    return summary
+
+
+def print_summary(summary: dict, elapsed: float, args) -> None:
+    print(f"\n{args.concurrency} virtual doctors, {elapsed:.1f} s, {args.workers} worker(s), "
+          f"think time {args.think_ms} ms, fake LLM {args.llm_latency_ms} ms")
+    print(f"{'endpoint':28} {'ok':>7} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    total_ok = 0
+    for label, entry in summary.items():
+        total_ok += entry["ok"]
+        error_count = sum(entry["errors"].values())
+        cells = [f"{entry.get(f'p{p}_ms', float('nan')):9.1f}" for p in (50, 95, 99)]
+        print(f"{label:28} {entry['ok']:7} {error_count:7} {entry['throughput_rps']:8.2f} {' '.join(cells)}")
+    print(f"{'total':28} {total_ok:7} {'':7} {total_ok / elapsed:8.2f}")
+
+    for label, entry in summary.items():
+        if entry["errors"]:
+            details = ", ".join(f"{status}: {count}" for status, count in entry["errors"].items())
+            print(f"  {label} errors -> {details}")
+
+
+def _weasyprint_available() -> bool:
+    try:
+        import weasyprint  # noqa: F401
+    except (ImportError, OSError):
+        return False
+    return True
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--database-url", default=os.environ.get("LOADTEST_DATABASE_URL"),
+                        help="Postgres URL (default: a new SQLite file in the temp directory)")
+    parser.add_argument("--doctors", type=int, default=200, help="Seed doctors")
+    parser.add_argument("--patients-per-doctor", type=int, default=25)
+    parser.add_argument("--reports-per-patient", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=50, help="Virtual doctors online at once")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds of load")
+    parser.add_argument("--think-ms", type=float, default=1000,
+                        help="Average pause between a doctor's requests")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help=f"Action weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--llm-latency-ms", type=float, default=2000, help="Fake OpenAI response time")
+    parser.add_argument("--llm-jitter", type=float, default=0.25,
+                        help="Fake OpenAI latency varies by +/- this fraction")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--llm-port", type=int, default=8766)
+    parser.add_argument("--timeout", type=float, default=120, help="Client timeout per request in seconds")
+    parser.add_argument("--json", type=Path, help="Also write the summary to this file")
+    args = parser.parse_args()
+
+    if args.database_url is None:
+        db_file = Path(tempfile.gettempdir()) / "praxis-loadtest.sqlite3"
+        db_file.unlink(missing_ok=True)
+        args.database_url = f"sqlite:///{db_file}"
+
+    # The app settings are read at import, so set them before importing app modules
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("OPENAI_API_KEY", "loadtest")
+    os.environ.setdefault("SECRET_KEY", "loadtest")
+
+    if "pdf" in args.mix and not _weasyprint_available():
+        print("Note: WeasyPrint or its system libraries are missing, PDF downloads will fail")
+
+    print(f"Database: {args.database_url}")
+    prepare_schema(args.database_url)
+    seeded = seed(args.database_url, args.doctors, args.patients_per_doctor, args.reports_per_patient)
+
+    fake = FakeOpenAI(args.llm_port, args.llm_latency_ms, args.llm_jitter)
+    fake.start()
+    log_path = Path(tempfile.gettempdir()) / "praxis-loadtest-app.log"
+    process = start_app(args, fake, log_path)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        asyncio.run(wait_until_ready(base_url, process))
+        print(f"App ready on {base_url} (log: {log_path}), running load for {args.duration:.0f} s")
+        results, elapsed = asyncio.run(run_load(base_url, seeded, args.mix, args))
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+        fake.stop()
+
+    summary = summarize(results, elapsed)
+    print_summary(summary, elapsed, args)
+    print(f"Fake OpenAI calls: {fake.calls}")
+
+    if args.json:
+        args.json.write_text(json.dumps(summary, indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
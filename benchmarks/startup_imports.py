@@ -0,0 +1,126 @@
+"""
+Startup-time benchmark: measures how long `import app.main` takes and
+which modules dominate it, using Python's `-X importtime` output.
+
+Usage:
+    python benchmarks/startup_imports.py [--module app.main] [--top 25]
+                                         [--runs 3] [--max-ms 1500]
+                                         [--json results.json]
+
+Each run happens in a fresh interpreter, so nothing is cached in-process.
+The run with the lowest total is reported. The script also lists heavy
+dependencies (WeasyPrint, OpenAI, Jinja2) that were imported at startup
+even though they should only load on first use.
+
+Exits with status 1 if --max-ms is given and the import takes longer,
+or if a lazily-loaded dependency is imported eagerly.
+
+Needs the same environment variables as the app (DATABASE_URL, SECRET_KEY,
+OPENAI_API_KEY); no database connection is made at import time.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+# Top-level packages that must not be imported just by loading the app
+LAZY_MODULES = ("weasyprint", "openai", "jinja2")
+
+
+def run_once(module: str) -> tuple[list[dict], list[str]]:
+    """
+    Imports `module` in a fresh interpreter with -X importtime.
+
+    Returns:
+        (timings, eager): one entry per imported module with self and
+        cumulative microseconds, and the LAZY_MODULES that were loaded.
+    """
+    probe = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", probe],
+        cwd=PROJECT_ROOT,
+        env={**os.environ, "PYTHONPATH": str(PROJECT_ROOT)},
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"Importing {module} failed")
+
+    timings = []
+    for line in proc.stderr.splitlines():
+        # Format: "import time: <self us> | <cumulative us> | <indent><module>"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        timings.append({
+            "module": name.strip(),
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us),
+        })
+
+    eager = [name for name in proc.stdout.strip().split(",") if name]
+    return timings, eager
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--module", default="app.main", help="Module to import")
+    parser.add_argument("--top", type=int, default=25, help="Modules to list")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to try")
+    parser.add_argument("--max-ms", type=float, help="Fail if the import is slower")
+    parser.add_argument("--json", help="Write all timings to this file")
+    args = parser.parse_args()
+
+    best_total, best_timings, eager = None, [], []
+    for _ in range(args.runs):
+        timings, eager = run_once(args.module)
+        total = next(
+            (t["cumulative_us"] for t in timings if t["module"] == args.module), 0
+        )
+        if best_total is None or total < best_total:
+            best_total, best_timings = total, timings
+
+    print(f"import {args.module}: {best_total / 1000:.1f} ms (best of {args.runs})\n")
+
+    # Top-level packages by cumulative time, then the slowest modules overall
+    packages = [t for t in best_timings if "." not in t["module"]]
+    packages.sort(key=lambda t: t["cumulative_us"], reverse=True)
+    print(f"{'cumulative ms':>14}  {'self ms':>8}  package")
+    for t in packages[:args.top]:
+        print(f"{t['cumulative_us'] / 1000:14.1f}  {t['self_us'] / 1000:8.1f}  {t['module']}")
+
+    slowest = sorted(best_timings, key=lambda t: t["self_us"], reverse=True)
+    print(f"\n{'self ms':>14}  module")
+    for t in slowest[:args.top]:
+        print(f"{t['self_us'] / 1000:14.1f}  {t['module']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "module": args.module,
+                "total_us": best_total,
+                "eager_lazy_modules": eager,
+                "timings": best_timings,
+            }, f, indent=2)
+
+    failed = False
+    if eager:
+        print(f"\nFAIL: imported at startup, should be lazy: {', '.join(eager)}")
+        failed = True
+    if args.max_ms is not None and best_total / 1000 > args.max_ms:
+        print(f"\nFAIL: {best_total / 1000:.1f} ms exceeds --max-ms {args.max_ms}")
+        failed = True
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""
+Micro-benchmarks for the pure-Python report text pipeline:
+
+- build_prompt            (prompt assembly for generate_medical_report)
+- extract_diagnosis_block (ICD-10 / GVA / Z extraction)
+- clean_markdown
+- render_report_html      (report text -> HTML stored for the PDF)
+- calculate_age
+
+Each function runs on generated German doctor's letters of 1 KB to 200 KB.
+For every case the script reports time per call, throughput and the peak
+memory allocated during one call (tracemalloc).
+
+Usage:
+    python benchmarks/text_pipeline.py                    # compare with baseline
+    python benchmarks/text_pipeline.py --save-baseline    # record a new baseline
+    python benchmarks/text_pipeline.py --max-regression 1.3
+
+The baseline (text_pipeline_baseline.json next to this file) stores the
+time per call of each case. A case fails if it is more than
+--max-regression times slower than its baseline; the exit status is 1 if
+any case fails. Timings depend on the machine, so record the baseline on
+the machine that runs the comparison.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+import tracemalloc
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# The app settings require these; nothing here connects anywhere
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from app.utils.openai_client import (  # noqa: E402
+    build_prompt,
+    calculate_age,
+    clean_markdown,
+    extract_diagnosis_block,
+)
+from app.utils.report_html import render_report_html  # noqa: E402
+
+BASELINE_FILE = Path(__file__).with_name("text_pipeline_baseline.json")
+
+LETTER_SIZES = {"1KB": 1_000, "10KB": 10_000, "50KB": 50_000, "200KB": 200_000}
+
+SENTENCES = [
+    "Der Patient berichtet über seit drei Wochen bestehende, zunehmende Kopfschmerzen im Bereich der Stirn.",
+    "Die Beschwerden treten vorwiegend morgens auf und bessern sich im Tagesverlauf.",
+    "Begleitend werden Übelkeit sowie eine Lichtempfindlichkeit angegeben, Erbrechen wird verneint.",
+    "In der körperlichen Untersuchung zeigt sich ein unauffälliger neurologischer Status ohne fokale Defizite.",
+    "Die Pupillen sind isokor, mittelweit und prompt lichtreagibel, der Meningismus ist negativ.",
+    "Die Muskeleigenreflexe sind seitengleich mittellebhaft auslösbar, Pyramidenbahnzeichen bestehen nicht.",
+    "Im cMRT vom 12.03. fanden sich keine Hinweise auf eine intrakranielle Raumforderung.",
+    "Laborchemisch waren Blutbild, Elektrolyte sowie Entzündungsparameter im Normbereich.",
+    "Unter der begonnenen Therapie mit **Topiramat** kam es zu einer deutlichen Besserung der Symptomatik.",
+    "Wir empfehlen eine Wiedervorstellung in unserer Ambulanz in sechs Monaten zur Verlaufskontrolle.",
+    "Die Fahrtauglichkeit ist aus neurologischer Sicht derzeit **nicht eingeschränkt**.",
+    "Anamnestisch ist ein Zustand nach Appendektomie im Jugendalter bekannt.",
+]
+
+DIAGNOSIS_LINES = (
+    "- ICD-10: G43.1 – **Migräne mit Aura**\n"
+    "- GVA: Sekundäre Kopfschmerzen bei intrakranieller Raumforderung\n"
+    "- Z: Zustand nach Appendektomie\n"
+)
+
+EXPECTED_DIAGNOSIS = {
+    "icd": "G43.1 – Migräne mit Aura",
+    "gva": "Sekundäre Kopfschmerzen bei intrakranieller Raumforderung",
+    "z": "Zustand nach Appendektomie",
+}
+
+
+def _paragraphs(rng: random.Random, size: int) -> str:
+    """Random German sentences grouped into paragraphs, about `size` bytes long."""
+    parts, length = [], 0
+    while length < size:
+        paragraph = " ".join(rng.choice(SENTENCES) for _ in range(rng.randint(3, 6)))
+        parts.append(paragraph)
+        length += len(paragraph.encode("utf-8")) + 2
+    return "\n\n".join(parts)
+
+
+def make_letter(size: int, seed: int = 1) -> str:
+    """
+    Builds a report shaped like the model's output: a summary with the
+    diagnosis lines at its end, followed by therapy and medication. The
+    summary makes up half of the letter, so extraction has to scan into it.
+    """
+    rng = random.Random(seed)
+    body = max(size - 400, 200)
+    return (
+        "**Zusammenfassung:**\n" + _paragraphs(rng, body // 2) + "\n\n" + DIAGNOSIS_LINES + "\n"
+        "**Therapie:**\n" + _paragraphs(rng, body // 3) + "\n\n"
+        "**Empfohlene Medikation:**\n"
+        "- Topiramat 25 mg 0-0-1, nach einer Woche steigern auf 50 mg\n"
+        "- Ibuprofen 400 mg bei Bedarf, maximal 3x täglich\n\n"
+        + _paragraphs(rng, body // 6)
+    )
+
+
+def build_cases() -> dict:
+    """Returns {case name: zero-argument callable} plus the letter sizes in bytes."""
+    cases, sizes = {}, {}
+    for label, size in LETTER_SIZES.items():
+        letter = make_letter(size)
+        sizes[label] = len(letter.encode("utf-8"))
+
+        assert extract_diagnosis_block(letter) == EXPECTED_DIAGNOSIS, "diagnosis extraction changed"
+
+        cases[f"build_prompt/{label}"] = lambda letter=letter: build_prompt(
+            title="Verlaufskontrolle Migräne",
+            history=SENTENCES[0] + " " + SENTENCES[1],
+            exam=SENTENCES[3],
+            gender="weiblich",
+            allergies="Penicillin",
+            past_illnesses="Appendektomie",
+            current_dx="G43.1",
+            notes="",
+            previous_reports=[letter],
+            patient_dob=date(1980, 5, 17),
+        )
+        cases[f"extract_diagnosis_block/{label}"] = lambda letter=letter: extract_diagnosis_block(letter)
+        cases[f"clean_markdown/{label}"] = lambda letter=letter: clean_markdown(letter)
+        cases[f"render_report_html/{label}"] = lambda letter=letter: render_report_html(letter)
+
+    cases["calculate_age"] = lambda: calculate_age(date(1980, 5, 17))
+    return cases, sizes
+
+
+def measure(func) -> tuple[float, int]:
+    """Returns (best seconds per call, peak bytes allocated during one call)."""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=5, number=number)) / number
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--save-baseline", action="store_true", help="Write results as the new baseline")
+    parser.add_argument("--max-regression", type=float, default=1.5,
+                        help="Fail if a case is this many times slower than its baseline")
+    parser.add_argument("--filter", default="", help="Only run cases containing this text")
+    args = parser.parse_args()
+
+    baseline = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else {}
+    cases, sizes = build_cases()
+
+    results, failed = {}, []
+    print(f"{'case':36} {'us/call':>10} {'MB/s':>8} {'peak KB':>9} {'vs base':>8}")
+    for name, func in cases.items():
+        if args.filter not in name:
+            continue
+        seconds, peak = measure(func)
+        results[name] = {"us_per_call": round(seconds * 1e6, 3), "peak_bytes": peak}
+
+        size = sizes.get(name.rpartition("/")[2])
+        throughput = f"{size / seconds / 1e6:8.1f}" if size else f"{'-':>8}"
+
+        ratio = ""
+        if name in baseline:
+            factor = seconds * 1e6 / baseline[name]["us_per_call"]
+            ratio = f"{factor:7.2f}x"
+            if factor > args.max_regression:
+                failed.append(name)
+                ratio += " !"
+
+        print(f"{name:36} {seconds * 1e6:10.1f} {throughput} {peak / 1024:9.1f} {ratio:>8}")
+
+    if args.save_baseline:
+        BASELINE_FILE.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"\nBaseline written to {BASELINE_FILE}")
+        return 0
+
+    if failed:
+        print(f"\nFAIL: slower than {args.max_regression}x baseline: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,19 @@
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Settings are read at import time, so the environment has to be complete
+# before any app module is imported. Tests run against a throwaway SQLite
+# file; nothing talks to OpenAI.
+_DATABASE = Path(tempfile.mkdtemp(prefix="praxis-tests-")) / "test.db"
+os.environ["DATABASE_URL"] = f"sqlite:///{_DATABASE}"
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+
+
+@pytest.fixture
+def anyio_backend():
+    """The app runs on asyncio only (uvicorn, asyncpg)."""
+    return "asyncio"
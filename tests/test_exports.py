@@ -0,0 +1,65 @@
+import csv
+import gzip
+import io
+import json
+from datetime import date, datetime
+
+from app.api.routes import exports
+from app.api.routes.exports import PATIENT_FIELDS, REPORT_FIELDS, _csv_lines, _encode_chunks, _ndjson_lines
+
+
+def _row(patient_id: int, report_id=None, **values) -> dict:
+    row = {field: None for field in PATIENT_FIELDS + REPORT_FIELDS}
+    row.update(id=patient_id, first_name=f"Patient {patient_id}", report_id=report_id, **values)
+    return row
+
+
+ROWS = [
+    _row(1, report_id=10, title="Kopfschmerz", date_of_birth=date(1980, 5, 17),
+         report_created_at=datetime(2025, 3, 1, 9, 30)),
+    _row(1, report_id=11, title="Kontrolle, \"gut\""),
+    _row(2),
+    _row(3, report_id=12, title="Schwindel\nund Übelkeit"),
+]
+
+
+def test_ndjson_groups_reports_per_patient():
+    documents = [json.loads(line) for line in _ndjson_lines(iter(ROWS))]
+
+    assert [document["id"] for document in documents] == [1, 2, 3]
+    assert [report["id"] for report in documents[0]["reports"]] == [10, 11]
+    assert documents[0]["date_of_birth"] == "1980-05-17"
+    assert documents[0]["reports"][0]["report_created_at"] == "2025-03-01T09:30:00"
+    assert "report_id" not in documents[0]["reports"][0]
+    assert documents[1]["reports"] == []
+    assert documents[2]["reports"][0]["title"] == "Schwindel\nund Übelkeit"
+
+
+def test_ndjson_without_rows():
+    assert list(_ndjson_lines(iter([]))) == []
+
+
+def test_csv_has_one_row_per_report():
+    rows = list(csv.reader(io.StringIO("".join(_csv_lines(iter(ROWS))))))
+
+    assert rows[0] == PATIENT_FIELDS + REPORT_FIELDS
+    assert len(rows) == 1 + len(ROWS)
+    record = dict(zip(rows[0], rows[1]))
+    assert record["date_of_birth"] == "1980-05-17"
+    assert record["report_created_at"] == "2025-03-01T09:30:00"
+    assert dict(zip(rows[0], rows[2]))["title"] == "Kontrolle, \"gut\""
+    assert dict(zip(rows[0], rows[3]))["report_id"] == ""
+    assert dict(zip(rows[0], rows[4]))["title"] == "Schwindel\nund Übelkeit"
+
+
+def test_chunks_roundtrip_with_and_without_gzip(monkeypatch):
+    monkeypatch.setattr(exports, "EXPORT_CHUNK_SIZE", 100)
+    lines = [f"Zeile {number} äöü\n" for number in range(200)]
+    expected = "".join(lines).encode("utf-8")
+
+    plain = list(_encode_chunks(iter(lines), compress=False))
+    assert b"".join(plain) == expected
+    assert len(plain) > 1
+
+    compressed = b"".join(_encode_chunks(iter(lines), compress=True))
+    assert gzip.decompress(compressed) == expected
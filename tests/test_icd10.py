@@ -0,0 +1,122 @@
+import pytest
+
+from app.utils import icd10
+from app.utils.icd10 import ICD10Catalogue, code_from_diagnosis, normalize_code
+
+ENTRIES = [
+    ("G43.0", "Migräne ohne Aura [Gewöhnliche Migräne]"),
+    ("G43.1", "Migräne mit Aura [Klassische Migräne]"),
+    ("G35.10", "Multiple Sklerose mit vorherrschend schubförmigem Verlauf: Ohne Angabe einer akuten Exazerbation"),
+    ("G44.2", "Spannungskopfschmerz"),
+    ("I63.9", "Hirninfarkt, nicht näher bezeichnet"),
+]
+
+
+@pytest.fixture
+def full_catalogue() -> ICD10Catalogue:
+    return ICD10Catalogue(ENTRIES)
+
+
+@pytest.fixture
+def excerpt_catalogue() -> ICD10Catalogue:
+    return ICD10Catalogue(ENTRIES, categories=["G35", "G43", "G44", "I63", "J06"])
+
+
+@pytest.mark.parametrize("raw, code", [
+    ("G43.1", "G43.1"),
+    ("g431", "G43.1"),
+    ("G43,1", "G43.1"),
+    (" G35.10 ", "G35.10"),
+    ("G63.2*", "G63.2"),
+    ("A17.0†", "A17.0"),
+    ("I64", "I64"),
+    ("G43.-", "G43"),
+    ("43.1", None),
+    ("G4", None),
+    ("G43.123", None),
+    ("Migräne", None),
+])
+def test_normalize_code(raw, code):
+    assert normalize_code(raw) == code
+
+
+def test_full_catalogue_validates_membership(full_catalogue):
+    assert full_catalogue.validate("g431") == "G43.1"
+    assert full_catalogue.validate("G35.10") == "G35.10"
+    assert full_catalogue.validate("G43.9") is None
+    assert full_catalogue.validate("U99.99") is None
+    assert full_catalogue.validate("nonsense") is None
+
+
+def test_excerpt_validates_by_category(excerpt_catalogue):
+    assert excerpt_catalogue.validate("G43.1") == "G43.1"
+    # Not in the excerpt, but a known category
+    assert excerpt_catalogue.validate("j069") == "J06.9"
+    assert excerpt_catalogue.validate("G43.9") == "G43.9"
+    # Unknown categories and malformed codes
+    assert excerpt_catalogue.validate("U98.1") is None
+    assert excerpt_catalogue.validate("X") is None
+
+
+def test_lookup(full_catalogue):
+    assert full_catalogue.lookup("g44,2") == "Spannungskopfschmerz"
+    assert full_catalogue.lookup("G44.9") is None
+    assert full_catalogue.lookup("Kopfschmerz") is None
+
+
+@pytest.mark.parametrize("query, codes", [
+    ("G4", ["G43.0", "G43.1", "G44.2"]),
+    ("g43.", ["G43.0", "G43.1"]),
+    ("G431", ["G43.1"]),
+    ("G351", ["G35.10"]),
+    ("Z00", []),
+    ("migräne", ["G43.0", "G43.1"]),
+    ("Migrane mit au", ["G43.1"]),
+    ("spannungskopf", ["G44.2"]),
+    ("kopfschmerz", []),  # words are matched from their start only
+    ("hirninfarkt migräne", []),
+    ("", []),
+    ("–", []),
+])
+def test_search(full_catalogue, query, codes):
+    assert [code for code, _ in full_catalogue.search(query)] == codes
+
+
+def test_search_limit(full_catalogue):
+    assert len(full_catalogue.search("G", limit=2)) == 2
+
+
+def test_bundled_catalogue_validates_by_category(monkeypatch):
+    monkeypatch.setattr(icd10.settings, "icd10_catalogue_path", None)
+    icd10.get_catalogue.cache_clear()
+    try:
+        catalogue = icd10.get_catalogue()
+        assert catalogue.categories is not None
+        # Every code of the excerpt belongs to a bundled category
+        assert all(code[:3] in catalogue.categories for code in catalogue.titles)
+        assert catalogue.validate("J06.9") == "J06.9"
+        assert catalogue.validate("I10") == "I10"
+        assert catalogue.validate("U98.1") is None
+        assert code_from_diagnosis("- ICD-10: G43.1 – Migräne mit Aura") == "G43.1"
+        assert code_from_diagnosis("Migräne mit Aura") is None
+    finally:
+        icd10.get_catalogue.cache_clear()
+
+
+def test_configured_catalogue_is_complete(tmp_path, monkeypatch):
+    path = tmp_path / "kodes.txt"
+    path.write_text(
+        "# comment\n"
+        "G43.1\tMigräne mit Aura\n"
+        "3;T;X;06;G40;G43;G43.1;G431;Migräne mit Aura;x\n",
+        encoding="utf-8"
+    )
+    monkeypatch.setattr(icd10.settings, "icd10_catalogue_path", str(path))
+    icd10.get_catalogue.cache_clear()
+    try:
+        catalogue = icd10.get_catalogue()
+        assert catalogue.categories is None
+        assert catalogue.validate("G43.1") == "G43.1"
+        assert catalogue.validate("J06.9") is None
+    finally:
+        icd10.get_catalogue.cache_clear()
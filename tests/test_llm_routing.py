@@ -0,0 +1,96 @@
+from datetime import datetime
+
+import pytest
+
+from app.api.routes import reports
+from app.core.config import DEFAULT_LLM_ROUTES, settings
+from app.core.report_context import PatientContext, PriorReport
+from app.schemas.medical_report import MedicalReportCreate
+from app.utils.openai_client import choose_route, plan_generation
+
+
+@pytest.fixture(autouse=True)
+def default_routes(monkeypatch):
+    monkeypatch.setattr(settings, "llm_routes", DEFAULT_LLM_ROUTES)
+
+
+def _context(report_count: int) -> PatientContext:
+    prior = PriorReport(
+        updated_at=datetime(2025, 1, 1),
+        document="Kopfschmerz",
+        final_report="**Zusammenfassung:** Spannungskopfschmerz."
+    )
+    return PatientContext(
+        patient_id=1,
+        version=0,
+        gender="weiblich",
+        date_of_birth=None,
+        allergies="",
+        past_illnesses="",
+        current_dx="",
+        notes="",
+        reports={report_id: prior for report_id in range(1, report_count + 1)}
+    )
+
+
+def _generation_args(monkeypatch, context: PatientContext, report_type=None) -> dict:
+    monkeypatch.setattr(reports, "load_patient_context", lambda db, patient_id: context)
+    report_data = MedicalReportCreate(
+        title="Kopfschmerz",
+        patient_history="Seit drei Wochen Kopfschmerzen",
+        physical_exam="Unauffällig",
+        report_type=report_type
+    )
+    return reports._generation_args(None, context.patient_id, report_data)[2]
+
+
+@pytest.mark.parametrize("input_tokens, report_type, route", [
+    (500, "initial", "standard"),
+    (500, "follow_up", "follow_up"),
+    (2001, "follow_up", "standard"),
+    (12000, "initial", "standard"),
+    (12001, "initial", "long"),
+    (50000, "follow_up", "long"),
+])
+def test_choose_route_by_type_and_size(input_tokens, report_type, route):
+    assert choose_route(input_tokens, report_type).name == route
+
+
+def test_choose_route_falls_back_to_last_route(monkeypatch):
+    monkeypatch.setattr(settings, "llm_routes", DEFAULT_LLM_ROUTES[:2])
+
+    assert choose_route(50000, "initial").name == "standard"
+
+
+def test_missing_report_type_defaults_to_initial_for_returning_patients(monkeypatch):
+    args = _generation_args(monkeypatch, _context(report_count=2))
+
+    assert args["report_type"] == "initial"
+    assert len(args["previous_reports"]) == 2
+    assert plan_generation(**args).route.name == "standard"
+
+
+def test_missing_report_type_defaults_to_initial_for_new_patients(monkeypatch):
+    args = _generation_args(monkeypatch, _context(report_count=0))
+
+    assert args["report_type"] == "initial"
+    assert args["previous_reports"] == []
+
+
+def test_follow_up_budget_only_when_requested(monkeypatch):
+    args = _generation_args(monkeypatch, _context(report_count=2), report_type="follow_up")
+    plan = plan_generation(**args)
+
+    assert plan.report_type == "follow_up"
+    assert plan.route.name == "follow_up"
+    assert plan.route.max_tokens == 1200
+
+
+def test_unknown_patient_is_404(monkeypatch):
+    monkeypatch.setattr(reports, "load_patient_context", lambda db, patient_id: None)
+    report_data = MedicalReportCreate(title="t", patient_history="h", physical_exam="e")
+
+    with pytest.raises(reports.HTTPException) as error:
+        reports._generation_args(None, 99, report_data)
+
+    assert error.value.status_code == 404
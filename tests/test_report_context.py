@@ -0,0 +1,155 @@
+from dataclasses import replace
+from datetime import datetime
+
+import pytest
+
+from app.core import report_context
+from app.core.report_context import (
+    PatientContext,
+    PriorReport,
+    _store,
+    apply_report_deleted,
+    apply_report_saved,
+    context_cache,
+    select_previous_reports,
+)
+from app.models.medical_report import MedicalReport
+from app.utils.retrieval import ReportIndexRegistry, report_document
+
+PATIENT_ID = 7
+
+
+def _prior(title: str, final_report: str, day: int = 1) -> PriorReport:
+    return PriorReport(
+        updated_at=datetime(2025, 1, day),
+        document=report_document(title, "", "", final_report),
+        final_report=final_report
+    )
+
+
+def _context(version: int = 3, reports: dict[int, PriorReport] = None) -> PatientContext:
+    return PatientContext(
+        patient_id=PATIENT_ID,
+        version=version,
+        gender="männlich",
+        date_of_birth=None,
+        allergies="",
+        past_illnesses="",
+        current_dx="",
+        notes="",
+        reports=reports or {}
+    )
+
+
+def _report(report_id: int, final_report, title: str = "Kontrolle") -> MedicalReport:
+    return MedicalReport(
+        id=report_id,
+        patient_id=PATIENT_ID,
+        title=title,
+        patient_history="",
+        physical_exam="",
+        final_report=final_report,
+        updated_at=datetime(2025, 2, 1)
+    )
+
+
+@pytest.fixture(autouse=True)
+def empty_caches(monkeypatch):
+    monkeypatch.setattr(report_context, "report_indexes", ReportIndexRegistry(max_patients=10))
+    context_cache.clear()
+    yield
+    context_cache.clear()
+
+
+def test_saved_report_is_applied_to_the_previous_version():
+    context_cache.set(PATIENT_ID, _context(version=3, reports={1: _prior("Migräne", "Migräne mit Aura")}))
+
+    apply_report_saved(_report(2, "Spannungskopfschmerz"), version=4)
+
+    cached = context_cache.get(PATIENT_ID)
+    assert cached.version == 4
+    assert sorted(cached.reports) == [1, 2]
+    assert cached.reports[2].final_report == "Spannungskopfschmerz"
+
+
+def test_report_without_final_report_is_dropped():
+    context_cache.set(PATIENT_ID, _context(version=3, reports={1: _prior("Migräne", "Migräne mit Aura")}))
+
+    apply_report_saved(_report(1, None), version=4)
+
+    assert context_cache.get(PATIENT_ID).reports == {}
+
+
+def test_change_after_a_missed_version_is_not_applied():
+    context_cache.set(PATIENT_ID, _context(version=3))
+
+    # Version 4 was committed by another worker
+    apply_report_saved(_report(2, "Spannungskopfschmerz"), version=5)
+
+    cached = context_cache.get(PATIENT_ID)
+    assert cached.version == 3
+    assert cached.reports == {}
+
+
+def test_deleted_report_is_removed():
+    context_cache.set(PATIENT_ID, _context(version=3, reports={1: _prior("a", "a"), 2: _prior("b", "b")}))
+
+    apply_report_deleted(PATIENT_ID, 1, version=4)
+
+    cached = context_cache.get(PATIENT_ID)
+    assert cached.version == 4
+    assert sorted(cached.reports) == [2]
+
+
+def test_missing_version_changes_nothing():
+    context = _context(version=3)
+    context_cache.set(PATIENT_ID, context)
+
+    apply_report_deleted(PATIENT_ID, 1, version=None)
+
+    assert context_cache.get(PATIENT_ID) is context
+
+
+def test_store_keeps_a_newer_cached_context():
+    newer = _context(version=5)
+    context_cache.set(PATIENT_ID, newer)
+
+    # e.g. read from a lagging replica
+    _store(_context(version=4))
+    assert context_cache.get(PATIENT_ID) is newer
+
+    _store(replace(newer, notes="reloaded"))
+    assert context_cache.get(PATIENT_ID).notes == "reloaded"
+
+
+def test_store_fills_an_empty_cache():
+    context = _context(version=1)
+
+    _store(context)
+
+    assert context_cache.get(PATIENT_ID) is context
+
+
+def test_select_previous_reports_by_relevance():
+    context = _context(reports={
+        1: _prior("Migräne", "Migräne mit Aura, Triptan bei Bedarf", day=1),
+        2: _prior("Rückenschmerz", "Lumbago ohne Radikulopathie", day=2),
+        3: _prior("Schwindel", "Benigner Lagerungsschwindel", day=3),
+        4: _prior("Epilepsie", "Fokale Anfälle, Levetiracetam", day=4),
+    })
+
+    assert select_previous_reports(context, "Migräne mit Aura seit Jahren", k=1) == [1]
+    assert select_previous_reports(context, "Lagerungsschwindel, Migräne", k=2) == [1, 3]
+
+
+def test_select_previous_reports_without_matches_takes_the_most_recent():
+    context = _context(reports={1: _prior("a", "Migräne"), 2: _prior("b", "Lumbago"), 3: _prior("c", "Schwindel")})
+
+    assert select_previous_reports(context, "Hautausschlag", k=2) == [2, 3]
+
+
+def test_select_previous_reports_limits():
+    context = _context(reports={1: _prior("a", "Migräne"), 2: _prior("b", "Lumbago")})
+
+    assert select_previous_reports(context, "Migräne", k=0) == []
+    assert select_previous_reports(context, "Migräne", k=5) == [1, 2]
@@ -0,0 +1,106 @@
+from html.parser import HTMLParser
+
+import pytest
+
+from app.utils.report_html import render_inline, render_report_html
+
+VOID_TAGS = {"br", "hr"}
+
+
+def _flat(text: str) -> str:
+    """Rendered HTML without the newlines between blocks."""
+    return render_report_html(text).replace("\n", "")
+
+
+class _TagBalance(HTMLParser):
+    """Collects tags that are closed out of order or left open."""
+
+    def __init__(self):
+        super().__init__()
+        self.open = []
+        self.errors = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in VOID_TAGS:
+            self.open.append(tag)
+
+    def handle_endtag(self, tag):
+        if not self.open or self.open.pop() != tag:
+            self.errors.append(tag)
+
+
+def _assert_well_formed(html: str):
+    parser = _TagBalance()
+    parser.feed(html)
+    assert parser.errors == [] and parser.open == []
+
+
+def test_empty_input():
+    assert render_report_html("") == ""
+    assert render_report_html(None) == ""
+
+
+def test_sections_and_paragraphs():
+    html = _flat("**Zusammenfassung:**\nErste Zeile\nZweite Zeile\n\nNeuer Absatz")
+
+    assert html == (
+        '<h3 class="report-section">Zusammenfassung:</h3>'
+        "<p>Erste Zeile<br>Zweite Zeile</p>"
+        "<p>Neuer Absatz</p>"
+    )
+
+
+def test_headings_and_rules():
+    html = _flat("## Befund\n#### Labor\n---")
+
+    assert html == (
+        '<h3 class="report-section">Befund</h3>'
+        '<h4 class="report-section">Labor</h4>'
+        "<hr>"
+    )
+
+
+def test_nested_and_ordered_lists():
+    html = _flat("- Topiramat\n  - 25 mg\n- Ibuprofen\n1. Erstens\n2. Zweitens")
+
+    assert html == (
+        "<ul><li>Topiramat<ul><li>25 mg</li></ul></li><li>Ibuprofen</li></ul>"
+        "<ol><li>Erstens</li><li>Zweitens</li></ol>"
+    )
+
+
+def test_list_item_continuation_and_end():
+    html = _flat("- Kopfschmerztagebuch\n  über vier Wochen\nWiedervorstellung")
+
+    assert html == "<ul><li>Kopfschmerztagebuch<br>über vier Wochen</li></ul><p>Wiedervorstellung</p>"
+
+
+@pytest.mark.parametrize("text, html", [
+    ("**fett**", "<strong>fett</strong>"),
+    ("*kursiv*", "<em>kursiv</em>"),
+    ("***beides***", "<strong><em>beides</em></strong>"),
+    ("**fett mit *kursiv***", "<strong>fett mit <em>kursiv</em></strong>"),
+    ("`G43.1`", "<code>G43.1</code>"),
+    ("a*b*c", "a*b*c"),
+    ("lose ** Sterne", "lose ** Sterne"),
+])
+def test_inline_markup(text, html):
+    assert render_inline(text) == html
+
+
+def test_html_is_escaped():
+    html = render_report_html("<script>alert(1)</script> & **<b>**")
+
+    assert "<script>" not in html
+    assert "&lt;script&gt;" in html
+    assert "&amp;" in html
+    assert "<strong>&lt;b&gt;</strong>" in html
+
+
+@pytest.mark.parametrize("text", [
+    "**Therapie:**\n- Topiramat\n    - 25 mg\n  - 50 mg\n1. Kontrolle\n---\nText",
+    "- a\n1. b\n- c\n\n- d\n  weiter\n## Ende",
+    "**unvollständig\n*auch\n- ***\n`",
+])
+def test_output_is_well_formed(text):
+    _assert_well_formed(render_report_html(text))
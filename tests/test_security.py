@@ -0,0 +1,143 @@
+import pytest
+from fastapi import HTTPException
+
+from app.core.revocation import RevocationList
+from app.core.security import (
+    _load_principal,
+    invalidate_principal,
+    principal_cache,
+    record_user_change,
+)
+from app.db import SessionLocal, engine
+from app.models import Base, RefreshToken, RevokedToken, UserInvalidation
+from app.models.user import User
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeSession:
+    """Stands in for the AsyncSession _load_principal reads users from."""
+
+    def __init__(self, *users: User):
+        self.users = {user.id: user for user in users}
+        self.gets = 0
+
+    async def get(self, model, user_id):
+        self.gets += 1
+        return self.users.get(user_id)
+
+
+def _user(user_id: int = 1, role: str = "doctor", token_version: int = 0) -> User:
+    return User(id=user_id, role=role, token_version=token_version)
+
+
+@pytest.fixture(autouse=True)
+def empty_principal_cache():
+    principal_cache.clear()
+    yield
+    principal_cache.clear()
+
+
+@pytest.fixture
+def revocation_tables():
+    tables = [RevokedToken.__table__, RefreshToken.__table__, UserInvalidation.__table__]
+    Base.metadata.create_all(engine, tables=tables)
+    yield
+    Base.metadata.drop_all(engine, tables=tables)
+
+
+async def test_principal_is_cached():
+    db = FakeSession(_user())
+
+    first = await _load_principal({"sub": 1, "ver": 0}, db)
+    second = await _load_principal({"sub": 1, "ver": 0}, db)
+
+    assert first == second
+    assert first.role == "doctor"
+    assert db.gets == 1
+
+
+async def test_newer_token_version_reloads_user():
+    db = FakeSession(_user(token_version=0))
+    await _load_principal({"sub": 1, "ver": 0}, db)
+
+    # Password reset elsewhere: new tokens carry the bumped version
+    db.users[1] = _user(token_version=1)
+    principal = await _load_principal({"sub": 1, "ver": 1}, db)
+
+    assert principal.token_version == 1
+    assert db.gets == 2
+
+
+async def test_outdated_token_version_is_rejected():
+    db = FakeSession(_user(token_version=2))
+
+    with pytest.raises(HTTPException) as error:
+        await _load_principal({"sub": 1, "ver": 1}, db)
+
+    assert error.value.status_code == 401
+
+
+async def test_deleted_user_returns_none_and_leaves_nothing_cached():
+    db = FakeSession(_user())
+    await _load_principal({"sub": 1, "ver": 0}, db)
+
+    del db.users[1]
+    invalidate_principal(1)
+
+    assert await _load_principal({"sub": 1, "ver": 0}, db) is None
+    assert principal_cache.get(1) is None
+
+
+async def test_cached_principal_outlives_remote_change_until_sync():
+    db = FakeSession(_user(role="admin"))
+    await _load_principal({"sub": 1, "ver": 0}, db)
+
+    # Demoted on another worker: same token version, nothing invalidated here
+    db.users[1] = _user(role="doctor")
+
+    assert (await _load_principal({"sub": 1, "ver": 0}, db)).role == "admin"
+
+
+async def test_sync_drops_principals_of_changed_users(revocation_tables):
+    db = FakeSession(_user(user_id=1, role="admin"), _user(user_id=2))
+    await _load_principal({"sub": 1, "ver": 0}, db)
+    await _load_principal({"sub": 2, "ver": 0}, db)
+
+    # Another worker demotes user 1 and records the change
+    db.users[1] = _user(user_id=1, role="doctor")
+    with SessionLocal() as session:
+        record_user_change(session, 1)
+        session.commit()
+
+    RevocationList(sync_seconds=60, on_user_changed=invalidate_principal).sync()
+
+    assert (await _load_principal({"sub": 1, "ver": 0}, db)).role == "doctor"
+    assert principal_cache.get(2) is not None
+    assert db.gets == 3
+
+
+async def test_sync_drops_principals_of_deleted_users(revocation_tables):
+    db = FakeSession(_user())
+    await _load_principal({"sub": 1, "ver": 0}, db)
+
+    del db.users[1]
+    with SessionLocal() as session:
+        record_user_change(session, 1)
+        session.commit()
+
+    RevocationList(sync_seconds=60, on_user_changed=invalidate_principal).sync()
+
+    assert await _load_principal({"sub": 1, "ver": 0}, db) is None
+
+
+def test_sync_reports_each_changed_user_once(revocation_tables):
+    with SessionLocal() as session:
+        for user_id in (3, 3, 4):
+            record_user_change(session, user_id)
+        session.commit()
+
+    changed = []
+    RevocationList(sync_seconds=60, on_user_changed=changed.append).sync()
+
+    assert sorted(changed) == [3, 4]
@@ -0,0 +1,90 @@
+import pytest
+from sqlalchemy import select
+
+from app.core import usage
+from app.core.config import LLMRoute
+from app.core.usage import FALLBACK_MS_PER_TOKEN, estimate_generation, record_generation
+from app.db import SessionLocal, engine
+from app.models import Base, ReportGeneration, UsageDaily
+from app.utils.openai_client import GeneratedReport
+
+ROUTE = LLMRoute(name="standard", model="gpt-3.5-turbo", max_tokens=3000)
+
+
+def _generated(model: str = "gpt-3.5-turbo", cached_tokens: int = 0, latency_ms: int = 1000) -> GeneratedReport:
+    return GeneratedReport(
+        text="**Befund:** unauffällig",
+        model=model,
+        route="standard",
+        prompt_version="2",
+        prompt_tokens=1000,
+        completion_tokens=200,
+        cached_tokens=cached_tokens,
+        latency_ms=latency_ms
+    )
+
+
+@pytest.fixture
+def db():
+    tables = [ReportGeneration.__table__, UsageDaily.__table__]
+    Base.metadata.create_all(engine, tables=tables)
+    usage.model_stats_cache.clear()
+    with SessionLocal() as session:
+        yield session
+    usage.model_stats_cache.clear()
+    Base.metadata.drop_all(engine, tables=tables)
+
+
+def _record(db, user_id: int = 1, **generated) -> None:
+    record_generation(db, None, user_id, _generated(**generated))
+    db.commit()
+
+
+def test_generations_add_up_in_one_daily_row(db):
+    _record(db, latency_ms=1000)
+    _record(db, cached_tokens=512, latency_ms=3000)
+    _record(db, latency_ms=2000)
+
+    rollup = db.scalars(select(UsageDaily)).one()
+    assert rollup.generations == 3
+    assert rollup.prompt_tokens == 3000
+    assert rollup.completion_tokens == 600
+    assert rollup.cached_tokens == 512
+    assert rollup.latency_ms_total == 6000
+    assert rollup.latency_ms_max == 3000
+
+    statuses = db.scalars(select(ReportGeneration.cache_status).order_by(ReportGeneration.id)).all()
+    assert statuses == ["miss", "hit", "miss"]
+
+
+def test_rollups_are_kept_per_user_and_model(db):
+    _record(db, user_id=1)
+    _record(db, user_id=2)
+    _record(db, user_id=1, model="gpt-4o-mini")
+
+    rows = db.execute(select(UsageDaily.user_id, UsageDaily.model, UsageDaily.generations)).all()
+    assert sorted(rows) == [(1, "gpt-3.5-turbo", 1), (1, "gpt-4o-mini", 1), (2, "gpt-3.5-turbo", 1)]
+
+
+def test_estimate_without_history_uses_fallbacks(db):
+    completion_tokens, latency_ms = estimate_generation(db, ROUTE, input_tokens=1000)
+
+    assert completion_tokens == ROUTE.max_tokens / 2
+    assert latency_ms == round((1000 + completion_tokens) * FALLBACK_MS_PER_TOKEN)
+
+
+def test_estimate_from_recent_usage(db):
+    # 1200 tokens in 1200 ms: 1 ms per token, 200 completion tokens on average
+    _record(db, latency_ms=1200)
+    _record(db, latency_ms=1200)
+
+    assert estimate_generation(db, ROUTE, input_tokens=800) == (200, 1000)
+
+
+def test_estimate_is_capped_at_max_tokens(db):
+    _record(db)
+    route = LLMRoute(name="follow_up", model="gpt-3.5-turbo", max_tokens=100)
+
+    completion_tokens, _ = estimate_generation(db, route, input_tokens=500)
+
+    assert completion_tokens == 100